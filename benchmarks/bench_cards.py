@@ -0,0 +1,78 @@
+"""
+Per-card overhead of the card representation and the output serializers.
+
+Compares pydantic Flashcard validation against Card.validated, and the old
+model_dump + json.dumps / string-concatenation output against the bulk
+writers in flashcard_gen.export. Runs offline:
+
+    python benchmarks/bench_cards.py [-n 100000]
+"""
+
+import argparse
+import io
+import json
+import time
+
+from flashcard_gen.export import write_csv, write_json, write_jsonl
+from flashcard_gen.schema import Card, Flashcard
+
+
+def make_fields(n: int) -> list[dict]:
+    fields = []
+    for i in range(n):
+        if i % 4 == 3:
+            fields.append({"front": f"Card {i} covers {{{{c1::topic {i}}}}} in detail",
+                           "back": "", "type": "cloze"})
+        else:
+            fields.append({"front": f"  What does \"term {i}\" mean?  ",
+                           "back": f" Definition of term {i}, with a comma ", "type": "basic"})
+    return fields
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def old_json(cards: list[Flashcard]) -> str:
+    return json.dumps([c.model_dump() for c in cards], indent=2)
+
+
+def old_csv(cards: list[Flashcard]) -> str:
+    lines = ["front,back,type"]
+    for c in cards:
+        front = c.front.replace('"', '""')
+        back = c.back.replace('"', '""')
+        lines.append(f'"{front}","{back}","{c.type.value}"')
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", type=int, default=100_000, help="Number of cards (default: 100000)")
+    args = parser.parse_args()
+
+    fields = make_fields(args.n)
+    flashcards: list[Flashcard] = []
+    cards: list[Card] = []
+
+    results = [
+        ("validate: Flashcard", timed(lambda: flashcards.extend(Flashcard(**f) for f in fields))),
+        ("validate: Card.validated",
+         timed(lambda: cards.extend(Card.validated(**f) for f in fields))),
+        ("convert: Card.to_flashcard", timed(lambda: [c.to_flashcard() for c in cards])),
+        ("json: model_dump + dumps", timed(lambda: io.StringIO().write(old_json(flashcards)))),
+        ("json: write_json", timed(lambda: write_json(cards, io.StringIO()))),
+        ("jsonl: write_jsonl", timed(lambda: write_jsonl(cards, io.StringIO()))),
+        ("csv: string concat", timed(lambda: io.StringIO().write(old_csv(flashcards)))),
+        ("csv: write_csv", timed(lambda: write_csv(cards, io.StringIO()))),
+    ]
+
+    print(f"{args.n} cards")
+    for name, seconds in results:
+        print(f"  {name:<28} {seconds * 1000:8.1f} ms  {seconds / args.n * 1e6:6.2f} us/card")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""
+CPU-side pipeline microbenchmarks: chunkers, parsers, card validation and
+string-mode dedup, on synthetic inputs. Needs no Ollama or models.
+
+Every BaseChunker subclass runs on markdown corpora of each --sizes, and in
+token-budget mode when it supports one. Every BaseParser subclass parses
+realistic and malformed model outputs. Card construction and DuplicateChecker
+string dedup run on decks of each --decks size. Each case reports throughput
+(best of --repeat) and its tracemalloc peak from a separate run.
+
+    python benchmarks/bench_cpu.py                      # 10KB-10MB, decks 100-10k
+    python benchmarks/bench_cpu.py --full               # up to 100MB and 100k cards
+    python benchmarks/bench_cpu.py --save base.json     # save a baseline
+    python benchmarks/bench_cpu.py --compare base.json  # exit 1 on regressions
+"""
+
+import argparse
+import inspect
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from flashcard_gen.chunker import BaseChunker
+from flashcard_gen.duplicate_check import DuplicateChecker
+from flashcard_gen.parser import BaseParser
+from flashcard_gen.schema import Card, Flashcard, SimilarityMethod
+from flashcard_gen.store import CardStore
+
+SIZES = ["10KB", "100KB", "1MB", "10MB"]
+FULL_SIZES = SIZES + ["100MB"]
+DECKS = [100, 1_000, 10_000]
+FULL_DECKS = DECKS + [100_000]
+PARSES = 20_000          # Parser calls per case
+CHECKS = 500             # New cards checked per dedup case
+RUN_DECK_LIMIT = 10_000  # In-run dedup compares every card, so larger decks are skipped
+TOKEN_BUDGET = 512
+
+_UNITS = {"KB": 1_000, "MB": 1_000_000}
+
+
+def parse_size(text: str) -> int:
+    for suffix, factor in _UNITS.items():
+        if text.upper().endswith(suffix):
+            return int(float(text[:-len(suffix)]) * factor)
+    return int(text)
+
+
+def _vocabulary(rng: random.Random, n: int = 3000) -> list[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choices(letters, k=rng.randint(3, 11))) for _ in range(n)]
+
+
+def make_corpus(size: int, seed: int = 0) -> str:
+    """Markdown notes of about ``size`` bytes: headers, paragraphs, lists and code."""
+    rng = random.Random(seed)
+    words = _vocabulary(rng)
+
+    def sentence() -> str:
+        s = " ".join(rng.choices(words, k=rng.randint(6, 24)))
+        return s[0].upper() + s[1:] + "."
+
+    blocks = []
+    for _ in range(400):
+        kind = rng.random()
+        if kind < 0.15:
+            blocks.append("#" * rng.randint(1, 3) + " " + " ".join(rng.choices(words, k=3)).title())
+        elif kind < 0.3:
+            blocks.append("\n".join(f"- {sentence()}" for _ in range(rng.randint(2, 6))))
+        elif kind < 0.35:
+            code = "\n".join(f"    {rng.choice(words)} = {rng.randint(0, 99)}" for _ in range(4))
+            blocks.append(f"```python\n{code}\n```")
+        else:
+            blocks.append(" ".join(sentence() for _ in range(rng.randint(2, 8))))
+
+    parts, total = [], 0
+    while total < size:
+        block = rng.choice(blocks)
+        parts.append(block)
+        total += len(block) + 2
+    return "\n\n".join(parts)[:size]
+
+
+def make_fronts(n: int, seed: int = 1) -> list[str]:
+    """Distinct, realistic card fronts sharing a vocabulary."""
+    rng = random.Random(seed)
+    words = _vocabulary(rng, 5000)
+    templates = [
+        "What is the role of {} in {}?",
+        "How does {} affect {} and {}?",
+        "Define {} in the context of {}.",
+        "Why is {} preferred over {}?",
+        "What distinguishes {} from {} when {}?",
+    ]
+    fronts = []
+    for i in range(n):
+        template = templates[i % len(templates)]
+        fronts.append(template.format(*rng.sample(words, template.count("{}"))) + f" ({i})")
+    return fronts
+
+
+def make_fields(n: int) -> list[dict]:
+    """Card fields as parsed from model output, a quarter cloze and some invalid."""
+    fronts = make_fronts(n)
+    fields = []
+    for i, front in enumerate(fronts):
+        if i % 20 == 19:
+            fields.append({"front": "   ", "back": "missing front", "type": "basic"})
+        elif i % 4 == 3:
+            fields.append({"front": front.replace("What", "{{c1::What}}", 1) + " {{c1::x}}",
+                           "back": "", "type": "cloze"})
+        else:
+            fields.append({"front": f"  {front}  ", "back": f" Answer to card {i}. ",
+                           "type": "basic"})
+    return fields
+
+
+REALISTIC = {
+    "SimpleParser": [
+        "Q: What is backpropagation?\nA: An algorithm that computes gradients layer by layer.",
+        "Here is a flashcard:\n\nQ: Why normalize inputs?\nA: It speeds up convergence.\n",
+        "q: What does ReLU return for negative inputs?\na: Zero.",
+    ],
+    "JSONParser": [
+        '{"front": "What is entropy?", "back": "Expected information content."}',
+        '```json\n{"front": "What is a tensor?", "back": "A multi-dimensional array.",}\n```',
+        'Sure! {"front": "Define overfitting.", "back": "Fitting noise in training data."}',
+    ],
+    "ClozeParser": [
+        "C: The {{c1::mitochondria}} is the powerhouse of the cell.",
+        "Here you go:\nC: Gradient descent moves against the {{c1::gradient}}.\n",
+    ],
+    "SchemaParser": [
+        '{"front": "What is a kernel?", "back": "A similarity function."}',
+        '{"front": "What does softmax output?", "back": "A probability distribution."}',
+    ],
+}
+
+MALFORMED = [
+    "",
+    "I cannot create a flashcard from these notes.",
+    "Q: What is missing its answer?",
+    "A: An answer without a question.",
+    '{"front": "Unclosed object", "back": "never ends"',
+    '```json\n[{"front": "nested", "back": {"x": 1}}]\n```',
+    "C: A cloze without any deletion marker.",
+    "Q: \nA: \n",
+    "lorem ipsum " * 200,
+    '{"front": 3, "back": null}',
+]
+
+
+def chunker_cases() -> list[tuple[str, BaseChunker]]:
+    """Every concrete BaseChunker subclass, plus a token-budget variant where supported."""
+    classes, stack = [], list(BaseChunker.__subclasses__())
+    while stack:
+        cls = stack.pop(0)
+        stack.extend(cls.__subclasses__())
+        if not inspect.isabstract(cls):
+            classes.append(cls)
+
+    cases = []
+    for cls in classes:
+        cases.append((cls.__name__, cls()))
+        if "max_tokens" in inspect.signature(cls).parameters:
+            cases.append((f"{cls.__name__}[tokens]", cls(max_tokens=TOKEN_BUDGET)))
+    return cases
+
+
+def parser_cases() -> list[tuple[str, BaseParser]]:
+    return [(cls.__name__, cls()) for cls in BaseParser.__subclasses__()
+            if not inspect.isabstract(cls)]
+
+
+def validate_flashcards(fields: list[dict]) -> list[Flashcard]:
+    cards = []
+    for f in fields:
+        try:
+            cards.append(Flashcard(**f))
+        except ValueError:
+            pass
+    return cards
+
+
+def measure(fn, units: int, unit: str, repeat: int, memory: bool) -> dict:
+    """Best-of-``repeat`` time and throughput, and the tracemalloc peak of one more run."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    best = min(times)
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"seconds": best, "units": units, "unit": unit,
+            "throughput": units / best if best else float("inf"), "peak_bytes": peak}
+
+
+def build_cases(sizes: list[int], decks: list[int], tmp: Path, keep=lambda name: True):
+    """
+    Yield (name, fn, units, unit) for every case ``keep`` accepts. Inputs are
+    only built for groups with at least one kept case.
+    """
+    chunkers = chunker_cases()
+    for size in sizes:
+        cases = [(f"chunk: {name} {size}B", c) for name, c in chunkers]
+        cases = [(name, c) for name, c in cases if keep(name)]
+        if cases:
+            corpus = make_corpus(size)
+            for name, chunker in cases:
+                yield name, lambda c=chunker: c.chunk(corpus), size, "B"
+            del corpus
+
+    for name, parser in parser_cases():
+        for kind, samples in (("realistic", REALISTIC.get(name, [])), ("malformed", MALFORMED)):
+            if samples and keep(f"parse: {name} {kind}"):
+                outputs = [samples[i % len(samples)] for i in range(PARSES)]
+                yield (f"parse: {name} {kind}",
+                       lambda p=parser, o=outputs: [p.parse(x) for x in o], PARSES, "calls")
+
+    for n in decks:
+        names = [f"card: Flashcard {n}", f"card: Card.validated {n}"]
+        if not any(keep(name) for name in names):
+            continue
+        fields = make_fields(n)
+        if keep(names[0]):
+            yield names[0], lambda f=fields: validate_flashcards(f), n, "cards"
+        if keep(names[1]):
+            yield names[1], lambda f=fields: [Card.validated(**x) for x in f], n, "cards"
+
+    new = [Card(front) for front in make_fronts(CHECKS, seed=2)]
+    for n in decks:
+        names = [f"dedup: load history {n}", f"dedup: history {n}", f"dedup: run {n}"]
+        if n > RUN_DECK_LIMIT:
+            names.pop()
+        if not any(keep(name) for name in names):
+            continue
+
+        fronts = make_fronts(n)
+        # Half the checked cards are near-copies of deck cards, so both outcomes are timed
+        checks = [Card(fronts[i % n].replace("?", " exactly?")) if i % 2 else card
+                  for i, card in enumerate(new)]
+
+        if keep(names[0]) or keep(names[1]):
+            store = CardStore(tmp / f"deck-{n}.db")
+            store.add_many([Flashcard(front=f, back="a") for f in fronts])
+            checker = DuplicateChecker(method=SimilarityMethod.STRING, store=store)
+            if keep(names[0]):
+                yield names[0], lambda c=checker, s=store: c.load_history(s), n, "cards"
+            if keep(names[1]):
+                yield (names[1], lambda c=checker, k=checks: [c.is_duplicate(x, []) for x in k],
+                       len(checks), "checks")
+
+        if len(names) == 3 and keep(names[2]):
+            deck = [Card(f) for f in fronts]
+            run_checker = DuplicateChecker(method=SimilarityMethod.STRING)
+            run = run_checker.new_run()
+            yield (names[2],
+                   lambda c=run_checker, d=deck, r=run, k=checks[:50]:
+                   [c.is_duplicate(x, d, r) for x in k],
+                   50, "checks")
+
+
+def format_rate(result: dict) -> str:
+    rate = result["throughput"]
+    if result["unit"] == "B":
+        return f"{rate / 1e6:10.2f} MB/s"
+    return f"{rate:10.0f} {result['unit']}/s"
+
+
+def format_bytes(n: int | None) -> str:
+    if n is None:
+        return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f}{unit}" if unit == "B" else f"{n:.1f}{unit}"
+        n /= 1024
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> int:
+    """Print changes against a baseline. Returns the number of regressions."""
+    regressions = 0
+    print(f"\nAgainst baseline ({baseline['meta'].get('date', '?')}, tolerance {tolerance:.0%}):")
+    for name, result in results.items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print(f"  {name:<48} new")
+            continue
+        speed = result["throughput"] / old["throughput"] - 1
+        line = f"  {name:<48} {speed:+7.1%} throughput"
+        if result["peak_bytes"] and old.get("peak_bytes"):
+            line += f"  {result['peak_bytes'] / old['peak_bytes'] - 1:+7.1%} peak"
+        if speed < -tolerance:
+            line += "  SLOWER"
+            regressions += 1
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", nargs="+", help="Corpus sizes, e.g. 10KB 1MB (default: "
+                        + " ".join(SIZES) + ")")
+    parser.add_argument("--decks", nargs="+", type=int,
+                        help="Deck sizes (default: " + " ".join(map(str, DECKS)) + ")")
+    parser.add_argument("--full", action="store_true", help="Use the full ranges, up to 100MB "
+                        "corpora and 100k-card decks")
+    parser.add_argument("-k", "--filter", help="Only run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (default: 3)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc runs")
+    parser.add_argument("--save", metavar="PATH", help="Save results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="Compare with a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Throughput drop reported as a regression (default: 0.1)")
+    args = parser.parse_args()
+
+    sizes = [parse_size(s) for s in args.sizes or (FULL_SIZES if args.full else SIZES)]
+    decks = args.decks or (FULL_DECKS if args.full else DECKS)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        keep = (lambda name: args.filter in name) if args.filter else (lambda name: True)
+        for name, fn, units, unit in build_cases(sizes, decks, Path(tmp), keep):
+            result = measure(fn, units, unit, args.repeat, not args.no_memory)
+            results[name] = result
+            print(f"  {name:<48} {result['seconds'] * 1000:10.1f} ms {format_rate(result)}"
+                  f"  peak {format_bytes(result['peak_bytes'])}", flush=True)
+
+    if args.save:
+        meta = {"date": time.strftime("%Y-%m-%d %H:%M"), "python": platform.python_version(),
+                "machine": platform.machine(), "repeat": args.repeat}
+        Path(args.save).write_text(json.dumps({"meta": meta, "results": results}, indent=2))
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
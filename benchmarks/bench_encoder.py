@@ -0,0 +1,76 @@
+"""
+Encode throughput of the CPU encoder backends, and how far they drift from PyTorch.
+
+Each backend (torch, onnx, onnx-int8) encodes the same chunks of a synthetic
+corpus at every --threads count, with its batch size tuned. Cosine
+similarity to the PyTorch vectors is checked against --tolerance, and the run
+exits 1 if a backend falls below it. Needs sentence-transformers with the
+onnx extra; no Ollama:
+
+    python benchmarks/bench_encoder.py [--model all-MiniLM-L6-v2] [--threads 1 4 0]
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+from bench_cpu import make_corpus
+
+from flashcard_gen.chunker import ChunkHeaderThenParagraph
+from flashcard_gen.embeddings import ENCODER_BACKENDS, EmbeddingCache, SentenceTransformerEmbedder
+
+
+def cosines(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return np.sum(a * b, axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model", default="all-MiniLM-L6-v2", help="Sentence-transformers model")
+    parser.add_argument("--backends", nargs="+", default=list(ENCODER_BACKENDS),
+                        choices=ENCODER_BACKENDS, help="Backends to compare (default: all)")
+    parser.add_argument("--threads", nargs="+", type=int, default=[1, 4, 0],
+                        help="Thread counts to try, 0 for the library default (default: 1 4 0)")
+    parser.add_argument("--size", default=200_000, type=int,
+                        help="Corpus size in bytes (default: 200000)")
+    parser.add_argument("--tolerance", type=float, default=0.98,
+                        help="Lowest cosine similarity to PyTorch accepted (default: 0.98)")
+    args = parser.parse_args()
+
+    chunks = ChunkHeaderThenParagraph(max_words=120).chunk(make_corpus(args.size))
+    texts = [c.content for c in chunks]
+    print(f"{len(texts)} chunks, {args.model}")
+
+    reference = None
+    failed = False
+    for backend in ["torch"] + [b for b in args.backends if b != "torch"]:
+        for threads in args.threads:
+            embedder = SentenceTransformerEmbedder(args.model, EmbeddingCache(), backend, threads)
+            rates = embedder.tune(texts[:256])
+
+            start = time.perf_counter()
+            vectors = embedder.encode(texts)
+            rate = len(texts) / (time.perf_counter() - start)
+
+            line = (f"  {backend:<10} threads {threads:<3} batch {embedder.batch_size:<4} "
+                    f"{rate:8.1f} texts/s  (tuning: "
+                    + ", ".join(f"{b}: {r:.0f}" for b, r in rates.items()) + ")")
+            if reference is None:
+                reference = vectors
+            else:
+                similarity = cosines(reference, vectors)
+                ok = similarity.min() >= args.tolerance
+                failed |= not ok
+                line += (f"  cosine vs torch min {similarity.min():.4f} "
+                         f"mean {similarity.mean():.4f} {'ok' if ok else 'FAIL'}")
+            print(line, flush=True)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Memory and recall of compact embedding storage, on synthetic clustered vectors.
+
+Compares the retrieval indexes (flat, sq8, pq) by size, build time, query
+time and recall@10 against exact search, and the float32 and float16
+embedding cache and dedup index by size and score error. Runs offline:
+
+    python benchmarks/bench_index.py [-n 200000] [--dim 384]
+"""
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from flashcard_gen.duplicate_check import SemanticIndex
+from flashcard_gen.embeddings import EmbeddingCache, HashEmbedder
+from flashcard_gen.rag import INDEX_TYPES, FAISSRetriever
+from flashcard_gen.schema import Chunk
+
+QUERIES = 1000
+LATENT_DIM = 64
+
+
+def make_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    """
+    Unit vectors in clusters of about 50, like chunks of related notes. They
+    lie near a LATENT_DIM subspace, as sentence embeddings do; isotropic
+    vectors would be a worst case for quantization.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, n // 50), LATENT_DIM))
+    latent = centers[rng.integers(0, len(centers), n)] + 0.6 * rng.normal(size=(n, LATENT_DIM))
+    projection = rng.normal(size=(LATENT_DIM, dim))
+    vectors = (latent @ projection + 0.5 * rng.normal(size=(n, dim))).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def mb(n: int) -> str:
+    return f"{n / 1e6:8.1f} MB"
+
+
+def bench_retrieval(vectors: np.ndarray, queries: np.ndarray) -> None:
+    chunks = [Chunk(content=f"chunk {i}") for i in range(len(vectors))]
+    embedder = HashEmbedder(vectors.shape[1], cache=EmbeddingCache())
+    embedder.prime({c.content: v for c, v in zip(chunks, vectors)})
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, 10)
+
+    print(f"Retrieval, {len(vectors)} x {vectors.shape[1]} vectors, "
+          f"{len(queries)} held-out queries")
+    for index_type in INDEX_TYPES:
+        retriever = FAISSRetriever(embedder=embedder, index_type=index_type)
+        start = time.perf_counter()
+        retriever.index_chunks(chunks)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, found = retriever.index.search(queries, 10)
+        query = (time.perf_counter() - start) / len(queries)
+        recall = np.mean([len(set(t) & set(f)) / 10 for t, f in zip(truth, found)])
+
+        size = retriever.index_bytes
+        print(f"  {retriever.index_kind:<5} {mb(size)}  {size / len(vectors):7.1f} B/vector  "
+              f"build {build:6.2f} s  query {query * 1e3:6.3f} ms  recall@10 {recall:.3f}")
+
+
+def bench_dedup(vectors: np.ndarray, queries: np.ndarray) -> None:
+    print(f"\nDedup, {len(vectors)} cards")
+    scores = {}
+    for dtype in (np.float32, np.float16):
+        cache = EmbeddingCache(dtype)
+        for i, v in enumerate(vectors):
+            cache.put("bench", f"card {i}", v)
+
+        index = SemanticIndex(hnsw_min_size=len(vectors) + 1, dtype=dtype)
+        index.add([f"card {i}" for i in range(len(vectors))], vectors)
+        size = faiss.serialize_index(index.index).nbytes
+        scores[dtype] = [index.search(q)[0] for q in queries]
+        print(f"  {np.dtype(dtype).name:<8} cache {mb(cache.nbytes)}  index {mb(size)}")
+
+    error = max(abs(a[0] - b[0]) for a, b in zip(scores[np.float32], scores[np.float16]))
+    same = np.mean([a[1] == b[1] for a, b in zip(scores[np.float32], scores[np.float16])])
+    print(f"  float16 top-1 agreement {same:.3f}, max similarity error {error:.5f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", type=int, default=200_000, help="Number of vectors (default: 200000)")
+    parser.add_argument("--dim", type=int, default=384, help="Vector dimensions (default: 384)")
+    args = parser.parse_args()
+
+    vectors = make_vectors(args.n + QUERIES, args.dim)
+    vectors, queries = vectors[:args.n], vectors[args.n:]
+    bench_retrieval(vectors, queries)
+    bench_dedup(vectors, queries)
+
+
+if __name__ == "__main__":
+    main()
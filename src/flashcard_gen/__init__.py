@@ -4,8 +4,10 @@ from .generate import (
     generate_single_card,
     generate_flashcard_set,
     generate_flashcard_set_rag,
+    generate_chunk_cards,
 )
 from .duplicate_check import DuplicateChecker
+from .stats import GenerationStats
 
 __all__ = [
     "Flashcard",
@@ -14,7 +16,10 @@ __all__ = [
     # "parse_flashcards",
     "generate_single_card",
     "generate_flashcard_set",
+    "generate_flashcard_set_rag",
+    "generate_chunk_cards",
     "DuplicateChecker",
+    "GenerationStats",
     "Chunk",
 ]
 
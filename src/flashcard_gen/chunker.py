@@ -1,12 +1,64 @@
 import re
 from abc import ABC, abstractmethod
 from .schema import Chunk
+from .tokenizer import BaseTokenizer, HeuristicTokenizer
 
 class BaseChunker(ABC):
+    max_words: int = 300
+    max_tokens: int | None = None
+    tokenizer: BaseTokenizer | None = None
+
     @abstractmethod
     def chunk(self, content: str) -> list[Chunk]:
         pass
 
+    @property
+    def settings(self) -> dict:
+        """What decides the chunks, so saved work can tell whether it is still valid."""
+        tokenizer = None
+        if self.tokenizer is not None:
+            tokenizer = getattr(self.tokenizer, "name", type(self.tokenizer).__name__)
+        return {
+            "chunker": type(self).__name__,
+            "max_words": self.max_words,
+            "overlap": getattr(self, "overlap", None),
+            "max_tokens": self.max_tokens,
+            "tokenizer": tokenizer,
+        }
+
+    def _size(self, text: str) -> int:
+        """Size in tokens when a token budget is set, otherwise in words."""
+        if self.max_tokens is not None:
+            return self.tokenizer.count(text)
+        return len(text.split())
+
+    def _limit(self) -> int:
+        return self.max_tokens if self.max_tokens is not None else self.max_words
+
+    def _set_budget(self, max_tokens: int | None, tokenizer: BaseTokenizer | None) -> None:
+        self.max_tokens = max_tokens
+        self.tokenizer = tokenizer or (HeuristicTokenizer() if max_tokens is not None else None)
+
+    def _word_sizes(self, words: list[str]) -> list[int]:
+        """Size of each word in the space-joined text: tokens in context, or 1 per word."""
+        if self.max_tokens is None:
+            return [1] * len(words)
+        return self.tokenizer.word_counts(words)
+
+    def _split_words(self, text: str, limit: int) -> list[str]:
+        """Split text on word boundaries into pieces of at most limit (tokens or words)."""
+        words = text.split()
+        sizes = self._word_sizes(words)
+        pieces, start, total = [], 0, 0
+        for i, size in enumerate(sizes):
+            if total + size > limit and i > start:
+                pieces.append(" ".join(words[start:i]))
+                start, total = i, 0
+            total += size
+        if start < len(words):
+            pieces.append(" ".join(words[start:]))
+        return pieces
+
 class ChunkByHeader(BaseChunker):
     def __init__(self):
         pass
@@ -48,31 +100,62 @@ class ChunkByHeader(BaseChunker):
 #     return chunks if chunks else [Chunk(content=content)]
 
 class ChunkByParagraph(BaseChunker):
-    def __init__(self, max_words:int, header: str | None = None):
+    def __init__(
+            self,
+            max_words: int = 300,
+            header: str | None = None,
+            max_tokens: int | None = None,
+            tokenizer: BaseTokenizer | None = None,
+    ):
+        """
+        max_tokens switches sizing from words to tokens (counted by tokenizer,
+        HeuristicTokenizer by default). In token mode, paragraphs over the
+        budget are split on word boundaries.
+        """
         self.max_words = max_words
         self.header = header
+        self._set_budget(max_tokens, tokenizer)
 
     def chunk(self, content: str) -> list[Chunk]:
-        """Split content into paragraphs up to max_words."""
+        """Split content into paragraphs up to max_words (or max_tokens)."""
         paragraphs = content.split('\n\n')  # Split by double newline
+        limit = self._limit()
         chunks = []
         current = ""
+        current_size = 0
 
         for para in paragraphs:
             para = para.strip()
             if not para:
                 continue
 
-            if len((current + " " + para).split()) <= self.max_words:
-                current += "\n\n" + para if current else para
+            size = self._size(para)
+            if self.max_tokens is not None and size > limit:
+                pieces = self._split_words(para, limit)
             else:
-                if current.strip():
-                    chunks.append(Chunk(
-                        content=current.strip(),
-                        header=self.header,
-                        level="paragraph"
-                    ))
-                current = para
+                pieces = [para]
+
+            for piece in pieces:
+                if len(pieces) > 1:
+                    size = self._size(piece)
+
+                merged = current_size + size
+                if current and self.max_tokens is not None and merged <= limit:
+                    # The separator and merges across it count too, so measure the joined text
+                    merged = self._size(current + "\n\n" + piece)
+
+                if merged <= limit:
+                    current += "\n\n" + piece if current else piece
+                    current_size = merged
+                else:
+                    if current.strip():
+                        chunks.append(Chunk(
+                            content=current.strip(),
+                            header=self.header,
+                            level="paragraph"
+                        ))
+                    current = piece
+                    current_size = size
 
         if current.strip():
             chunks.append(Chunk(
@@ -115,9 +198,17 @@ class ChunkByParagraph(BaseChunker):
 #     return chunks if chunks else [chunk]
 
 class ChunkHeaderThenParagraph(BaseChunker):
-    def __init__(self, max_words: int = 300):
+    def __init__(
+            self,
+            max_words: int = 300,
+            max_tokens: int | None = None,
+            tokenizer: BaseTokenizer | None = None,
+    ):
+        self._set_budget(max_tokens, tokenizer)
         self.header_chunker = ChunkByHeader()
-        self.paragraph_chunker = ChunkByParagraph(max_words=max_words)
+        self.paragraph_chunker = ChunkByParagraph(
+            max_words=max_words, max_tokens=max_tokens, tokenizer=self.tokenizer
+        )
         self.max_words = max_words
 
     def chunk(self, content: str) -> list[Chunk]:
@@ -130,7 +221,7 @@ class ChunkHeaderThenParagraph(BaseChunker):
 
         final_chunks = []
         for chunk in header_chunks:
-            if len(chunk.content.split()) > self.max_words:
+            if self._size(chunk.content) > self._limit():
                 # Pass header to paragraph chunker
                 self.paragraph_chunker.header = chunk.header
                 sub_chunks = self.paragraph_chunker.chunk(chunk.content)
@@ -158,15 +249,39 @@ class ChunkHeaderThenParagraph(BaseChunker):
 #     return final_chunks
 
 class ChunkByLength(BaseChunker):
-    def __init__(self, max_words: int = 300, overlap: int = 25, header: str | None = None):
+    def __init__(
+            self,
+            max_words: int = 300,
+            overlap: int = 25,
+            header: str | None = None,
+            max_tokens: int | None = None,
+            tokenizer: BaseTokenizer | None = None,
+    ):
+        """With max_tokens, windows are packed by token count; overlap stays in words."""
         self.max_words = max_words
         self.overlap = min(overlap, max_words // 2)
         self.header = header
+        self._set_budget(max_tokens, tokenizer)
+
+    def _window_end(self, sizes: list[int], start: int, num_words: int) -> int:
+        if self.max_tokens is None:
+            return min(start + self.max_words, num_words)
+        end, total = start, 0
+        while end < num_words and (end == start or total + sizes[end] <= self.max_tokens):
+            total += sizes[end]
+            end += 1
+        return end
 
     def chunk(self, content: str) -> list[Chunk]:
         words = content.split()
+        sizes = self._word_sizes(words)
+
+        if self.max_tokens is not None:
+            fits = sum(sizes) <= self.max_tokens
+        else:
+            fits = len(words) <= self.max_words
 
-        if len(words) <= self.max_words:
+        if fits:
             return [Chunk(
                         content=content,
                         header=self.header,
@@ -177,7 +292,7 @@ class ChunkByLength(BaseChunker):
         start = 0
 
         while start < len(words):
-            end = min(start + self.max_words, len(words))
+            end = self._window_end(sizes, start, len(words))
             single_content = " ".join(words[start:end])
             chunks.append(Chunk(
                 content=single_content,
@@ -189,7 +304,8 @@ class ChunkByLength(BaseChunker):
             if end >= len(words):
                 break
 
-            start = end - self.overlap  # Overlap with previous chunk
+            # Overlap with previous chunk, never more than half the window
+            start = max(end - min(self.overlap, (end - start) // 2), start + 1)
 
         return chunks
 
@@ -210,4 +326,22 @@ class ChunkByLength(BaseChunker):
 #         chunks.append(chunk)
 #         start = end - overlap  # Overlap with previous chunk
 #
-#     return chunks
\ No newline at end of file
+#     return chunks
+
+
+def get_chunker(
+        name: str = "hierarchical",
+        max_tokens: int | None = None,
+        tokenizer: BaseTokenizer | None = None,
+) -> BaseChunker:
+    """Build a chunker by CLI name. The header chunker has no size budget."""
+    budget = {"max_tokens": max_tokens, "tokenizer": tokenizer}
+    chunker_map = {
+        "header": lambda: ChunkByHeader(),
+        "paragraph": lambda: ChunkByParagraph(**budget),
+        "length": lambda: ChunkByLength(**budget),
+        "hierarchical": lambda: ChunkHeaderThenParagraph(**budget),
+    }
+    if name not in chunker_map:
+        raise ValueError(f"Unknown chunker: {name}")
+    return chunker_map[name]()
@@ -1,19 +1,212 @@
 """Command-line interface."""
 
 import argparse
-import json
 import sys
 from pathlib import Path
 
 from .generate import generate_flashcard_set, generate_flashcard_set_rag
-from .chunker import (
-    ChunkByHeader,
-    ChunkByParagraph,
-    ChunkByLength,
-    ChunkHeaderThenParagraph,
-)
-
-def main():
+from .chunker import get_chunker
+from .client import get_client, use_cassette
+from .concurrency import EMBEDDING_LIMITER
+from .duplicate_check import DuplicateChecker
+from .embeddings import MAX_CACHE_ENTRIES, SHARED_CACHE, set_encoder_options
+from .hedge import LatencyTracker
+from .export import write_anki, write_apkg, write_csv, write_json, write_jsonl
+from .journal import Journal, JournalMismatch, run_header
+from .query_cache import SHARED_QUERY_CACHE
+from .rag import FAISSRetriever
+from .scheduler import get_scheduler
+from .schema import SimilarityMethod
+from .stats import GenerationStats
+from .store import CardStore
+from .tokenizer import get_tokenizer, token_budget
+from .vault import VAULT_INDEX_DIR, VaultIndex
+from .watch import DEBOUNCE, POLL_INTERVAL, NotesWatcher
+
+
+def serve(argv: list[str]):
+    parser = argparse.ArgumentParser(
+        prog="flashcard-gen serve",
+        description="Run a local server that keeps models and indexes warm between requests",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port (default: 8765)")
+    parser.add_argument("--socket", help="Serve on this Unix socket instead of TCP")
+    parser.add_argument("--preload", nargs="*", metavar="ENCODER",
+                        help="Sentence-transformer models to load at startup "
+                             "(default with no names: all-MiniLM-L6-v2)")
+    parser.add_argument("--embedding-dtype", choices=["float32", "float16"], default="float32",
+                        help="Precision of cached embeddings and dedup indexes (default: float32)")
+    parser.add_argument("--embedding-cache-size", type=int, default=MAX_CACHE_ENTRIES,
+                        help="Embeddings kept in memory across requests, least recently used "
+                             f"evicted first; 0 for no limit (default: {MAX_CACHE_ENTRIES})")
+    parser.add_argument("--encoder-threads", type=int,
+                        help="CPU threads for sentence-transformers/ONNX encoders (default: all)")
+    parser.add_argument("--encoder-batch-size", type=int,
+                        help="Texts per encoder batch (default: 32)")
+    parser.add_argument("--encoder-processes", type=int,
+                        help="Encoder processes used to index RAG chunks; threads are then "
+                             "per process (default: 1)")
+    parser.add_argument("--query-cache", metavar="PATH",
+                        help="Load keyword embeddings and retrieval results from this file "
+                             "and save them on shutdown")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log requests and debug info")
+    args = parser.parse_args(argv)
+
+    from .server import run_server
+
+    set_encoder_options(args.encoder_threads, args.encoder_batch_size, args.encoder_processes)
+
+    preload = args.preload
+    if preload is not None and not preload:
+        preload = ["all-MiniLM-L6-v2"]
+
+    try:
+        run_server(args.host, args.port, args.socket, preload, args.verbose, args.embedding_dtype,
+                   args.query_cache, args.embedding_cache_size or None)
+    except Exception as e:
+        print(f"Error: Cannot start server: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def watch(argv: list[str]):
+    parser = argparse.ArgumentParser(
+        prog="flashcard-gen watch",
+        description="Keep a card file per note up to date, regenerating only changed sections",
+    )
+    parser.add_argument("dir", help="Notes directory to watch")
+    parser.add_argument("-o", "--output-dir",
+                        help="Directory for card files, mirroring the notes "
+                             "(default: <dir>/flashcards)")
+    parser.add_argument("-n", "--num", type=int, default=2,
+                        help="Cards per section (default: 2)")
+    parser.add_argument("-t", "--type", choices=["basic", "cloze", "mixed"],
+                        default="basic", help="Card type (default: basic)")
+    parser.add_argument("-m", "--model", default="qwen2.5:3b", help="Ollama model")
+    parser.add_argument("--format", choices=["json", "jsonl", "csv", "anki", "apkg"],
+                        default="json", help="Output format (default: json)")
+    parser.add_argument("--deck", default="Flashcards",
+                        help="Parent Anki deck for --format apkg; each note gets a subdeck "
+                             "(default: Flashcards)")
+    parser.add_argument("--pattern", default="*.md", help="Note file pattern (default: *.md)")
+    parser.add_argument("--output-format", choices=["simple", "json", "schema"],
+                        default="simple", help="LLM output format (default: simple)")
+    parser.add_argument("--chunker", choices=["header", "paragraph", "length", "hierarchical"],
+                        default="hierarchical", help="Chunking strategy (default: hierarchical)")
+    parser.add_argument("--context-fraction", type=float,
+                        help="Size chunks in tokens, up to this fraction of the model "
+                             "context window (default: size by words)")
+    parser.add_argument("--num-ctx", type=int,
+                        help="Model context window in tokens (default: Ollama's 2048)")
+    parser.add_argument("--threshold", type=float, default=0.7,
+                        help="Duplicate detection threshold (default: 0.7)")
+    parser.add_argument("--dedup", choices=["string", "semantic", "both"], default="string",
+                        help="Duplicate detection method (default: string)")
+    parser.add_argument("--rag", action="store_true",
+                        help="Send each changed section with the related sections of its note")
+    parser.add_argument("--index", choices=["flat", "sq8", "pq"], default="flat",
+                        help="Vector storage of the --rag index (default: flat)")
+    parser.add_argument("--embedder",
+                        help="Embedding model for --rag and semantic dedup, as backend:model "
+                             "(default: sentence-transformers for --rag, Ollama "
+                             "nomic-embed-text for dedup)")
+    parser.add_argument("--embedding-dtype", choices=["float32", "float16"], default="float32",
+                        help="Precision of cached embeddings and dedup indexes (default: float32)")
+    parser.add_argument("--temperature", type=float, default=0.7,
+                        help="LLM temperature (default: 0.7)")
+    parser.add_argument("--speculation", type=float, default=1.0,
+                        help="Keep this multiple of the remaining cards in flight "
+                             "(default: 1.0, serial)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream LLM output and stop as soon as a full card arrives")
+    parser.add_argument("--timeout", type=float,
+                        help="Deadline in seconds for each LLM request (default: none)")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Duplicate requests that run past the observed p90 latency")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Send requests concurrently and adapt how many to Ollama")
+    parser.add_argument("--cap-tokens", action="store_true",
+                        help="Cap generated tokens (num_predict) per card type")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL,
+                        help=f"Seconds between directory scans (default: {POLL_INTERVAL})")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE,
+                        help="Seconds a note must stay unchanged before it is processed "
+                             f"(default: {DEBOUNCE})")
+    parser.add_argument("--once", action="store_true",
+                        help="Update outputs for notes changed since the last run, then exit")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print debug info")
+    args = parser.parse_args(argv)
+
+    root = Path(args.dir)
+    if not root.is_dir():
+        print(f"Error: Not a directory: {root}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        get_client().list()
+    except Exception as e:
+        print(f"Error: Cannot connect to Ollama. Is it running?\n{e}", file=sys.stderr)
+        sys.exit(1)
+
+    max_tokens = tokenizer = None
+    if args.context_fraction:
+        max_tokens = token_budget(args.context_fraction, args.num_ctx)
+        tokenizer = get_tokenizer(args.model)
+
+    # Built once, so embeddings and latency history stay warm between updates
+    SHARED_CACHE.set_dtype(args.embedding_dtype)
+    checker = DuplicateChecker(
+        method=SimilarityMethod(args.dedup),
+        string_threshold=args.threshold,
+        embedder=args.embedder,
+        limiter=EMBEDDING_LIMITER if args.adaptive else None,
+        dtype=args.embedding_dtype,
+    )
+    retriever = FAISSRetriever(embedder=args.embedder, index_type=args.index) if args.rag else None
+
+    watcher = NotesWatcher(
+        root,
+        args.output_dir or root / "flashcards",
+        chunker=get_chunker(args.chunker, max_tokens=max_tokens, tokenizer=tokenizer),
+        cards_per_section=args.num,
+        file_format=args.format,
+        deck=args.deck,
+        pattern=args.pattern,
+        interval=args.interval,
+        debounce=args.debounce,
+        verbose=args.verbose,
+        retriever=retriever,
+        model=args.model,
+        card_type=args.type,
+        output_format=args.output_format,
+        temperature=args.temperature,
+        speculation=args.speculation,
+        stream=args.stream,
+        cap_tokens=args.cap_tokens,
+        num_ctx=args.num_ctx,
+        checker=checker,
+        timeout=args.timeout,
+        latency=LatencyTracker() if args.hedge else None,
+        adaptive=args.adaptive,
+    )
+
+    try:
+        watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        pass
+    if args.verbose:
+        print(f"[DEBUG] {watcher.stats.summary()}", file=sys.stderr)
+
+
+def main(argv: list[str] | None = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["serve"]:
+        serve(argv[1:])
+        return
+    if argv[:1] == ["watch"]:
+        watch(argv[1:])
+        return
+
     parser = argparse.ArgumentParser(
         description="Generate Anki flashcards from markdown notes",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -23,8 +216,11 @@ Examples:
   flashcard-gen notes.md -n 10 -k "sigmoid" "relu"
   flashcard-gen notes.md -t cloze -o cards.json
   flashcard-gen notes.md --rag -k "sigmoid" "relu"
+  flashcard-gen notes.md --vault ~/vault -k "Hessian"
   flashcard-gen notes.md --chunker header
   flashcard-gen notes.md --output-format json
+  flashcard-gen serve --port 8765
+  flashcard-gen watch ~/vault -o ~/vault-cards
         """
     )
 
@@ -35,22 +231,111 @@ Examples:
                         default="basic", help="Card type (default: basic)")
     parser.add_argument("-m", "--model", default="qwen2.5:3b", help="Ollama model")
     parser.add_argument("-o", "--output", help="Output file (default: stdout)")
-    parser.add_argument("--format", choices=["json", "csv", "anki"],
+    parser.add_argument("--format", choices=["json", "jsonl", "csv", "anki", "apkg"],
                         default="json", help="Output format (default: json)")
-    parser.add_argument("--output-format", choices=["simple", "json"],
-                        default="simple", help="LLM output format (default: simple)")
+    parser.add_argument("--deck", default="Flashcards",
+                        help="Anki deck name for --format apkg (default: Flashcards)")
+    parser.add_argument("--output-format", choices=["simple", "json", "schema"],
+                        default="simple",
+                        help="LLM output format; schema constrains decoding to the card "
+                             "JSON schema (default: simple)")
     parser.add_argument("--rag", action="store_true",
                         help="Use RAG for context retrieval")
     parser.add_argument("--chunker", choices=["header", "paragraph", "length", "hierarchical"],
                         default="hierarchical", help="Chunking strategy (default: hierarchical)")
+    parser.add_argument("--context-fraction", type=float,
+                        help="Size chunks in tokens, up to this fraction of the model "
+                             "context window (default: size by words)")
+    parser.add_argument("--num-ctx", type=int,
+                        help="Model context window in tokens (default: Ollama's 2048)")
+    parser.add_argument("--scheduler", choices=["document", "coverage"], default="document",
+                        help="How fill calls are spread over chunks: in document order, or "
+                             "by size, term density, keyword hits and novelty (default: document)")
+    parser.add_argument("--chunk-threshold", type=float,
+                        help="Generate from only one of each group of near-duplicate "
+                             "chunks at this MinHash similarity, e.g. 0.8 (default: off)")
     parser.add_argument("--threshold", type=float, default=0.7,
                         help="Duplicate detection threshold (default: 0.7)")
+    parser.add_argument("--dedup", choices=["string", "semantic", "both"], default="string",
+                        help="Duplicate detection method (default: string)")
+    parser.add_argument("--embedder",
+                        help="Embedding model for RAG retrieval and semantic dedup, as "
+                             "backend:model, e.g. sentence-transformers:all-MiniLM-L6-v2, "
+                             "onnx-int8:all-MiniLM-L6-v2, ollama:nomic-embed-text or hash "
+                             "(default: sentence-transformers for RAG, Ollama nomic-embed-text "
+                             "for dedup)")
+    parser.add_argument("--index", choices=["flat", "sq8", "pq"], default="flat",
+                        help="RAG vector index: flat (exact float32), sq8 (1 byte per dimension) "
+                             "or pq (product-quantized, smallest) (default: flat)")
+    parser.add_argument("--embedding-dtype", choices=["float32", "float16"], default="float32",
+                        help="Precision of cached embeddings and dedup indexes (default: float32)")
+    parser.add_argument("--encoder-threads", type=int,
+                        help="CPU threads for sentence-transformers/ONNX encoders (default: all)")
+    parser.add_argument("--encoder-batch-size", type=int,
+                        help="Texts per encoder batch (default: 32)")
+    parser.add_argument("--encoder-processes", type=int,
+                        help="Encoder processes used to index RAG chunks; threads are then "
+                             "per process (default: 1)")
+    parser.add_argument("--vault", metavar="DIR",
+                        help="Retrieve keyword context from every note in DIR, not just this "
+                             "file (implies --rag)")
+    parser.add_argument("--vault-index", metavar="PATH",
+                        help="Where the vault index is kept between runs "
+                             "(default: <DIR>/.flashcard-gen-index)")
+    parser.add_argument("--shard-by", choices=["folder", "file"], default="folder",
+                        help="Vault index shards, searched in parallel (default: folder)")
+    parser.add_argument("--query-cache", metavar="PATH",
+                        help="Keep keyword embeddings and retrieval results in this file "
+                             "between runs")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="With --rag, start generating from chunks while the index is "
+                             "built, then run keyword cards once it is ready")
+    parser.add_argument("--store",
+                        help="SQLite card history; new cards are deduplicated against "
+                             "it and saved to it")
+    parser.add_argument("--journal",
+                        help="Job journal path (default: <output>.journal when -o is given)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Resume from the journal, skipping finished chunks")
     parser.add_argument("--temperature", type=float, default=0.7,
                         help="LLM temperature (default: 0.7)")
     parser.add_argument("-v", "--verbose", action="store_true",
                         help="Print debug info")
+    parser.add_argument("--speculation", type=float, default=1.0,
+                        help="Keep this multiple of the remaining cards in flight, "
+                             "e.g. 1.3 (default: 1.0, serial)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream LLM output and stop as soon as a full card arrives")
+    parser.add_argument("--timeout", type=float,
+                        help="Deadline in seconds for each LLM request (default: none)")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Duplicate requests that run past the observed p90 latency and "
+                             "keep the first response")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Send requests concurrently and adapt how many to Ollama's "
+                             "throughput and latency")
+    parser.add_argument("--cap-tokens", action="store_true",
+                        help="Cap generated tokens (num_predict) per card type")
+    parser.add_argument("--stats", action="store_true",
+                        help="Print call and wasted-call statistics to stderr")
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument("--record", metavar="CASSETTE",
+                          help="Record every Ollama request and response to a cassette file "
+                               "(.jsonl, or .jsonl.gz to compress)")
+    cassette.add_argument("--replay", metavar="CASSETTE",
+                          help="Serve Ollama responses from a recorded cassette, without a server")
+    parser.add_argument("--replay-latency", type=float, default=0.0,
+                        help="Scale of recorded response timing to simulate on replay "
+                             "(default: 0, instant)")
+
+    args = parser.parse_args(argv)
+
+    if args.format == "apkg" and not args.output:
+        parser.error("--format apkg requires --output")
 
-    args = parser.parse_args()
+    journal_path = args.journal or (f"{args.output}.journal" if args.output else None)
+    if args.resume and not journal_path:
+        parser.error("--resume requires --journal or --output")
 
     # Read input
     if args.file == "-":
@@ -66,24 +351,58 @@ Examples:
         print("Error: Empty input", file=sys.stderr)
         sys.exit(1)
 
+    # Record or replay Ollama traffic
+    if args.record:
+        use_cassette(args.record, "record")
+    elif args.replay:
+        use_cassette(args.replay, "replay", latency=args.replay_latency)
+
     # Check Ollama
-    try:
-        import ollama
-        ollama.list()
-    except Exception as e:
-        print(f"Error: Cannot connect to Ollama. Is it running?\n{e}", file=sys.stderr)
-        sys.exit(1)
+    if not args.replay:
+        try:
+            get_client().list()
+        except Exception as e:
+            print(f"Error: Cannot connect to Ollama. Is it running?\n{e}", file=sys.stderr)
+            sys.exit(1)
 
     # Select chunker
-    chunker_map = {
-        "header": ChunkByHeader(),
-        "paragraph": ChunkByParagraph(),
-        "length": ChunkByLength(),
-        "hierarchical": ChunkHeaderThenParagraph(),
-    }
-    chunker = chunker_map[args.chunker]
+    max_tokens = tokenizer = None
+    if args.context_fraction:
+        max_tokens = token_budget(args.context_fraction, args.num_ctx)
+        tokenizer = get_tokenizer(args.model)
+    chunker = get_chunker(args.chunker, max_tokens=max_tokens, tokenizer=tokenizer)
+
+    # Duplicate checker and card history
+    SHARED_CACHE.set_dtype(args.embedding_dtype)
+    set_encoder_options(args.encoder_threads, args.encoder_batch_size, args.encoder_processes)
+    checker = None
+    if args.store or args.dedup != "string":
+        checker = DuplicateChecker(
+            method=SimilarityMethod(args.dedup),
+            string_threshold=args.threshold,
+            store=CardStore.open(args.store) if args.store else None,
+            embedder=args.embedder,
+            limiter=EMBEDDING_LIMITER if args.adaptive else None,
+            dtype=args.embedding_dtype,
+        )
+    if args.store and args.verbose:
+        print(f"[DEBUG] Loaded {len(checker.store)} cards from {args.store}", file=sys.stderr)
+
+    # Journal
+    journal = None
+    if journal_path:
+        run = run_header(notes, num_cards=args.num, model=args.model, card_type=args.type,
+                         keywords=args.keywords, chunker=args.chunker, rag=args.rag)
+        try:
+            journal = Journal(journal_path, resume=args.resume, run=run)
+        except JournalMismatch as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        if args.resume and args.verbose:
+            print(f"[DEBUG] Journal has {len(journal.cards)} cards", file=sys.stderr)
 
     # Generate
+    stats = GenerationStats()
     common_args = {
         "notes": notes,
         "num_cards": args.num,
@@ -95,37 +414,84 @@ Examples:
         "string_threshold": args.threshold,
         "temperature": args.temperature,
         "verbose": args.verbose,
+        "stats": stats,
+        "speculation": args.speculation,
+        "stream": args.stream,
+        "cap_tokens": args.cap_tokens,
+        "num_ctx": args.num_ctx,
+        "checker": checker,
+        "journal": journal,
+        "chunk_threshold": args.chunk_threshold,
+        "scheduler": get_scheduler(args.scheduler),
+        "timeout": args.timeout,
+        "hedge": args.hedge,
+        "adaptive": args.adaptive,
     }
 
-    if args.rag:
-        cards = generate_flashcard_set_rag(**common_args)
+    if args.query_cache:
+        SHARED_QUERY_CACHE.load(args.query_cache)
+
+    vault = None
+    if args.vault:
+        vault_path = args.vault_index or Path(args.vault) / VAULT_INDEX_DIR
+        vault = VaultIndex.load(vault_path, args.embedder, chunker, args.shard_by)
+        indexed, removed = vault.sync(args.vault)
+        if indexed or removed:
+            vault.save(vault_path)
+        if args.verbose:
+            print(f"[DEBUG] Vault: {len(vault.files)} notes, {len(vault)} chunks in "
+                  f"{len(vault.shards)} shards ({indexed} indexed, {removed} removed)",
+                  file=sys.stderr)
+
+    if args.rag or vault is not None:
+        cards = generate_flashcard_set_rag(**common_args, embedder=args.embedder,
+                                           index_type=args.index, vault=vault,
+                                           pipeline=args.pipeline)
     else:
         cards = generate_flashcard_set(**common_args)
 
+    if args.query_cache:
+        SHARED_QUERY_CACHE.save(args.query_cache)
+    if args.verbose and (args.rag or vault is not None):
+        print(f"[DEBUG] Query cache: {SHARED_QUERY_CACHE.as_dict()}", file=sys.stderr)
+
+    if args.stats:
+        print(f"Stats: {stats.summary()}", file=sys.stderr)
+
+    if checker is not None and checker.store is not None:
+        written = checker.commit(cards)
+        print(f"Saved {written} new cards to {args.store}", file=sys.stderr)
+
     if not cards:
         print("Warning: No cards generated", file=sys.stderr)
         sys.exit(1)
 
     # Format output
-    if args.format == "json":
-        output = json.dumps([c.model_dump() for c in cards], indent=2)
-    elif args.format == "csv":
-        lines = ["front,back,type"]
-        for c in cards:
-            front = c.front.replace('"', '""')
-            back = c.back.replace('"', '""')
-            lines.append(f'"{front}","{back}","{c.type.value}"')
-        output = "\n".join(lines)
-    elif args.format == "anki":
-        # Anki tab-separated import format
-        output = "\n".join(f"{c.front}\t{c.back}" for c in cards)
-
-    # Write output
+    if args.format == "apkg":
+        written = write_apkg(cards, args.output, deck_name=args.deck)
+        print(f"Wrote {written} cards to {args.output}", file=sys.stderr)
+    else:
+        _write_text_output(cards, args)
+
+    # Output is safely written, the journal is no longer needed
+    if journal is not None:
+        journal.close()
+        Path(journal.path).unlink(missing_ok=True)
+
+
+def _write_text_output(cards, args):
+    """Write json, jsonl, csv or anki text output to the output file or stdout."""
+    writers = {"json": write_json, "jsonl": write_jsonl, "csv": write_csv, "anki": write_anki}
+    write = writers[args.format]
+
     if args.output:
-        Path(args.output).write_text(output)
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            write(cards, f)
         print(f"Wrote {len(cards)} cards to {args.output}", file=sys.stderr)
     else:
-        print(output)
+        write(cards, sys.stdout)
+        if args.format in ("json", "anki"):
+            sys.stdout.write("\n")
 
 
 if __name__ == "__main__":
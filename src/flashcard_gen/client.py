@@ -0,0 +1,255 @@
+"""
+Ollama client used by the package, with an optional record/replay cassette.
+
+Every Ollama call goes through ``get_client()``. Recording wraps the HTTP
+transport and saves each request with its response chunks and their timing
+to a JSONL cassette (gzip-compressed when the path ends in ``.gz``).
+Replaying serves those responses back without a server, optionally with the
+recorded latency, so whole runs can be profiled and tested offline.
+
+The cassette can also be chosen with environment variables:
+FLASHCARD_GEN_RECORD=<path>, or FLASHCARD_GEN_REPLAY=<path> together with
+FLASHCARD_GEN_REPLAY_LATENCY=<scale>.
+"""
+
+import atexit
+import codecs
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from pathlib import Path
+
+import httpx
+import ollama
+
+RECORD_ENV = "FLASHCARD_GEN_RECORD"
+REPLAY_ENV = "FLASHCARD_GEN_REPLAY"
+LATENCY_ENV = "FLASHCARD_GEN_REPLAY_LATENCY"
+
+_client: ollama.Client | None = None
+_client_lock = threading.Lock()
+
+
+class CassetteMiss(Exception):
+    """A replayed request has no recorded response left."""
+
+
+def _open(path: Path, mode: str):
+    if path.suffix == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def request_key(request: httpx.Request) -> str:
+    """Method, path and a hash of the JSON body with sorted keys."""
+    body = request.content
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True).encode()
+    except ValueError:
+        pass
+    return f"{request.method} {request.url.path} {hashlib.sha1(body).hexdigest()[:16]}"
+
+
+class _RecordingStream(httpx.SyncByteStream):
+    """Pass response chunks through while timing them; saves the entry on close."""
+
+    def __init__(self, response: httpx.Response, entry: dict, start: float, save):
+        self.response = response
+        self.entry = entry
+        self.start = start
+        self.save = save
+        self.complete = False
+
+    def __iter__(self):
+        # Incremental, so a character split across two chunks is stored whole in the second;
+        # surrogateescape keeps any invalid bytes, so replay returns exactly what was read
+        decoder = codecs.getincrementaldecoder("utf-8")("surrogateescape")
+        for chunk in self.response.iter_raw():
+            ms = round((time.perf_counter() - self.start) * 1000, 1)
+            self.entry["chunks"].append([ms, decoder.decode(chunk)])
+            yield chunk
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            self.entry["chunks"][-1][1] += tail
+        self.complete = True
+
+    def close(self) -> None:
+        self.response.close()
+        self.entry["complete"] = self.complete
+        self.entry["elapsed_ms"] = round((time.perf_counter() - self.start) * 1000, 1)
+        self.save(self.entry)
+
+
+class _ReplayStream(httpx.SyncByteStream):
+    def __init__(self, chunks: list, latency: float):
+        self.chunks = chunks
+        self.latency = latency
+
+    def __iter__(self):
+        last = 0.0
+        for ms, text in self.chunks:
+            if self.latency:
+                time.sleep(max(0.0, ms - last) / 1000 * self.latency)
+            last = ms
+            yield text.encode("utf-8", "surrogateescape")
+
+
+class CassetteTransport(httpx.BaseTransport):
+    """
+    httpx transport that records to or replays from a cassette file.
+
+    In ``record`` mode requests go to the real server through ``transport``
+    and every response is appended to the cassette once it is read or closed.
+    In ``replay`` mode responses are served in recorded order per request
+    key, and ``latency`` scales the recorded chunk timing (0 replays instantly).
+    Close a recording transport to finish the file; a ``.gz`` cassette is
+    not readable until then.
+    """
+
+    def __init__(self, path: str | Path, mode: str = "replay", latency: float = 0.0,
+                 transport: httpx.BaseTransport | None = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._entries: dict[str, deque] = defaultdict(deque)
+
+        if mode == "record":
+            self.transport = transport or httpx.HTTPTransport()
+            self._file = _open(self.path, "w")
+        else:
+            with _open(self.path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]].append(entry)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        key = request_key(request)
+        if self.mode == "replay":
+            with self._lock:
+                if not self._entries[key]:
+                    raise CassetteMiss(f"No recorded response for {key}")
+                entry = self._entries[key].popleft()
+            return httpx.Response(
+                entry["status"],
+                headers={"content-type": entry["content_type"]},
+                stream=_ReplayStream(entry["chunks"], self.latency),
+                request=request,
+            )
+
+        start = time.perf_counter()
+        response = self.transport.handle_request(request)
+        entry = {
+            "key": key,
+            "recorded_at": time.time(),
+            "status": response.status_code,
+            "content_type": response.headers.get("content-type", "application/json"),
+            "chunks": [],
+        }
+        return httpx.Response(
+            response.status_code,
+            headers=response.headers,
+            stream=_RecordingStream(response, entry, start, self._save),
+            request=request,
+        )
+
+    def unused(self) -> list[str]:
+        """The request key of every recorded response that has not been replayed."""
+        with self._lock:
+            return [key for key, entries in self._entries.items() for _ in entries]
+
+    def _save(self, entry: dict) -> None:
+        with self._lock:
+            self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        if self.mode == "record":
+            with self._lock:
+                if self._file.closed:
+                    return
+                self._file.close()
+            self.transport.close()
+
+
+_local = threading.local()
+
+
+@contextmanager
+def read_timeout(seconds: float | None):
+    """
+    Limit how long each socket read may block for Ollama calls in this thread.
+
+    A stream that stalls for longer raises ``httpx.ReadTimeout`` and closes
+    its connection, instead of holding the worker thread indefinitely.
+    """
+    previous = getattr(_local, "read_timeout", None)
+    _local.read_timeout = seconds
+    try:
+        yield
+    finally:
+        _local.read_timeout = previous
+
+
+def _apply_read_timeout(request: httpx.Request) -> None:
+    seconds = getattr(_local, "read_timeout", None)
+    if seconds is not None:
+        timeout = {**request.extensions.get("timeout", {}), "read": seconds}
+        request.extensions = {**request.extensions, "timeout": timeout}
+
+
+def _with_hooks(client: ollama.Client) -> ollama.Client:
+    http = getattr(client, "_client", None)
+    if isinstance(http, httpx.Client) and _apply_read_timeout not in http.event_hooks["request"]:
+        http.event_hooks["request"].append(_apply_read_timeout)
+    return client
+
+
+def _cassette_client(path: str | Path, mode: str, latency: float = 0.0) -> ollama.Client:
+    transport = CassetteTransport(path, mode, latency)
+    if mode == "record":
+        # The client lives until the process exits, so that is when the recording is finished
+        atexit.register(transport.close)
+    return ollama.Client(transport=transport)
+
+
+def use_cassette(path: str | Path, mode: str = "replay", latency: float = 0.0) -> ollama.Client:
+    """
+    Route every Ollama call through a cassette. Returns the new client. A
+    recording is closed when the process exits.
+    """
+    client = _cassette_client(path, mode, latency)
+    set_client(client)
+    return client
+
+
+def set_client(client: ollama.Client | None) -> None:
+    """Replace the client used for Ollama calls; None goes back to the default."""
+    global _client
+    with _client_lock:
+        _client = _with_hooks(client) if client is not None else None
+
+
+def get_client() -> ollama.Client:
+    """The client for Ollama calls, set up from the environment on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            if os.environ.get(REPLAY_ENV):
+                latency = float(os.environ.get(LATENCY_ENV, 0))
+                _client = _cassette_client(os.environ[REPLAY_ENV], "replay", latency)
+            elif os.environ.get(RECORD_ENV):
+                _client = _cassette_client(os.environ[RECORD_ENV], "record")
+            else:
+                _client = ollama.Client()
+            _with_hooks(_client)
+        return _client
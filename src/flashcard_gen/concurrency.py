@@ -0,0 +1,141 @@
+"""AIMD concurrency limits for requests to Ollama."""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+LATENCY_TOLERANCE = 1.5      # Back off when a window's mean latency exceeds this x the baseline
+BACKOFF = 0.5                # Multiplicative decrease
+MIN_GAIN = 0.05              # Throughput gain needed to keep raising the limit
+PROBE_AFTER = 5              # Flat windows before probing one step higher anyway
+BASELINE_WINDOWS = 20        # The latency baseline is the lowest mean of this many recent windows
+MIN_WINDOW = 8               # Completions per adjustment window, at least
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that adapts to what the server can take.
+
+    Completions are grouped in windows of about twice ``limit`` requests.
+    After a window the limit grows by one while throughput keeps improving
+    and the limit was actually reached, and is halved when the window had
+    errors or its mean latency rose past LATENCY_TOLERANCE x the baseline,
+    the lowest mean of the last BASELINE_WINDOWS windows. After PROBE_AFTER
+    flat windows it probes one step higher, so capacity that frees up later
+    is found again.
+    """
+
+    def __init__(self, initial: int = 2, min_limit: int = 1, max_limit: int = 16):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = max(min_limit, min(initial, max_limit))
+        self.in_flight = 0
+        self.increases = 0
+        self.decreases = 0
+        self._cond = threading.Condition()
+        self._means: deque[float] = deque(maxlen=BASELINE_WINDOWS)
+        self._last_throughput: float | None = None
+        self._flat = 0
+        self._reset_window()
+
+    def _reset_window(self) -> None:
+        self._window_start = time.monotonic()
+        self._count = 0
+        self._errors = 0
+        self._latency = 0.0
+        self._peak = self.in_flight
+
+    def acquire(self, cancel: threading.Event | None = None) -> bool:
+        """Wait for a free slot. Returns False if ``cancel`` was set first."""
+        with self._cond:
+            while self.in_flight >= self.limit:
+                if cancel is not None and cancel.is_set():
+                    return False
+                self._cond.wait(0.1)
+            self.in_flight += 1
+            self._peak = max(self._peak, self.in_flight)
+            return True
+
+    def release(self, seconds: float | None = None, ok: bool = True) -> None:
+        """
+        Free a slot and record how the request went. ``seconds`` is None for
+        requests that were cancelled, which say nothing about the server.
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if seconds is not None or not ok:
+                self._count += 1
+                self._errors += not ok
+                self._latency += seconds or 0.0
+                if self._count >= max(MIN_WINDOW, 2 * self.limit):
+                    self._adjust()
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, cancel: threading.Event | None = None):
+        """
+        Hold a slot for the body, timing it. Yields False without a slot if
+        ``cancel`` was set while waiting. An exception marks the request failed.
+        """
+        if not self.acquire(cancel):
+            yield False
+            return
+        start = time.monotonic()
+        try:
+            yield True
+        except Exception:
+            self.release(ok=False)
+            raise
+        if cancel is not None and cancel.is_set():
+            self.release()
+        else:
+            self.release(time.monotonic() - start)
+
+    def _adjust(self) -> None:
+        elapsed = max(time.monotonic() - self._window_start, 1e-9)
+        throughput = self._count / elapsed
+        successes = self._count - self._errors
+        mean = self._latency / successes if successes else None
+
+        if mean is not None:
+            self._means.append(mean)
+
+        if self._errors or (mean is not None and mean > LATENCY_TOLERANCE * self.baseline):
+            new_limit = max(self.min_limit, int(self.limit * BACKOFF))
+            if new_limit < self.limit:
+                self.decreases += 1
+            self.limit = new_limit
+            self._last_throughput = None
+            self._flat = 0
+        elif self._peak >= self.limit and self.limit < self.max_limit:
+            improved = (self._last_throughput is None
+                        or throughput > self._last_throughput * (1 + MIN_GAIN))
+            self._flat = 0 if improved else self._flat + 1
+            if improved or self._flat >= PROBE_AFTER:
+                self.limit += 1
+                self.increases += 1
+                self._flat = 0
+            self._last_throughput = throughput
+
+        self._reset_window()
+
+    @property
+    def baseline(self) -> float | None:
+        """Lowest recent window mean latency, in seconds."""
+        return min(self._means) if self._means else None
+
+    def as_dict(self) -> dict:
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "increases": self.increases,
+                "decreases": self.decreases,
+                "baseline_latency": self.baseline,
+            }
+
+
+# Process-wide limiters, so concurrent runs (e.g. server requests) share one view of the host
+GENERATION_LIMITER = AdaptiveLimiter(initial=2, max_limit=16)
+EMBEDDING_LIMITER = AdaptiveLimiter(initial=2, max_limit=8)
@@ -1,34 +1,259 @@
+import threading
+from collections import Counter
 from difflib import SequenceMatcher
+import faiss
 import numpy as np
-import ollama
+from .concurrency import AdaptiveLimiter
+from .embeddings import BaseEmbedder, get_embedder
 from .generate import Flashcard, SimilarityMethod
+from .store import CardStore, normalize_front
+
+MIN_HISTORY_TOKEN = 3        # Shorter tokens are not indexed
+COMMON_TOKEN_SHARE = 0.05    # Tokens in more of the history than this do not select candidates
+HNSW_MIN_SIZE = 5000         # Semantic indexes switch from exact to HNSW search at this many cards
+HNSW_M = 32                  # HNSW graph neighbours per node
+HNSW_EF_SEARCH = 64          # HNSW candidates visited per search
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+class SemanticIndex:
+    """
+    Incremental inner-product FAISS index over normalized front embeddings,
+    so a search score is the cosine similarity.
+
+    Search is exact while the index is small and moves to HNSW once it holds
+    ``hnsw_min_size`` fronts. With ``dtype`` float16 the vectors are stored
+    as float16 (faiss QT_fp16), half the memory for a negligible score change.
+    """
+
+    def __init__(self, hnsw_min_size: int = HNSW_MIN_SIZE, dtype=np.float32):
+        self.hnsw_min_size = hnsw_min_size
+        self.fp16 = np.dtype(dtype) == np.float16
+        self.index: faiss.Index | None = None
+        self.fronts: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self.fronts)
+
+    def add(self, fronts: list[str], vectors) -> None:
+        if not fronts:
+            return
+        matrix = _normalize_rows(np.asarray(vectors).reshape(len(fronts), -1))
+        if self.index is None:
+            dim = matrix.shape[1]
+            self.index = (faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16,
+                                                     faiss.METRIC_INNER_PRODUCT)
+                          if self.fp16 else faiss.IndexFlatIP(dim))
+        self.index.add(matrix)
+        self.fronts.extend(fronts)
+
+        if not isinstance(self.index, faiss.IndexHNSW) and len(self.fronts) >= self.hnsw_min_size:
+            self._to_hnsw()
+
+    def _to_hnsw(self) -> None:
+        vectors = self.index.reconstruct_n(0, self.index.ntotal)
+        dim = vectors.shape[1]
+        if self.fp16:
+            index = faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_fp16, HNSW_M,
+                                      faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        index.add(vectors)
+        self.index = index
+
+    def search(self, vector, k: int = 1) -> list[tuple[float, str]]:
+        """Nearest fronts as (cosine similarity, front), best first."""
+        if not self.fronts:
+            return []
+        query = _normalize_rows(np.asarray(vector).reshape(1, -1))
+        scores, ids = self.index.search(query, min(k, len(self.fronts)))
+        return [(float(score), self.fronts[i]) for score, i in zip(scores[0], ids[0]) if i >= 0]
+
+    def clear(self) -> None:
+        self.index = None
+        self.fronts = []
+
+
+class RunIndex:
+    """
+    Fronts accepted so far in one generation run, indexed for duplicate checks.
+
+    Each run gets its own from DuplicateChecker.new_run, so runs sharing a
+    checker (e.g. concurrent server requests on one store) never see each
+    other's cards. A RunIndex is not itself safe for concurrent use.
+    """
+
+    def __init__(self, dtype=np.float32):
+        self.fronts: list[str] = []
+        self.norm: set[str] = set()
+        self.index = SemanticIndex(dtype=dtype)
+
+    def __len__(self) -> int:
+        return len(self.fronts)
+
+    def clear(self) -> None:
+        self.fronts = []
+        self.norm = set()
+        self.index.clear()
 
 
 class DuplicateChecker:
-    """Check for duplicate flashcards using string or semantic similarity."""
+    """Check for duplicate flashcards using string or semantic similarity.
+
+    With a ``store``, new cards are also checked against every card saved by
+    earlier runs. History lookups use a normalized-front set for exact matches
+    and a token index to pick the few fronts worth a full string comparison.
+
+    For semantic methods, history and accepted cards are kept in SemanticIndex
+    instances, so each check is one nearest-neighbour search instead of a
+    comparison with every card. Exact and string checks run first.
+
+    The history is shared and guarded by a lock, so one checker can serve
+    concurrent runs. Each run's own cards live in a RunIndex from
+    ``new_run``, passed to ``is_duplicate``.
+
+    Embeddings come from ``embedder`` (a BaseEmbedder or get_embedder spec),
+    by default the Ollama model ``embedding_model``. Pass the retriever's
+    embedder to share one model and cache between retrieval and dedup.
+    With a ``limiter`` (e.g. EMBEDDING_LIMITER), embedding requests that miss
+    the cache wait for a slot, so concurrent runs adapt to the server.
+    ``dtype`` float16 stores the semantic indexes' vectors at half size.
+    """
 
     def __init__(
             self,
             method: SimilarityMethod = SimilarityMethod.STRING,
             string_threshold: float = 0.7,
             semantic_threshold: float = 0.85,
-            embedding_model: str = "nomic-embed-text"
+            embedding_model: str = "nomic-embed-text",
+            store: CardStore | None = None,
+            embedder: BaseEmbedder | str | None = None,
+            limiter: AdaptiveLimiter | None = None,
+            dtype=np.float32,
     ):
         self.method = method
         self.string_threshold = string_threshold
         self.semantic_threshold = semantic_threshold
-        self.embedding_model = embedding_model
-        self._embedding_cache: dict[str, list[float]] = {}
-
-    def _get_embedding(self, text: str) -> list[float]:
-        """Get embedding with caching."""
-        if text not in self._embedding_cache:
-            response = ollama.embeddings(
-                model=self.embedding_model,
-                prompt=text
-            )
-            self._embedding_cache[text] = response["embedding"]
-        return self._embedding_cache[text]
+        if isinstance(embedder, str):
+            embedder = get_embedder(embedder)
+        self.embedder = embedder or get_embedder(f"ollama:{embedding_model}")
+        self.embedding_model = self.embedder.name
+        self.limiter = limiter
+        self.store = store
+        self._history_fronts: list[str] = []
+        self._history_norm: set[str] = set()
+        self._token_index: dict[str, list[int]] = {}
+        self._history_index = SemanticIndex(dtype=dtype)
+        self._history_lock = threading.RLock()
+        self.dtype = dtype
+        if store is not None:
+            self.load_history(store)
+
+    @staticmethod
+    def _tokens(text: str) -> set[str]:
+        return {t for t in normalize_front(text).split() if len(t) >= MIN_HISTORY_TOKEN}
+
+    def new_run(self) -> RunIndex:
+        """An empty index for the cards of one generation run."""
+        return RunIndex(dtype=self.dtype)
+
+    def load_history(self, store: CardStore) -> None:
+        """Build the history indexes from a card store."""
+        with self._history_lock:
+            self._history_fronts = []
+            self._history_norm = set()
+            self._token_index = {}
+            self._add_history(store.fronts())
+
+            if self.method != SimilarityMethod.STRING:
+                fronts, matrix = store.embeddings(self.embedding_model)
+                self._history_index.clear()
+                if matrix is not None:
+                    self._history_index.add(fronts, matrix)
+
+    def _add_history(self, fronts: list[str]) -> None:
+        for front in fronts:
+            i = len(self._history_fronts)
+            self._history_fronts.append(front)
+            self._history_norm.add(normalize_front(front))
+            for token in self._tokens(front):
+                self._token_index.setdefault(token, []).append(i)
+
+    def _history_candidates(self, front: str) -> list[int]:
+        """History fronts sharing at least half of the new front's informative tokens."""
+        max_postings = max(50, int(len(self._history_fronts) * COMMON_TOKEN_SHARE))
+        postings = [
+            self._token_index[t] for t in self._tokens(front)
+            if t in self._token_index and len(self._token_index[t]) <= max_postings
+        ]
+        if not postings:
+            return []
+        hits = Counter(i for posting in postings for i in posting)
+        needed = max(1, len(postings) // 2)
+        return [i for i, n in hits.items() if n >= needed]
+
+    def _is_history_duplicate(self, new: Flashcard) -> bool:
+        with self._history_lock:
+            if normalize_front(new.front) in self._history_norm:
+                return True
+
+            if self.method in (SimilarityMethod.STRING, SimilarityMethod.BOTH):
+                for i in self._history_candidates(new.front):
+                    front = self._history_fronts[i]
+                    if self._string_similarity(new.front, front) > self.string_threshold:
+                        return True
+            semantic = self.method != SimilarityMethod.STRING and len(self._history_index)
+
+        if semantic:
+            vector = self._get_embedding(new.front)  # Outside the lock; may wait for a server
+            with self._history_lock:
+                hits = self._history_index.search(vector)
+            if hits and hits[0][0] > self.semantic_threshold:
+                return True
+
+        return False
+
+    def commit(self, cards: list[Flashcard]) -> int:
+        """
+        Save accepted cards to the store in one transaction, with any cached
+        embeddings, and add them to the in-memory history.
+        """
+        if self.store is None:
+            return 0
+        if self.method != SimilarityMethod.STRING and cards:
+            fronts = [c.front for c in cards]
+            embeddings = dict(zip(fronts, self._embed(fronts)))
+        else:
+            embeddings = {c.front: self.embedder.cached(c.front)
+                          for c in cards if self.embedder.cached(c.front) is not None}
+        with self._history_lock:
+            written = self.store.add_many(cards, embeddings, self.embedding_model)
+            self._add_history([c.front for c in cards])
+
+            if self.method != SimilarityMethod.STRING:
+                fronts = [c.front for c in cards if c.front in embeddings]
+                self._history_index.add(fronts, [embeddings[f] for f in fronts])
+        return written
+
+    def _embed(self, texts: list[str]) -> np.ndarray:
+        """Embed through the embedder's cache, holding a limiter slot for uncached texts."""
+        if self.limiter is None or all(self.embedder.cached(t) is not None for t in texts):
+            return self.embedder.embed(texts)
+        with self.limiter.slot():
+            return self.embedder.embed(texts)
+
+    def _get_embedding(self, text: str) -> np.ndarray:
+        """Get embedding through the embedder's cache."""
+        return self._embed([text])[0]
+
+    def cached_embedding(self, text: str) -> np.ndarray | None:
+        """Embedding already computed for text, if any."""
+        return self.embedder.cached(text)
 
     def _cosine_similarity(self, a: list[float], b: list[float]) -> float:
         """Compute cosine similarity between two vectors."""
@@ -45,25 +270,58 @@ class DuplicateChecker:
         emb_b = self._get_embedding(b)
         return self._cosine_similarity(emb_a, emb_b)
 
-    def is_duplicate(self, new: Flashcard, existing: list[Flashcard]) -> bool:
-        """Check if card is duplicate based on configured method."""
-        for card in existing:
-            if self.method == SimilarityMethod.STRING:
-                if self._string_similarity(new.front, card.front) > self.string_threshold:
-                    return True
+    def _sync_run(self, run: RunIndex, existing: list[Flashcard]) -> None:
+        """
+        Bring ``run`` up to date with ``existing``.
 
-            elif self.method == SimilarityMethod.SEMANTIC:
-                if self._semantic_similarity(new.front, card.front) > self.semantic_threshold:
-                    return True
+        Within a run ``existing`` only grows, so only the new tail is indexed.
+        Any other list rebuilds the index.
+        """
+        n = len(run.fronts)
+        if n > len(existing) or (n and existing[n - 1].front != run.fronts[-1]):
+            run.clear()
+            n = 0
+
+        tail = [card.front for card in existing[n:]]
+        if not tail:
+            return
+        run.fronts.extend(tail)
+        run.norm.update(normalize_front(front) for front in tail)
+        if self.method != SimilarityMethod.STRING:
+            run.index.add(tail, self._embed(tail))
 
-            elif self.method == SimilarityMethod.BOTH:
+    def is_duplicate(
+            self,
+            new: Flashcard,
+            existing: list[Flashcard],
+            run: RunIndex | None = None,
+    ) -> bool:
+        """
+        Check if card is duplicate based on configured method.
+
+        ``run`` is the RunIndex of the run ``existing`` belongs to (see
+        new_run). Without one, the run's cards are indexed for this call only.
+        """
+        if self._history_fronts and self._is_history_duplicate(new):
+            return True
+
+        run = run if run is not None else self.new_run()
+        self._sync_run(run, existing)
+        if normalize_front(new.front) in run.norm:
+            return True
+
+        if self.method in (SimilarityMethod.STRING, SimilarityMethod.BOTH):
+            for card in existing:
                 if self._string_similarity(new.front, card.front) > self.string_threshold:
                     return True
-                if self._semantic_similarity(new.front, card.front) > self.semantic_threshold:
-                    return True
+
+        if self.method != SimilarityMethod.STRING and existing:
+            hits = run.index.search(self._get_embedding(new.front))
+            if hits and hits[0][0] > self.semantic_threshold:
+                return True
 
         return False
 
     def clear_cache(self):
-        """Clear embedding cache."""
-        self._embedding_cache.clear()
\ No newline at end of file
+        """Clear the embedding cache."""
+        self.embedder.cache.clear()
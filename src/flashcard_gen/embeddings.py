@@ -0,0 +1,439 @@
+"""Embedding providers shared by retrieval and duplicate detection."""
+
+import hashlib
+import platform
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Iterator
+from functools import cache, partial
+from pathlib import Path
+
+import numpy as np
+
+from .client import get_client
+
+MAX_CACHE_ENTRIES = 50_000   # Vectors kept by SHARED_CACHE, about 75 MB at 384 float32 dims
+
+
+class _Block:
+    """Contiguous rows of one embedder's vectors, grown by doubling; freed rows are reused."""
+
+    def __init__(self, dim: int, dtype):
+        self.matrix = np.empty((16, dim), dtype=dtype)
+        self.rows: dict[str, int] = {}
+        self.free: list[int] = []
+        self.size = 0   # Rows handed out so far, including freed ones
+
+    def put(self, digest: str, vector: np.ndarray) -> None:
+        row = self.rows.get(digest)
+        if row is None:
+            if self.free:
+                row = self.free.pop()
+            else:
+                row = self.size
+                self.size += 1
+                if row == len(self.matrix):
+                    grown = np.empty((2 * row, self.matrix.shape[1]), dtype=self.matrix.dtype)
+                    grown[:row] = self.matrix
+                    self.matrix = grown
+            self.rows[digest] = row
+        self.matrix[row] = vector
+
+    def remove(self, digest: str) -> None:
+        row = self.rows.pop(digest, None)
+        if row is not None:
+            self.free.append(row)
+
+    def astype(self, dtype) -> "_Block":
+        block = _Block(self.matrix.shape[1], dtype)
+        block.matrix = self.matrix[:max(self.size, 1)].astype(dtype)
+        block.rows = dict(self.rows)
+        block.free = list(self.free)
+        block.size = self.size
+        return block
+
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU map from (embedder name, sha1 of text) to a vector.
+
+    Keys are content hashes, so the same text embedded by the retriever and
+    the duplicate checker is computed once when they share an embedder.
+    Each embedder's vectors are rows of one contiguous array of ``dtype``;
+    float16 halves the memory and vectors are returned as float32. Past
+    ``max_entries`` vectors (None for no limit) the least recently used are
+    evicted and their rows reused, so a long-lived server stays bounded.
+    """
+
+    def __init__(self, dtype=np.float32, max_entries: int | None = None):
+        self.dtype = np.dtype(dtype)
+        self.max_entries = max_entries
+        self._blocks: dict[str, _Block] = {}
+        self._order: OrderedDict[tuple[str, str], None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(name: str, text: str) -> tuple[str, str]:
+        return name, hashlib.sha1(text.encode()).hexdigest()
+
+    def get(self, name: str, text: str) -> np.ndarray | None:
+        key = self.key(name, text)
+        with self._lock:
+            block = self._blocks.get(key[0])
+            row = block.rows.get(key[1]) if block is not None else None
+            if row is None:
+                return None
+            self._order.move_to_end(key)
+            return np.asarray(block.matrix[row], dtype=np.float32)
+
+    def put(self, name: str, text: str, vector) -> np.ndarray:
+        """Store a vector. Returns it as ``get`` would, since it may be evicted before a read."""
+        key = self.key(name, text)
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        with self._lock:
+            block = self._blocks.get(name)
+            if block is None or block.matrix.shape[1] != len(vector):
+                if block is not None:
+                    for digest in block.rows:
+                        self._order.pop((name, digest), None)
+                block = self._blocks[name] = _Block(len(vector), self.dtype)
+            block.put(key[1], vector)
+            self._order[key] = None
+            self._order.move_to_end(key)
+            self._evict()
+        return vector.astype(self.dtype).astype(np.float32, copy=False)
+
+    def _evict(self) -> None:
+        while self.max_entries is not None and len(self._order) > self.max_entries:
+            (name, digest), _ = self._order.popitem(last=False)
+            self._blocks[name].remove(digest)
+
+    def resize(self, max_entries: int | None) -> None:
+        """Change the entry limit, evicting right away if the cache is over it."""
+        with self._lock:
+            self.max_entries = max_entries
+            self._evict()
+
+    def set_dtype(self, dtype) -> None:
+        """Store vectors as ``dtype`` from now on, converting those already cached."""
+        with self._lock:
+            self.dtype = np.dtype(dtype)
+            self._blocks = {name: block.astype(self.dtype) for name, block in self._blocks.items()}
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the vector arrays, including unused capacity."""
+        with self._lock:
+            return sum(block.matrix.nbytes for block in self._blocks.values())
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._blocks.clear()
+            self._order.clear()
+
+
+# Process-wide cache used by every embedder unless one is passed in
+SHARED_CACHE = EmbeddingCache(max_entries=MAX_CACHE_ENTRIES)
+
+
+class BaseEmbedder(ABC):
+    """
+    Turns texts into float32 vectors, in batches, through a content-hash cache.
+
+    ``name`` identifies the model, so vectors from different models never mix
+    in the cache or in the card store.
+    """
+    batch_size = 32
+
+    def __init__(self, name: str, cache: EmbeddingCache | None = None):
+        self.name = name
+        self.cache = cache if cache is not None else SHARED_CACHE
+
+    @abstractmethod
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        """Embed texts without the cache. Returns an (n, dim) array."""
+        pass
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Embed texts, computing only the ones not cached. Returns (n, dim) float32."""
+        vectors: list[np.ndarray | None] = [self.cache.get(self.name, t) for t in texts]
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+
+        computed = {}
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            for text, vector in zip(batch, self._embed_batch(batch)):
+                computed[text] = self.cache.put(self.name, text, vector)
+
+        if missing:
+            vectors = [v if v is not None else computed[t] for t, v in zip(texts, vectors)]
+        if not vectors:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack(vectors)
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        """Embed texts with the model, bypassing the cache, e.g. to time it. Returns (n, dim)."""
+        return self._embed_batch(texts)
+
+    def embed_batches(self, texts: list[str], batch_size: int = 1024) -> Iterator[np.ndarray]:
+        """
+        Embed texts in order, ``batch_size`` at a time, yielding one (n, dim)
+        array per batch. Lets callers consume large corpora in bounded memory.
+        """
+        for start in range(0, len(texts), batch_size):
+            yield self.embed(texts[start:start + batch_size])
+
+    def load(self) -> None:
+        """Load the model now rather than on first use. A no-op for remote models."""
+
+    def embed_one(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+    def cached(self, text: str) -> np.ndarray | None:
+        """The cached vector for text, without computing it."""
+        return self.cache.get(self.name, text)
+
+    def prime(self, vectors: dict[str, list[float]]) -> None:
+        """Seed the cache with vectors computed earlier, e.g. from a journal."""
+        for text, vector in vectors.items():
+            self.cache.put(self.name, text, vector)
+
+
+ENCODER_BACKENDS = ("torch", "onnx", "onnx-int8")
+ONNX_CACHE = Path.home() / ".cache" / "flashcard-gen" / "onnx"
+
+# Defaults for encoders created later, set from the CLI with set_encoder_options
+_encoder_options: dict = {"threads": None, "batch_size": None, "processes": None}
+
+
+def set_encoder_options(
+        threads: int | None = None,
+        batch_size: int | None = None,
+        processes: int | None = None,
+) -> None:
+    """
+    CPU threads, batch size and encoder processes for sentence-transformers
+    encoders created from now on. With processes, threads are per process.
+    """
+    _encoder_options.update(threads=threads, batch_size=batch_size, processes=processes)
+
+
+def _quantization_config() -> str:
+    """The dynamic int8 quantization config that suits this CPU."""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "arm64"
+    try:
+        flags = Path("/proc/cpuinfo").read_text()
+    except OSError:
+        return "avx2"
+    if "avx512_vnni" in flags:
+        return "avx512_vnni"
+    return "avx512" if "avx512f" in flags else "avx2"
+
+
+def _onnx_int8_encoder(model_name: str, threads: int | None):
+    """
+    Load a dynamically int8-quantized ONNX export of model_name, exporting and
+    quantizing it into ONNX_CACHE on first use.
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    config = _quantization_config()
+    suffix = f"{'quint8' if config == 'avx2' else 'qint8'}_{config}"
+    path = ONNX_CACHE / model_name.replace("/", "--")
+    file_name = f"onnx/model_{suffix}.onnx"
+    if not (path / file_name).exists():
+        model = SentenceTransformer(model_name, device="cpu", backend="onnx")
+        model.save(str(path))
+        export_dynamic_quantized_onnx_model(model, config, str(path))
+    return SentenceTransformer(str(path), device="cpu", backend="onnx",
+                               model_kwargs=_onnx_kwargs(threads, file_name))
+
+
+def _onnx_kwargs(threads: int | None, file_name: str | None = None) -> dict:
+    kwargs = {"provider": "CPUExecutionProvider"}
+    if file_name:
+        kwargs["file_name"] = file_name
+    if threads:
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        kwargs["session_options"] = options
+    return kwargs
+
+
+@cache
+def get_encoder(model_name: str, backend: str = "torch", threads: int | None = None):
+    """
+    Load a SentenceTransformer once per process and share it between embedders.
+
+    ``backend`` is ``torch``, ``onnx`` (ONNX Runtime) or ``onnx-int8``
+    (ONNX Runtime on a dynamically int8-quantized export). ``threads`` caps
+    the CPU threads used for encoding.
+    """
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend: {backend}. "
+                         f"Available: {', '.join(ENCODER_BACKENDS)}")
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "onnx-int8":
+        return _onnx_int8_encoder(model_name, threads)
+    if backend == "onnx":
+        return SentenceTransformer(model_name, device="cpu", backend="onnx",
+                                   model_kwargs=_onnx_kwargs(threads))
+    if threads:
+        import torch
+
+        torch.set_num_threads(threads)
+    return SentenceTransformer(model_name)
+
+
+class SentenceTransformerEmbedder(BaseEmbedder):
+    """
+    Local sentence-transformers model, run by PyTorch or ONNX Runtime.
+
+    ONNX backends give slightly different vectors, so their names carry the
+    backend (e.g. ``sentence-transformers/all-MiniLM-L6-v2@onnx-int8``) and
+    their vectors are cached and stored apart from the PyTorch ones.
+
+    With ``processes`` > 1, embed_batches shards uncached texts across a
+    shared EncoderPool, the path used to index large corpora.
+    """
+
+    def __init__(
+            self,
+            model_name: str = "all-MiniLM-L6-v2",
+            cache: EmbeddingCache | None = None,
+            backend: str = "torch",
+            threads: int | None = None,
+            batch_size: int | None = None,
+            processes: int | None = None,
+    ):
+        name = f"sentence-transformers/{model_name}"
+        super().__init__(name if backend == "torch" else f"{name}@{backend}", cache)
+        self.model_name = model_name
+        self.backend = backend
+        self.threads = threads or _encoder_options["threads"]
+        self.processes = processes or _encoder_options["processes"]
+        self.batch_size = batch_size or _encoder_options["batch_size"] or self.batch_size
+
+    @property
+    def encoder(self):
+        """The model, loaded on first use so runs served from caches never load it."""
+        return get_encoder(self.model_name, self.backend, self.threads)
+
+    def load(self) -> None:
+        get_encoder(self.model_name, self.backend, self.threads)
+
+    def embed_batches(self, texts: list[str], batch_size: int = 1024) -> Iterator[np.ndarray]:
+        if not self.processes or self.processes < 2:
+            yield from super().embed_batches(texts, batch_size)
+            return
+        from .encoder_pool import get_pool
+
+        pool = get_pool(self.model_name, self.backend, self.processes, self.threads)
+        batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+        missing = [list(dict.fromkeys(t for t in batch if self.cached(t) is None))
+                   for batch in batches]
+        computed = pool.map_batches((m for m in missing if m), self.batch_size)
+
+        for batch, todo in zip(batches, missing):
+            found = {}
+            if todo:
+                for text, vector in zip(todo, next(computed)):
+                    found[text] = self.cache.put(self.name, text, vector)
+            # Texts cached when the batches were planned may have been evicted since
+            found.update((t, self.cache.get(self.name, t)) for t in batch if t not in found)
+            evicted = [t for t, v in found.items() if v is None]
+            if evicted:
+                found.update(zip(evicted, self.embed(evicted)))
+            yield np.vstack([found[t] for t in batch])
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        return np.asarray(self.encoder.encode(texts, batch_size=self.batch_size), dtype=np.float32)
+
+    def tune(self, texts: list[str], batch_sizes=(8, 16, 32, 64, 128)) -> dict[int, float]:
+        """
+        Time encoding ``texts`` at each batch size, keep the fastest as
+        ``batch_size`` and return texts per second by batch size.
+        """
+        self.encode(texts[:max(batch_sizes)])  # Warm up
+        rates = {}
+        for batch_size in batch_sizes:
+            start = time.perf_counter()
+            self.encoder.encode(texts, batch_size=batch_size)
+            rates[batch_size] = len(texts) / (time.perf_counter() - start)
+        self.batch_size = max(rates, key=rates.get)
+        return rates
+
+
+class OllamaEmbedder(BaseEmbedder):
+    """Embedding model served by Ollama. The name is the bare model, as stored by earlier runs."""
+
+    def __init__(self, model: str = "nomic-embed-text", cache: EmbeddingCache | None = None):
+        super().__init__(model, cache)
+        self.model = model
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        response = get_client().embed(model=self.model, input=texts)
+        return np.asarray(response["embeddings"], dtype=np.float32)
+
+
+class HashEmbedder(BaseEmbedder):
+    """
+    Deterministic bag-of-words vectors from hashed tokens.
+
+    Needs no model or server, so it suits tests and offline runs. Texts that
+    share words get similar vectors; there is no semantic understanding.
+    """
+    _tokens = re.compile(r"\w+")
+
+    def __init__(self, dim: int = 256, cache: EmbeddingCache | None = None):
+        super().__init__(f"hash-{dim}", cache)
+        self.dim = dim
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in self._tokens.findall(text.lower()):
+                h = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big")
+                matrix[row, h % self.dim] += 1.0 if (h >> 32) & 1 else -1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+
+EMBEDDERS = {
+    "sentence-transformers": SentenceTransformerEmbedder,
+    "st": SentenceTransformerEmbedder,
+    "onnx": partial(SentenceTransformerEmbedder, backend="onnx"),
+    "onnx-int8": partial(SentenceTransformerEmbedder, backend="onnx-int8"),
+    "ollama": OllamaEmbedder,
+}
+
+
+@cache
+def get_embedder(spec: str) -> BaseEmbedder:
+    """
+    Embedder for a ``backend:model`` spec, created once per process.
+
+    Backends are ``sentence-transformers`` (or ``st``), ``onnx`` and
+    ``onnx-int8`` (the same sentence-transformers models on ONNX Runtime),
+    and ``ollama``; ``hash`` or ``hash:<dim>`` gives the deterministic
+    HashEmbedder. Passing
+    the same spec to the retriever and the duplicate checker makes them share
+    one model and one cache.
+    """
+    backend, _, model = spec.partition(":")
+    if backend == "hash":
+        return HashEmbedder(int(model) if model else 256)
+    if backend not in EMBEDDERS:
+        raise ValueError(f"Unknown embedder backend: {backend}. Available: hash, "
+                         + ", ".join(EMBEDDERS))
+    return EMBEDDERS[backend](model) if model else EMBEDDERS[backend]()
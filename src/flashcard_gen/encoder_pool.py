@@ -0,0 +1,74 @@
+"""Pool of encoder processes for indexing large corpora on many-core CPUs."""
+
+import atexit
+import multiprocessing
+import os
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import cache
+
+import numpy as np
+
+MAX_PENDING_PER_PROCESS = 2    # Batches queued per worker; bounds memory while keeping workers busy
+
+_worker_encoder = None
+
+
+def _init_worker(model_name: str, backend: str, threads: int) -> None:
+    global _worker_encoder
+    from .embeddings import get_encoder
+
+    _worker_encoder = get_encoder(model_name, backend, threads)
+
+
+def _encode(texts: list[str], batch_size: int) -> np.ndarray:
+    return np.asarray(_worker_encoder.encode(texts, batch_size=batch_size), dtype=np.float32)
+
+
+class EncoderPool:
+    """
+    Worker processes that each load the encoder once and encode batches of
+    texts. Processes use the spawn start method, since forked PyTorch and
+    ONNX Runtime thread pools can deadlock, and share the CPU threads evenly.
+    """
+
+    def __init__(self, model_name: str, backend: str = "torch", processes: int | None = None,
+                 threads: int | None = None):
+        self.processes = processes or os.cpu_count() or 1
+        threads = threads or max(1, (os.cpu_count() or 1) // self.processes)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_name, backend, threads),
+        )
+
+    def submit(self, texts: list[str], batch_size: int) -> Future:
+        return self._executor.submit(_encode, texts, batch_size)
+
+    def map_batches(self, batches, batch_size: int) -> Iterator[np.ndarray]:
+        """
+        Encode an iterable of text batches, yielding results in order. At most
+        MAX_PENDING_PER_PROCESS batches per worker are in flight, so results
+        never pile up ahead of the consumer.
+        """
+        pending: deque[Future] = deque()
+        for texts in batches:
+            pending.append(self.submit(texts, batch_size))
+            if len(pending) >= self.processes * MAX_PENDING_PER_PROCESS:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+@cache
+def get_pool(model_name: str, backend: str = "torch", processes: int | None = None,
+             threads: int | None = None) -> EncoderPool:
+    """One pool per model and settings, reused across documents until exit."""
+    pool = EncoderPool(model_name, backend, processes, threads)
+    atexit.register(pool.shutdown)
+    return pool
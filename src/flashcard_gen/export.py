@@ -0,0 +1,282 @@
+"""Export flashcards to files."""
+
+import hashlib
+import html
+import json
+import re
+import sqlite3
+import tempfile
+import time
+import zipfile
+from collections.abc import Iterable
+from json.encoder import encode_basestring_ascii as _quote
+from pathlib import Path
+from typing import TextIO
+
+from .schema import Card, CardType, Flashcard
+
+BATCH_SIZE = 1000
+
+# Anki 2.1 collection schema (version 11), as read by the .apkg importer
+APKG_SCHEMA = """
+CREATE TABLE col (
+    id integer primary key, crt integer not null, mod integer not null,
+    scm integer not null, ver integer not null, dty integer not null,
+    usn integer not null, ls integer not null, conf text not null,
+    models text not null, decks text not null, dconf text not null, tags text not null
+);
+CREATE TABLE notes (
+    id integer primary key, guid text not null, mid integer not null,
+    mod integer not null, usn integer not null, tags text not null,
+    flds text not null, sfld integer not null, csum integer not null,
+    flags integer not null, data text not null
+);
+CREATE TABLE cards (
+    id integer primary key, nid integer not null, did integer not null,
+    ord integer not null, mod integer not null, usn integer not null,
+    type integer not null, queue integer not null, due integer not null,
+    ivl integer not null, factor integer not null, reps integer not null,
+    lapses integer not null, left integer not null, odue integer not null,
+    odid integer not null, flags integer not null, data text not null
+);
+CREATE TABLE revlog (
+    id integer primary key, cid integer not null, usn integer not null,
+    ease integer not null, ivl integer not null, lastIvl integer not null,
+    factor integer not null, time integer not null, type integer not null
+);
+CREATE TABLE graves (usn integer not null, oid integer not null, type integer not null);
+CREATE INDEX ix_notes_usn on notes (usn);
+CREATE INDEX ix_cards_usn on cards (usn);
+CREATE INDEX ix_revlog_usn on revlog (usn);
+CREATE INDEX ix_cards_nid on cards (nid);
+CREATE INDEX ix_cards_sched on cards (did, queue, due);
+CREATE INDEX ix_revlog_cid on revlog (cid);
+CREATE INDEX ix_notes_csum on notes (csum);
+"""
+
+# Fixed model ids so re-imports map onto the same note types
+BASIC_MODEL_ID = 1607392319
+CLOZE_MODEL_ID = 1607392320
+
+CARD_CSS = ".card { font-family: arial; font-size: 20px; text-align: center; color: black; " \
+           "background-color: white; }\n.cloze { font-weight: bold; color: blue; }"
+
+_BASE91 = (
+    "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+    "!#$%&()*+,-./:;<=>?@[]^_`{|}~"
+)
+
+
+def _field(name: str, ord_: int) -> dict:
+    return {"name": name, "ord": ord_, "sticky": False, "rtl": False,
+            "font": "Arial", "size": 20, "media": []}
+
+
+def _models(deck_id: int, now: int) -> dict:
+    common = {"mod": now, "usn": -1, "sortf": 0, "did": deck_id, "css": CARD_CSS,
+              "latexPre": "\\documentclass[12pt]{article}\n\\special{papersize=3in,5in}\n"
+                          "\\usepackage{amssymb,amsmath}\n\\pagestyle{empty}\n"
+                          "\\setlength{\\parindent}{0in}\n\\begin{document}\n",
+              "latexPost": "\\end{document}", "tags": [], "vers": []}
+    basic = {
+        **common, "id": BASIC_MODEL_ID, "name": "flashcard-gen Basic", "type": 0,
+        "flds": [_field("Front", 0), _field("Back", 1)],
+        "tmpls": [{"name": "Card 1", "ord": 0, "qfmt": "{{Front}}",
+                   "afmt": "{{FrontSide}}<hr id=answer>{{Back}}",
+                   "did": None, "bqfmt": "", "bafmt": ""}],
+        "req": [[0, "any", [0]]],
+    }
+    cloze = {
+        **common, "id": CLOZE_MODEL_ID, "name": "flashcard-gen Cloze", "type": 1,
+        "flds": [_field("Text", 0), _field("Back Extra", 1)],
+        "tmpls": [{"name": "Cloze", "ord": 0, "qfmt": "{{cloze:Text}}",
+                   "afmt": "{{cloze:Text}}<br>{{Back Extra}}",
+                   "did": None, "bqfmt": "", "bafmt": ""}],
+    }
+    return {str(BASIC_MODEL_ID): basic, str(CLOZE_MODEL_ID): cloze}
+
+
+def _deck(deck_id: int, name: str, now: int) -> dict:
+    return {"id": deck_id, "name": name, "mod": now, "usn": -1, "desc": "", "dyn": 0,
+            "conf": 1, "collapsed": False, "extendNew": 10, "extendRev": 50,
+            "newToday": [0, 0], "revToday": [0, 0], "lrnToday": [0, 0], "timeToday": [0, 0]}
+
+
+DECK_CONF = {"1": {
+    "id": 1, "name": "Default", "mod": 0, "usn": 0, "maxTaken": 60, "autoplay": True,
+    "timer": 0, "replayq": True,
+    "new": {"perDay": 20, "delays": [1, 10], "separate": True, "ints": [1, 4, 7],
+            "initialFactor": 2500, "bury": True, "order": 1},
+    "rev": {"perDay": 100, "fuzz": 0.05, "ivlFct": 1, "maxIvl": 36500, "ease4": 1.3,
+            "bury": True, "minSpace": 1},
+    "lapse": {"leechFails": 8, "minInt": 1, "delays": [10], "leechAction": 0, "mult": 0},
+}}
+
+COL_CONF = {"activeDecks": [1], "curDeck": 1, "newSpread": 0, "collapseTime": 1200,
+            "timeLim": 0, "estTimes": True, "dueCounts": True, "curModel": None,
+            "nextPos": 1, "sortType": "noteFld", "sortBackwards": False, "addToCur": True}
+
+
+def write_json(cards: Iterable[Card | Flashcard], fh: TextIO) -> int:
+    """
+    Write cards to ``fh`` as an indented JSON array, one card at a time.
+
+    The output matches ``json.dumps([...], indent=2)`` over the card dicts.
+    Returns the number of cards written.
+    """
+    count = 0
+    fh.write("[")
+    for card in cards:
+        fh.write(
+            f'{"," if count else ""}\n  {{\n    "front": {_quote(card.front)},\n'
+            f'    "back": {_quote(card.back)},\n    "type": {_quote(card.type.value)}\n  }}'
+        )
+        count += 1
+    fh.write("\n]" if count else "]")
+    return count
+
+
+def write_jsonl(cards: Iterable[Card | Flashcard], fh: TextIO) -> int:
+    """Write one JSON object per line to ``fh``. Returns the number of cards written."""
+    count = 0
+    for card in cards:
+        fh.write(
+            f'{{"front": {_quote(card.front)}, "back": {_quote(card.back)}, '
+            f'"type": {_quote(card.type.value)}}}\n'
+        )
+        count += 1
+    return count
+
+
+def write_csv(cards: Iterable[Card | Flashcard], fh: TextIO) -> int:
+    """
+    Write a ``front,back,type`` CSV with every field quoted to ``fh``.
+    Returns the number of cards written.
+    """
+    count = 0
+    fh.write("front,back,type\n")
+    for card in cards:
+        front = card.front.replace('"', '""')
+        back = card.back.replace('"', '""')
+        fh.write(f'"{front}","{back}","{card.type.value}"\n')
+        count += 1
+    return count
+
+
+def write_anki(cards: Iterable[Card | Flashcard], fh: TextIO) -> int:
+    """Write Anki's tab-separated import format to ``fh``. Returns the number of cards written."""
+    count = 0
+    for card in cards:
+        if count:
+            fh.write("\n")
+        fh.write(f"{card.front}\t{card.back}")
+        count += 1
+    return count
+
+
+def note_guid(card: Card | Flashcard) -> str:
+    """Stable GUID from card type and front, so re-imports update existing notes."""
+    digest = hashlib.sha256(f"flashcard-gen:{card.type.value}:{card.front}".encode()).digest()
+    value = int.from_bytes(digest[:8], "big")
+    chars = []
+    while value:
+        value, rem = divmod(value, len(_BASE91))
+        chars.append(_BASE91[rem])
+    return "".join(reversed(chars)) or _BASE91[0]
+
+
+def _checksum(text: str) -> int:
+    """Anki's first-field checksum, over the field's plain text."""
+    return int(hashlib.sha1(text.encode()).hexdigest()[:8], 16)
+
+
+def _html_field(text: str) -> str:
+    """Anki fields are HTML; escape so text like ``a<b`` or ``List<T>`` shows as written."""
+    return html.escape(text, quote=False)
+
+
+def _cloze_ords(front: str) -> list[int]:
+    return sorted({int(n) - 1 for n in re.findall(r"\{\{c(\d+)::", front)}) or [0]
+
+
+def _deck_id(name: str) -> int:
+    return int(hashlib.sha1(f"flashcard-gen:{name}".encode()).hexdigest()[:12], 16)
+
+
+def write_apkg(
+        cards: Iterable[Card | Flashcard],
+        path: str | Path,
+        deck_name: str = "Flashcards",
+) -> int:
+    """
+    Write cards to an Anki .apkg package.
+
+    Cards are streamed into the collection in batches inside one transaction,
+    so memory stays flat for large decks. Basic and cloze cards use their own
+    note types, and fields are HTML-escaped. Returns the number of notes written.
+    """
+    now = int(time.time())
+    deck_id = _deck_id(deck_name)
+    decks = {
+        "1": {**_deck(1, "Default", now), "usn": 0},
+        str(deck_id): _deck(deck_id, deck_name, now),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "collection.anki2"
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(APKG_SCHEMA)
+
+        count = card_count = 0
+        with conn:
+            conn.execute(
+                "INSERT INTO col VALUES (1, ?, ?, ?, 11, 0, 0, 0, ?, ?, ?, ?, '{}')",
+                (now, now * 1000, now * 1000, json.dumps(COL_CONF),
+                 json.dumps(_models(deck_id, now)), json.dumps(decks), json.dumps(DECK_CONF)),
+            )
+
+            base_id = now * 1000
+            notes, card_rows = [], []
+            for card in cards:
+                note_id = base_id + count
+                if card.type == CardType.CLOZE:
+                    model_id, ords = CLOZE_MODEL_ID, _cloze_ords(card.front)
+                else:
+                    model_id, ords = BASIC_MODEL_ID, [0]
+
+                notes.append((
+                    note_id, note_guid(card), model_id, now, -1, "",
+                    f"{_html_field(card.front)}\x1f{_html_field(card.back)}", card.front,
+                    _checksum(card.front), 0, "",
+                ))
+                for ord_ in ords:
+                    card_rows.append((
+                        base_id + card_count, note_id, deck_id, ord_, now, -1,
+                        0, 0, count, 0, 0, 0, 0, 0, 0, 0, 0, "",
+                    ))
+                    card_count += 1
+                count += 1
+
+                if len(notes) >= BATCH_SIZE:
+                    _flush(conn, notes, card_rows)
+
+            _flush(conn, notes, card_rows)
+        conn.close()
+
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.write(db_path, "collection.anki2")
+            zf.writestr("media", "{}")
+
+    return count
+
+
+def _flush(conn: sqlite3.Connection, notes: list[tuple], card_rows: list[tuple]) -> None:
+    conn.executemany("INSERT INTO notes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", notes)
+    conn.executemany(
+        "INSERT INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        card_rows,
+    )
+    notes.clear()
+    card_rows.clear()
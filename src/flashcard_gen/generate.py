@@ -1,26 +1,87 @@
 """Core flashcard generation logic."""
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import ollama
-from .schema import Flashcard, CardType, SimilarityMethod, GenerationConfig
-from .parser import BaseParser, SimpleParser, JSONParser, ClozeParser
-from .prompts import PROMPTS
-from .duplicate_check import DuplicateChecker
+import math
+import sys
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from .schema import Card, Flashcard, SimilarityMethod, Chunk, flashcard_schema
+from .parser import BaseParser, SimpleParser, JSONParser, ClozeParser, SchemaParser
+from .client import get_client, read_timeout
+from .hedge import LatencyTracker, hedged_call
+from .concurrency import AdaptiveLimiter, GENERATION_LIMITER
+from .prompts import PROMPTS, AVOID_PROMPT, NUM_PREDICT
+from .duplicate_check import DuplicateChecker, RunIndex
+from .stats import GenerationStats
+from .journal import Journal
+from .embeddings import BaseEmbedder
+from .minhash import drop_near_duplicates
 from .rag import FAISSRetriever
-from .chunker import (
-    BaseChunker,
-    ChunkByHeader,
-    ChunkByParagraph,
-    ChunkByLength,
-    ChunkHeaderThenParagraph,
-)
+from .vault import VaultIndex
+from .scheduler import BaseScheduler, DocumentOrderScheduler
+from .chunker import BaseChunker, ChunkHeaderThenParagraph
+
+MAX_ATTEMPTS = 3      # Calls per chunk visit when the chunk has no duplicate history
+EXHAUST_AFTER = 2     # Consecutive duplicates before a chunk is considered used up
+MAX_AVOID = 10        # Most recent fronts fed back into the prompt
+MIN_RATE_SAMPLES = 2  # Calls on a chunk before its duplicate rate shrinks the retry budget
+POLL_INTERVAL = 0.1   # Seconds between checks of an outside cancel while waiting on requests
+CONTEXT_CHUNKS = 2    # Related chunks sent along with a chunk when regenerating with a retriever
+
+
+@dataclass
+class _ChunkState:
+    """Per-chunk bookkeeping for the fill loop."""
+    chunk: Chunk
+    attempts: int = 0
+    duplicates: int = 0
+    streak: int = 0
+    misses: int = 0
+    in_flight: int = 0
+    fronts: list[str] = field(default_factory=list)
+    exhausted: bool = False
+
+    def record(self, card: Card | None, accepted: bool) -> None:
+        """Record the outcome of one call on this chunk."""
+        self.attempts += 1
+        if accepted:
+            self.fronts.append(card.front)
+            self.streak = 0
+            self.misses = 0
+            return
+
+        self.misses += 1
+        if card is not None:
+            self.fronts.append(card.front)
+            self.duplicates += 1
+            self.streak += 1
+
+    def used_up(self) -> bool:
+        """True once the chunk keeps producing duplicates or has spent its retry budget."""
+        return self.streak >= EXHAUST_AFTER or self.misses >= self.retry_budget()
+
+    def retry_budget(self) -> int:
+        """
+        Calls allowed on this visit, shrinking as the duplicate rate rises.
+        The rate is only trusted from MIN_RATE_SAMPLES calls on, so a chunk
+        whose first card is a duplicate still gets a reprompt with its avoid list.
+        """
+        if self.attempts < MIN_RATE_SAMPLES:
+            return MAX_ATTEMPTS
+        rate = self.duplicates / self.attempts
+        return max(1, round(MAX_ATTEMPTS * (1 - rate)))
+
 
 def get_parser(card_type: str, output_format: str) -> BaseParser:
     """Get appropriate parser for card type and format."""
-    if card_type == "cloze":
-        return ClozeParser()
+    if output_format == "schema":
+        return SchemaParser()
     elif output_format == "json":
         return JSONParser()
+    elif card_type == "cloze":
+        return ClozeParser()
     return SimpleParser()
 
 
@@ -32,38 +93,457 @@ def generate_single_card(
         keyword: str | None = None,
         temperature: float = 0.7,
         verbose: bool = False,
+        avoid: list[str] | None = None,
+        stats: GenerationStats | None = None,
+        cancel: threading.Event | None = None,
+        stream: bool = False,
+        cap_tokens: bool = False,
+        num_ctx: int | None = None,
+        timeout: float | None = None,
+        latency: LatencyTracker | None = None,
+        limiter: AdaptiveLimiter | None = None,
 ) -> Flashcard | None:
-    """Generate a single flashcard."""
+    """Generate a single flashcard.
+
+    ``avoid`` lists card fronts the model should not repeat. When ``cancel`` is
+    given the response is streamed and dropped as soon as the event is set.
+    ``output_format="schema"`` uses the JSON prompt and constrains decoding to
+    the Flashcard JSON schema through Ollama's ``format`` parameter.
+
+    With ``stream`` the response is read token by token and closed as soon as
+    the parser sees a complete card. ``cap_tokens`` sets num_predict from the
+    prompt's entry in NUM_PREDICT. ``num_ctx`` sets the context window, which
+    should match the budget the notes were chunked against.
+
+    ``timeout`` is a deadline in seconds for the whole request. Passing a
+    ``latency`` tracker turns on hedging: a request still running past the
+    tracker's p90 is duplicated and the first response wins. A ``limiter``
+    holds the request until it has a free slot and learns from its latency.
+    """
+    card = _generate_card(
+        notes,
+        model=model,
+        card_type=card_type,
+        output_format=output_format,
+        keyword=keyword,
+        temperature=temperature,
+        verbose=verbose,
+        avoid=avoid,
+        stats=stats,
+        cancel=cancel,
+        stream=stream,
+        cap_tokens=cap_tokens,
+        num_ctx=num_ctx,
+        timeout=timeout,
+        latency=latency,
+        limiter=limiter,
+    )
+    return card.to_flashcard() if card is not None else None
+
+
+def _generate_card(
+        notes: str,
+        model: str = "qwen2.5:3b",
+        card_type: str = "basic",
+        output_format: str = "simple",
+        keyword: str | None = None,
+        temperature: float = 0.7,
+        verbose: bool = False,
+        avoid: list[str] | None = None,
+        stats: GenerationStats | None = None,
+        cancel: threading.Event | None = None,
+        stream: bool = False,
+        cap_tokens: bool = False,
+        num_ctx: int | None = None,
+        timeout: float | None = None,
+        latency: LatencyTracker | None = None,
+        limiter: AdaptiveLimiter | None = None,
+) -> Card | None:
+    """Generate one validated Card; see generate_single_card."""
     prompt_key = f"{card_type}_{output_format}"
-    prompt = PROMPTS.get(prompt_key, PROMPTS["basic_simple"])
+    prompt_format = "json" if output_format == "schema" else output_format
+    prompt = PROMPTS.get(f"{card_type}_{prompt_format}", PROMPTS["basic_simple"])
 
     if keyword:
         prompt += f"\nFocus on: {keyword}"
 
-    try:
-        response = ollama.chat(
-            model=model,
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": notes}
-            ],
-            options={"temperature": temperature}
-        )
+    if avoid:
+        prompt += f"\n{AVOID_PROMPT}\n" + "\n".join(f"- {a}" for a in avoid[-MAX_AVOID:])
+
+    if cancel is not None and cancel.is_set():
+        return None
+
+    if stats is not None:
+        stats.record_call(prompt_key, model)
+
+    messages = [
+        {"role": "system", "content": prompt},
+        {"role": "user", "content": notes}
+    ]
+    options = {"temperature": temperature}
+    if cap_tokens and prompt_key in NUM_PREDICT:
+        options["num_predict"] = NUM_PREDICT[prompt_key]
+    if num_ctx:
+        options["num_ctx"] = num_ctx
+    extra = {"format": flashcard_schema(card_type)} if output_format == "schema" else {}
+    parser = get_parser(card_type, output_format)
+
+    def fetch() -> tuple[str | None, bool]:
+        if timeout or latency is not None:
+            return hedged_call(
+                lambda event: _stream_chat(
+                    model, messages, options, event, parser if stream else None,
+                    stall_timeout=timeout, **extra
+                ),
+                timeout=timeout, latency=latency, cancel=cancel, stats=stats,
+            )
+        if cancel is None and not stream:
+            response = get_client().chat(model=model, messages=messages, options=options, **extra)
+            return response["message"]["content"], False
+        return _stream_chat(model, messages, options, cancel, parser if stream else None, **extra)
 
-        raw = response["message"]["content"]
+    try:
+        if limiter is None:
+            raw, stopped_early = fetch()
+        else:
+            with limiter.slot(cancel) as acquired:
+                raw, stopped_early = fetch() if acquired else (None, False)
+
+        if raw is None:
+            if stats is not None:
+                stats.incr("cancelled")
+            return None
+        if stopped_early and stats is not None:
+            stats.incr("early_stops")
 
         if verbose:
-            print(f"[DEBUG] Raw: {raw}")
+            print(f"[DEBUG] Raw: {raw}", file=sys.stderr)
 
-        parser = get_parser(card_type, output_format)
-        return parser.parse(raw)
+        card = parser.parse(raw)
+
+        if card is None and stats is not None:
+            stats.record_parse_failure(prompt_key, model)
+        return card
+
+    except TimeoutError:
+        if verbose:
+            print(f"[DEBUG] Timed out after {timeout}s", file=sys.stderr)
+        return None
 
     except Exception as e:
         if verbose:
-            print(f"[DEBUG] Error: {e}")
+            print(f"[DEBUG] Error: {e}", file=sys.stderr)
+        if stats is not None:
+            stats.incr("errors")
         return None
 
 
+def _stream_chat(
+        model: str,
+        messages: list[dict],
+        options: dict,
+        cancel: threading.Event | None = None,
+        parser: BaseParser | None = None,
+        stall_timeout: float | None = None,
+        **extra,
+) -> tuple[str | None, bool]:
+    """
+    Stream a chat response.
+
+    Returns the text and whether it was cut short because ``parser`` already
+    found a complete card. The text is None if ``cancel`` was set first.
+    ``cancel`` is only checked between chunks, so ``stall_timeout`` bounds
+    how long the stream may go silent before the read fails.
+    """
+    # The request is sent on the first iteration, so the timeout must cover the loop
+    with read_timeout(stall_timeout):
+        stream = get_client().chat(
+            model=model, messages=messages, options=options, stream=True, **extra
+        )
+        text = ""
+        try:
+            for part in stream:
+                if cancel is not None and cancel.is_set():
+                    return None, False
+                content = part["message"]["content"]
+                text += content
+                # Only parts that can finish a card are worth re-parsing the whole text for
+                if (parser is not None and parser.complete_on and parser.complete_on in content
+                        and parser.parse_partial(text)):
+                    return text, True
+        finally:
+            # Closing the generator closes the HTTP response, so Ollama stops decoding
+            stream.close()
+    return text, False
+
+
+@dataclass
+class _Run:
+    """State shared by the keyword and fill phases of one generation run."""
+    cards: list[Card]
+    checker: DuplicateChecker
+    stats: GenerationStats
+    num_cards: int
+    verbose: bool = False
+    on_card: Callable[[Flashcard], None] | None = None
+    journal: Journal | None = None
+    reserved: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    dedup: RunIndex | None = None   # This run's cards in the checker's terms; see __post_init__
+    cancel: threading.Event | None = None
+
+    def __post_init__(self):
+        # The checker may be shared with other runs, so the run keeps its own index
+        if self.dedup is None:
+            self.dedup = self.checker.new_run()
+
+    @property
+    def done(self) -> bool:
+        """
+        True once the cards plus the slots reserved for pending keyword cards
+        reach num_cards, or once the run is cancelled.
+        """
+        if self.cancel is not None and self.cancel.is_set():
+            return True
+        return len(self.cards) + self.reserved >= self.num_cards
+
+    def accept(self, card: Card | None, source: str) -> bool:
+        """Append card if it is new. Returns False for missing or duplicate cards."""
+        if card is None:
+            return False
+        with self.lock:
+            if self.checker.is_duplicate(card, self.cards, self.dedup):
+                self.stats.incr("duplicates")
+                return False
+            self.cards.append(card)
+            self.stats.incr("accepted")
+            if self.journal is not None:
+                embedding = self.checker.cached_embedding(card.front)
+                self.journal.record_card(source, card, embedding)
+            if self.on_card is not None:
+                self.on_card(card.to_flashcard())
+        return True
+
+    def finish(self, source: str) -> None:
+        if self.journal is not None:
+            self.journal.record_done(source)
+
+    def exhaust(self, state: _ChunkState, index: int) -> None:
+        state.exhausted = True
+        self.stats.incr("exhausted_chunks")
+        self.finish(state.chunk.id)
+        if self.verbose:
+            print(f"[DEBUG] Chunk {index} exhausted after {state.attempts} calls "
+                  f"({state.duplicates} duplicates)", file=sys.stderr)
+
+
+def _start_run(
+        num_cards: int,
+        checker: DuplicateChecker,
+        stats: GenerationStats,
+        verbose: bool,
+        on_card: Callable[[Flashcard], None] | None,
+        journal: Journal | None,
+        cancel: threading.Event | None = None,
+) -> _Run:
+    """Create the run, restoring cards and embeddings from a resumed journal."""
+    run = _Run([], checker, stats, num_cards, verbose, on_card, journal, cancel=cancel)
+    if journal is not None and journal.cards:
+        run.cards.extend(journal.cards)
+        checker.embedder.prime(journal.embeddings)
+        if verbose:
+            print(f"[DEBUG] Resumed {len(journal.cards)} cards, "
+                  f"{len(journal.finished)} finished chunks", file=sys.stderr)
+    return run
+
+
+def _fill_from_chunks(
+        run: _Run,
+        chunks: list[Chunk],
+        speculation: float = 1.0,
+        max_in_flight: int = 4,
+        scheduler: BaseScheduler | None = None,
+        keywords: list[str] | None = None,
+        states: list[_ChunkState] | None = None,
+        **gen_kwargs,
+) -> list[_ChunkState]:
+    """
+    Fill cards from chunks until num_cards is reached. Returns the chunk states.
+
+    ``scheduler`` picks the chunk for each call; the default visits chunks in
+    passes in document order. Fronts already produced from a chunk are sent
+    back as an avoid list, the retry budget shrinks with the chunk's duplicate
+    rate, and chunks that keep producing duplicates are dropped.
+    With speculation > 1 or an adaptive ``limiter`` in gen_kwargs the
+    requests are issued concurrently instead. Chunks a resumed journal marks
+    as finished are skipped.
+    Passing the ``states`` and ``scheduler`` of an earlier call continues it:
+    chunks it used up stay exhausted and their avoid lists are kept.
+    """
+    if states is None:
+        states = [_ChunkState(chunk) for chunk in chunks]
+        if run.journal is not None:
+            for state in states:
+                state.exhausted = state.chunk.id in run.journal.finished
+                state.fronts = list(run.journal.fronts_by_source.get(state.chunk.id, []))
+
+        scheduler = scheduler or DocumentOrderScheduler()
+        scheduler.prepare(states, keywords, [card.front for card in run.cards])
+
+    if speculation > 1.0 or gen_kwargs.get("limiter") is not None:
+        _fill_speculative(run, states, scheduler, speculation, max_in_flight, **gen_kwargs)
+        return states
+
+    while not run.done:
+        i = scheduler.pick(states)
+        if i is None:
+            break
+        state = states[i]
+
+        card = _generate_card(
+            state.chunk.content,
+            avoid=state.fronts,
+            stats=run.stats,
+            verbose=run.verbose,
+            cancel=run.cancel,
+            **gen_kwargs
+        )
+        accepted = run.accept(card, state.chunk.id)
+        state.record(card, accepted)
+        scheduler.record(i, accepted)
+        if not accepted and state.used_up():
+            run.exhaust(state, i)
+    return states
+
+
+def _fill_speculative(
+        run: _Run,
+        states: list[_ChunkState],
+        scheduler: BaseScheduler,
+        speculation: float,
+        max_in_flight: int,
+        **gen_kwargs,
+) -> None:
+    """
+    Keep about ``speculation`` x the remaining need in flight, spread across
+    chunks, so parse failures and duplicates are absorbed without another
+    serial round-trip. Outstanding requests are cancelled once num_cards is
+    reached; running ones close their HTTP stream so Ollama stops decoding,
+    and are waited for so ``run.stats`` is complete on return. Cards that
+    arrive after num_cards is reached are dropped without counting against
+    their chunk.
+    With a ``limiter`` in gen_kwargs its current limit replaces max_in_flight.
+    Setting ``run.cancel`` stops the fill within POLL_INTERVAL seconds.
+    """
+    limiter = gen_kwargs.get("limiter")
+    cancel = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=limiter.max_limit if limiter else max_in_flight)
+    pending: dict[Future, int] = {}
+
+    def submit_more():
+        need = run.num_cards - len(run.cards) - run.reserved
+        target = min(math.ceil(need * speculation), limiter.limit if limiter else max_in_flight)
+        while len(pending) < target:
+            i = scheduler.pick(states)
+            if i is None:
+                return
+            state = states[i]
+            state.in_flight += 1
+            future = pool.submit(
+                _generate_card,
+                state.chunk.content,
+                avoid=list(state.fronts),
+                stats=run.stats,
+                verbose=run.verbose,
+                cancel=cancel,
+                **gen_kwargs
+            )
+            pending[future] = i
+
+    try:
+        submit_more()
+        while pending and not run.done:
+            done, _ = wait(pending, timeout=POLL_INTERVAL if run.cancel else None,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                i = pending.pop(future)
+                state = states[i]
+                state.in_flight -= 1
+
+                card = future.result()
+                if run.done:
+                    continue  # Arrived after num_cards was reached; says nothing about the chunk
+                accepted = run.accept(card, state.chunk.id)
+                state.record(card, accepted)
+                scheduler.record(i, accepted)
+
+                if not accepted and not state.exhausted and state.used_up():
+                    run.exhaust(state, i)
+
+            if not run.done:
+                submit_more()
+    finally:
+        # Running requests stop at their next token; wait so their stats are in before returning
+        cancel.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+        run.stats.incr("cancelled", sum(future.cancelled() for future in pending))
+
+    if run.verbose and pending:
+        print(f"[DEBUG] Cancelled {len(pending)} outstanding requests", file=sys.stderr)
+
+
+def _rag_keyword_card(run: _Run, retriever, keyword: str, **gen_kwargs) -> None:
+    """Generate one card focused on ``keyword`` from the chunks retrieved for it."""
+    relevant = retriever.retrieve(keyword, k=2)
+    context = "\n\n".join([c.content for c in relevant])
+
+    if run.verbose:
+        sources = ", ".join(sorted({c.source for c in relevant if c.source}))
+        print(f"[RAG] Keyword '{keyword}' retrieved {len(relevant)} chunks"
+              + (f" from {sources}" if sources else ""), file=sys.stderr)
+
+    card = _generate_card(
+        context,
+        keyword=keyword,
+        verbose=run.verbose,
+        stats=run.stats,
+        cancel=run.cancel,
+        **gen_kwargs
+    )
+    run.accept(card, f"kw:{keyword}")
+    run.finish(f"kw:{keyword}")
+
+
+def _index_then_keywords(
+        run: _Run,
+        retriever: FAISSRetriever,
+        chunks: list[Chunk],
+        keywords: list[str],
+        **gen_kwargs,
+) -> None:
+    """
+    Pipelined RAG worker: index the chunks, then generate the keyword cards
+    that have slots reserved in ``run``, freeing each slot once its keyword
+    is done. All slots are freed if indexing fails.
+    """
+    try:
+        start = time.perf_counter()
+        retriever.index_chunks(chunks)
+        if run.verbose:
+            print(f"[RAG] Indexed {len(chunks)} chunks in {time.perf_counter() - start:.1f}s "
+                  f"while generating", file=sys.stderr)
+        for kw in keywords:
+            try:
+                if len(run.cards) < run.num_cards:
+                    _rag_keyword_card(run, retriever, kw, **gen_kwargs)
+            finally:
+                with run.lock:
+                    run.reserved -= 1
+    finally:
+        with run.lock:
+            run.reserved = 0
+
+
 def generate_flashcard_set(
         notes: str,
         num_cards: int = 5,
@@ -75,60 +555,109 @@ def generate_flashcard_set(
         string_threshold: float = 0.7,
         temperature: float = 0.7,
         verbose: bool = False,
+        stats: GenerationStats | None = None,
+        speculation: float = 1.0,
+        max_in_flight: int = 4,
+        stream: bool = False,
+        cap_tokens: bool = False,
+        num_ctx: int | None = None,
+        checker: DuplicateChecker | None = None,
+        on_card: Callable[[Flashcard], None] | None = None,
+        journal: Journal | None = None,
+        chunk_threshold: float | None = None,
+        scheduler: BaseScheduler | None = None,
+        timeout: float | None = None,
+        hedge: bool = False,
+        adaptive: bool = False,
+        cancel: threading.Event | None = None,
 ) -> list[Flashcard]:
-    """Generate a set of flashcards with chunking."""
+    """
+    Generate a set of flashcards with chunking.
+
+    With ``speculation`` > 1 (e.g. 1.3) the fill phase keeps that multiple of
+    the remaining need in flight, up to ``max_in_flight`` requests.
+    ``stream``, ``cap_tokens`` and ``num_ctx`` are passed to generate_single_card.
+    Pass a ``checker`` (e.g. one backed by a CardStore) to control deduplication;
+    string_threshold is ignored then. ``on_card`` is called with each accepted
+    card as soon as it is accepted. Accepted cards and finished chunks are
+    appended to ``journal``; a resumed journal's cards are kept and its
+    finished chunks and keywords are skipped. With ``chunk_threshold`` (e.g.
+    0.8) only one chunk of each group of near-duplicate chunks, by MinHash
+    Jaccard similarity, is used. ``scheduler`` decides which chunk each fill
+    call goes to (default: document order); CoverageScheduler spreads calls
+    by chunk size, term density, keyword hits and novelty. ``timeout`` caps
+    each LLM request in seconds, and ``hedge`` duplicates requests that run
+    past the run's observed p90 latency. ``adaptive`` issues fill requests
+    concurrently under the process-wide GENERATION_LIMITER, which replaces
+    max_in_flight and is reported in ``stats.concurrency_limit``. Setting
+    ``cancel`` ends the run early with the cards accepted so far, closing
+    any open requests.
+    """
     chunker = chunker or ChunkHeaderThenParagraph()
     chunks = chunker.chunk(notes)
+    stats = stats if stats is not None else GenerationStats()
 
-    if verbose:
-        print(f"[DEBUG] Created {len(chunks)} chunks")
+    if chunk_threshold:
+        kept = drop_near_duplicates(chunks, chunk_threshold)
+        stats.incr("near_duplicate_chunks", len(chunks) - len(kept))
+        chunks = kept
 
-    checker = DuplicateChecker(method=SimilarityMethod.STRING, string_threshold=string_threshold)
-    cards: list[Flashcard] = []
+    if verbose:
+        print(f"[DEBUG] Created {len(chunks)} chunks", file=sys.stderr)
+
+    checker = checker or DuplicateChecker(
+        method=SimilarityMethod.STRING, string_threshold=string_threshold
+    )
+    run = _start_run(num_cards, checker, stats, verbose, on_card, journal, cancel)
+    gen_kwargs = {
+        "model": model,
+        "card_type": card_type,
+        "output_format": output_format,
+        "temperature": temperature,
+        "stream": stream,
+        "cap_tokens": cap_tokens,
+        "num_ctx": num_ctx,
+        "timeout": timeout,
+        "latency": LatencyTracker() if hedge else None,
+        "limiter": GENERATION_LIMITER if adaptive else None,
+    }
 
     # Keyword cards first
     if keywords:
         for kw in keywords:
-            if len(cards) >= num_cards:
+            if run.done:
                 break
+            if journal is not None and f"kw:{kw}" in journal.finished:
+                continue
 
             best_chunk = max(chunks, key=lambda c: c.content.lower().count(kw.lower()))
 
-            card = generate_single_card(
+            card = _generate_card(
                 best_chunk.content,
-                model=model,
-                card_type=card_type,
-                output_format=output_format,
                 keyword=kw,
-                temperature=temperature,
-                verbose=verbose
+                verbose=verbose,
+                stats=stats,
+                cancel=cancel,
+                **gen_kwargs
             )
-
-            if card and not checker.is_duplicate(card, cards):
-                cards.append(card)
+            run.accept(card, f"kw:{kw}")
+            run.finish(f"kw:{kw}")
 
     # Fill from chunks
-    for chunk in chunks:
-        if len(cards) >= num_cards:
-            break
+    _fill_from_chunks(
+        run, chunks, speculation=speculation, max_in_flight=max_in_flight,
+        scheduler=scheduler, keywords=keywords, **gen_kwargs
+    )
 
-        attempts = 0
-        while len(cards) < num_cards and attempts < 3:
-            card = generate_single_card(
-                chunk.content,
-                model=model,
-                card_type=card_type,
-                output_format=output_format,
-                temperature=temperature,
-                verbose=verbose
-            )
+    if adaptive:
+        stats.concurrency_limit = GENERATION_LIMITER.limit
+    if checker.limiter is not None:
+        stats.embed_concurrency_limit = checker.limiter.limit
 
-            if card and not checker.is_duplicate(card, cards):
-                cards.append(card)
-                break
-            attempts += 1
+    if verbose:
+        print(f"[DEBUG] {stats.summary()}", file=sys.stderr)
 
-    return cards
+    return [card.to_flashcard() for card in run.cards]
 
 
 def generate_flashcard_set_rag(
@@ -142,67 +671,232 @@ def generate_flashcard_set_rag(
         string_threshold: float = 0.7,
         temperature: float = 0.7,
         verbose: bool = False,
+        stats: GenerationStats | None = None,
+        speculation: float = 1.0,
+        max_in_flight: int = 4,
+        stream: bool = False,
+        cap_tokens: bool = False,
+        num_ctx: int | None = None,
+        checker: DuplicateChecker | None = None,
+        on_card: Callable[[Flashcard], None] | None = None,
+        journal: Journal | None = None,
+        chunk_threshold: float | None = None,
+        scheduler: BaseScheduler | None = None,
+        timeout: float | None = None,
+        hedge: bool = False,
+        adaptive: bool = False,
+        retriever: FAISSRetriever | None = None,
+        embedder: BaseEmbedder | str | None = None,
+        index_type: str = "flat",
+        vault: VaultIndex | None = None,
+        pipeline: bool = False,
+        cancel: threading.Event | None = None,
 ) -> list[Flashcard]:
-    """Generate flashcards using RAG retrieval."""
+    """
+    Generate flashcards using RAG retrieval.
+
+    With ``speculation`` > 1 (e.g. 1.3) the fill phase keeps that multiple of
+    the remaining need in flight, up to ``max_in_flight`` requests.
+    ``stream``, ``cap_tokens`` and ``num_ctx`` are passed to generate_single_card.
+    Pass a ``checker`` (e.g. one backed by a CardStore) to control deduplication;
+    string_threshold is ignored then. ``on_card`` is called with each accepted
+    card as soon as it is accepted. Accepted cards and finished chunks are
+    appended to ``journal``; a resumed journal's cards are kept and its
+    finished chunks and keywords are skipped. A ``retriever`` can be passed
+    in to reuse an already loaded encoder; it is re-indexed with these notes.
+    Otherwise one is built on ``embedder`` (a BaseEmbedder or get_embedder spec);
+    give the checker the same embedder to share one model for both, and
+    ``index_type`` (flat, sq8 or pq) sets how its vectors are stored.
+    ``chunk_threshold`` drops near-duplicate chunks before indexing, as in
+    generate_flashcard_set, and ``scheduler`` picks chunks for the fill phase.
+    ``timeout``, ``hedge``, ``adaptive`` and ``cancel`` work as in
+    generate_flashcard_set.
+    With a ``vault`` index, keyword context is retrieved from every note in
+    it rather than from these notes alone, and the notes are not embedded.
+
+    With ``pipeline`` the fill phase starts on the chunks right away while
+    a worker thread builds the index, so encoding overlaps LLM latency. Once
+    the index is ready the worker generates the keyword cards, for which
+    slots are held back from the fill. Keyword cards that turn out to be
+    duplicates are made up by a second fill pass. Cards come back in the
+    order they were accepted, not keyword cards first.
+    """
     chunker = chunker or ChunkHeaderThenParagraph()
+    stats = stats if stats is not None else GenerationStats()
+
+    pipelined = pipeline and vault is None
+    if pipelined:
+        retriever = retriever or FAISSRetriever(embedder=embedder, index_type=index_type)
+        chunks = chunker.chunk(notes)
+        if chunk_threshold:
+            kept = drop_near_duplicates(chunks, chunk_threshold)
+            stats.incr("near_duplicate_chunks", len(chunks) - len(kept))
+            chunks = kept
+    elif vault is None:
+        retriever = retriever or FAISSRetriever(embedder=embedder, index_type=index_type)
+        retriever.index_document(notes, chunker=chunker, chunk_threshold=chunk_threshold)
+        chunks = retriever.get_all_chunks()
+        stats.incr("near_duplicate_chunks", retriever.dropped_chunks)
 
-    retriever = FAISSRetriever()
-    retriever.index_document(notes, chunker=chunker)
+        if verbose:
+            print(f"[RAG] Indexed {len(chunks)} chunks", file=sys.stderr)
+            if retriever.index_kind != "flat":
+                print(f"[RAG] {retriever.index_kind} index: {retriever.index_bytes / 1024:.0f} KB, "
+                      f"recall@10 {retriever.recall():.3f}", file=sys.stderr)
+    else:
+        # Keywords are retrieved from the vault, so these notes are only chunked, not embedded
+        retriever = vault
+        chunks = chunker.chunk(notes)
+        if chunk_threshold:
+            kept = drop_near_duplicates(chunks, chunk_threshold)
+            stats.incr("near_duplicate_chunks", len(chunks) - len(kept))
+            chunks = kept
+
+    checker = checker or DuplicateChecker(
+        method=SimilarityMethod.STRING, string_threshold=string_threshold
+    )
+    run = _start_run(num_cards, checker, stats, verbose, on_card, journal, cancel)
+    gen_kwargs = {
+        "model": model,
+        "card_type": card_type,
+        "output_format": output_format,
+        "temperature": temperature,
+        "stream": stream,
+        "cap_tokens": cap_tokens,
+        "num_ctx": num_ctx,
+        "timeout": timeout,
+        "latency": LatencyTracker() if hedge else None,
+        "limiter": GENERATION_LIMITER if adaptive else None,
+    }
+
+    pending = [kw for kw in keywords or []
+               if journal is None or f"kw:{kw}" not in journal.finished]
+
+    states = None
+    if pipelined:
+        # Fill from chunks while a worker indexes them and then runs the
+        # keyword cards, whose slots are held back from the fill meanwhile
+        run.reserved = min(len(pending), max(0, num_cards - len(run.cards)))
+        scheduler = scheduler or DocumentOrderScheduler()
+        worker = ThreadPoolExecutor(max_workers=1)
+        indexing = worker.submit(
+            _index_then_keywords, run, retriever, chunks, pending[:run.reserved], **gen_kwargs
+        )
+        try:
+            states = _fill_from_chunks(
+                run, chunks, speculation=speculation, max_in_flight=max_in_flight,
+                scheduler=scheduler, keywords=keywords, **gen_kwargs
+            )
+            indexing.result()
+        finally:
+            worker.shutdown(wait=True)
+        pending = []
 
-    if verbose:
-        print(f"[RAG] Indexed {len(retriever.chunks)} chunks")
+    # Keyword-focused cards first
+    for kw in pending:
+        if run.done:
+            break
+        _rag_keyword_card(run, retriever, kw, **gen_kwargs)
 
-    checker = DuplicateChecker(method=SimilarityMethod.STRING, string_threshold=string_threshold)
-    cards: list[Flashcard] = []
+    # Fill remaining from all chunks. After a pipelined fill this continues
+    # it, for the slots of rejected keyword cards, so used-up chunks stay used up
+    if not run.done:
+        if verbose:
+            print(f"[RAG] Filling remaining {num_cards - len(run.cards)} cards from chunks",
+                  file=sys.stderr)
 
-    # Keyword-focused cards first
-    if keywords:
-        for kw in keywords:
-            if len(cards) >= num_cards:
-                break
+        _fill_from_chunks(
+            run, chunks, speculation=speculation, max_in_flight=max_in_flight,
+            scheduler=scheduler, keywords=keywords, states=states, **gen_kwargs
+        )
 
-            relevant = retriever.retrieve(kw, k=2)
-            context = "\n\n".join([c.content for c in relevant])
+    if adaptive:
+        stats.concurrency_limit = GENERATION_LIMITER.limit
+    if checker.limiter is not None:
+        stats.embed_concurrency_limit = checker.limiter.limit
 
-            if verbose:
-                print(f"[RAG] Keyword '{kw}' retrieved {len(relevant)} chunks")
+    if verbose:
+        print(f"[RAG] {stats.summary()}", file=sys.stderr)
 
-            card = generate_single_card(
-                context,
-                model=model,
-                card_type=card_type,
-                output_format=output_format,
-                keyword=kw,
-                temperature=temperature,
-                verbose=verbose
-            )
+    return [card.to_flashcard() for card in run.cards]
 
-            if card and not checker.is_duplicate(card, cards):
-                cards.append(card)
 
-    # Fill remaining from all chunks
-    if len(cards) < num_cards:
-        if verbose:
-            print(f"[RAG] Filling remaining {num_cards - len(cards)} cards from chunks")
+def generate_chunk_cards(
+        chunks: list[Chunk],
+        cards_per_chunk: int = 2,
+        existing: list[Flashcard] | None = None,
+        model: str = "qwen2.5:3b",
+        card_type: str = "basic",
+        output_format: str = "simple",
+        string_threshold: float = 0.7,
+        temperature: float = 0.7,
+        verbose: bool = False,
+        stats: GenerationStats | None = None,
+        speculation: float = 1.0,
+        max_in_flight: int = 4,
+        stream: bool = False,
+        cap_tokens: bool = False,
+        num_ctx: int | None = None,
+        checker: DuplicateChecker | None = None,
+        on_card: Callable[[Flashcard], None] | None = None,
+        timeout: float | None = None,
+        latency: LatencyTracker | None = None,
+        adaptive: bool = False,
+        retriever: FAISSRetriever | None = None,
+) -> dict[str, list[Flashcard]]:
+    """
+    Generate up to ``cards_per_chunk`` cards from each chunk, for regenerating
+    only the sections of a document that changed.
+
+    ``existing`` cards (e.g. from the document's unchanged sections) count as
+    duplicates but are not returned. Cards from earlier chunks in the call
+    count too. Returns the new cards by chunk id, in chunk order. Unlike
+    generate_flashcard_set, hedging takes a ``latency`` tracker, so callers
+    that run many small calls can keep one warm; the other options are the
+    same. With a ``retriever`` indexed on the document, each chunk is sent
+    with the CONTEXT_CHUNKS other chunks most related to it, as RAG keyword
+    cards are.
+    """
+    stats = stats if stats is not None else GenerationStats()
+    checker = checker or DuplicateChecker(
+        method=SimilarityMethod.STRING, string_threshold=string_threshold
+    )
+    gen_kwargs = {
+        "model": model,
+        "card_type": card_type,
+        "output_format": output_format,
+        "temperature": temperature,
+        "stream": stream,
+        "cap_tokens": cap_tokens,
+        "num_ctx": num_ctx,
+        "timeout": timeout,
+        "latency": latency,
+        "limiter": GENERATION_LIMITER if adaptive else None,
+    }
+
+    cards = [Card(c.front, c.back, c.type) for c in existing or []]
+    dedup = checker.new_run()
+    new: dict[str, list[Flashcard]] = {}
+    for chunk in chunks:
+        if chunk.id in new:
+            continue
+        source = chunk
+        if retriever is not None:
+            related = [c for c in retriever.retrieve(chunk.content, k=CONTEXT_CHUNKS + 1)
+                       if c.id != chunk.id][:CONTEXT_CHUNKS]
+            if related:
+                context = "\n\n".join([chunk.content, *(c.content for c in related)])
+                source = Chunk(content=context, header=chunk.header, level=chunk.level)
+        start = len(cards)
+        run = _Run(cards, checker, stats, start + cards_per_chunk, verbose, on_card, dedup=dedup)
+        _fill_from_chunks(
+            run, [source], speculation=speculation, max_in_flight=max_in_flight, **gen_kwargs
+        )
+        new[chunk.id] = [card.to_flashcard() for card in cards[start:]]
 
-        for chunk in retriever.get_all_chunks():
-            if len(cards) >= num_cards:
-                break
+    if adaptive:
+        stats.concurrency_limit = GENERATION_LIMITER.limit
+    if checker.limiter is not None:
+        stats.embed_concurrency_limit = checker.limiter.limit
 
-            attempts = 0
-            while len(cards) < num_cards and attempts < 3:
-                card = generate_single_card(
-                    chunk.content,
-                    model=model,
-                    card_type=card_type,
-                    output_format=output_format,
-                    temperature=temperature,
-                    verbose=verbose
-                )
-
-                if card and not checker.is_duplicate(card, cards):
-                    cards.append(card)
-                    break
-                attempts += 1
-
-    return cards
+    return new
@@ -0,0 +1,125 @@
+"""Per-request deadlines and hedged requests for LLM calls."""
+
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+from .stats import GenerationStats
+
+HEDGE_QUANTILE = 0.9     # Hedge requests still running past this latency quantile
+MIN_SAMPLES = 10         # Completed requests needed before hedging starts
+WINDOW = 200             # Most recent latencies kept
+
+
+class LatencyTracker:
+    """Rolling window of completed request latencies, shared by one run."""
+
+    def __init__(self, window: int = WINDOW, min_samples: int = MIN_SAMPLES):
+        self.min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> float | None:
+        """Latency at quantile ``q``, or None until min_samples have been seen."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class _LinkedEvent:
+    """Set when either its own event or the caller's cancel event is set."""
+
+    def __init__(self, outer: threading.Event | None):
+        self.outer = outer
+        self.own = threading.Event()
+
+    def is_set(self) -> bool:
+        return self.own.is_set() or (self.outer is not None and self.outer.is_set())
+
+
+def _start(fn: Callable, cancel: _LinkedEvent) -> Future:
+    # Daemon threads, so a request stalled on the socket cannot block interpreter exit
+    future = Future()
+
+    def run():
+        started = time.monotonic()
+        try:
+            future.set_result((fn(cancel), time.monotonic() - started))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+def hedged_call(
+        fn: Callable,
+        timeout: float | None = None,
+        latency: LatencyTracker | None = None,
+        cancel: threading.Event | None = None,
+        stats: GenerationStats | None = None,
+):
+    """
+    Run ``fn(cancel_event)`` with a deadline and an optional hedge.
+
+    ``fn`` must return once its event is set, and should bound how long it
+    can block between checks. With ``latency``, a duplicate request is
+    started when the first one outlives the observed p90, and the first to
+    finish wins; the other is cancelled. Raises TimeoutError once
+    ``timeout`` seconds have passed without a result.
+    """
+    start = time.monotonic()
+    deadline = start + timeout if timeout else None
+    hedge_after = latency.quantile(HEDGE_QUANTILE) if latency is not None else None
+
+    events = [_LinkedEvent(cancel)]
+    futures = {_start(fn, events[0]): 0}
+    error: BaseException | None = None
+
+    try:
+        while futures:
+            now = time.monotonic()
+            waits = []
+            if deadline is not None:
+                waits.append(deadline - now)
+            if hedge_after is not None and len(events) == 1:
+                waits.append(start + hedge_after - now)
+            done, _ = wait(futures, timeout=max(0.0, min(waits)) if waits else None,
+                           return_when=FIRST_COMPLETED)
+
+            for future in done:
+                index = futures.pop(future)
+                try:
+                    result, seconds = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if latency is not None:
+                    latency.record(seconds)
+                if index and stats is not None:
+                    stats.incr("hedge_wins")
+                return result
+
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                if stats is not None:
+                    stats.incr("timeouts")
+                raise TimeoutError(f"LLM request exceeded {timeout}s")
+            if hedge_after is not None and len(events) == 1 and now >= start + hedge_after:
+                events.append(_LinkedEvent(cancel))
+                futures[_start(fn, events[1])] = 1
+                if stats is not None:
+                    stats.incr("hedges")
+    finally:
+        for event in events:
+            event.own.set()
+
+    raise error
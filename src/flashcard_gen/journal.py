@@ -0,0 +1,109 @@
+"""Append-only job journal so long generation runs can be resumed."""
+
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+from .schema import Card
+
+
+class JournalMismatch(ValueError):
+    """A journal being resumed was written by a run with other notes or settings."""
+
+
+def run_header(notes: str, **settings) -> dict:
+    """Header identifying a run: a hash of the notes plus the settings that shape its cards."""
+    return {"notes": hashlib.sha1(notes.encode()).hexdigest(), **settings}
+
+
+class Journal:
+    """
+    JSONL log of a generation run.
+
+    The first line is the run's header (see run_header). Each accepted card
+    is written with the id of the chunk (or ``kw:<keyword>``) it came from
+    and, when available, its front embedding. Chunks that are used up are
+    marked done. Lines are flushed as they are written, so a crashed run
+    loses at most the card in progress.
+
+    With ``resume=True`` an existing journal is loaded and appended to;
+    otherwise it is truncated. A torn last line from an interrupted write is
+    cut off before appending. Resuming raises JournalMismatch when ``run``
+    differs from the journal's header, so one run's cards never seed another.
+    """
+
+    def __init__(self, path: str | Path, resume: bool = False, run: dict | None = None):
+        self.path = Path(path)
+        self.run = run
+        self.cards: list[Card] = []
+        self.finished: set[str] = set()
+        self.fronts_by_source: dict[str, list[str]] = {}
+        self.embeddings: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+
+        header = None
+        if resume and self.path.exists():
+            header = self._load()
+            if header is not None and header != run:
+                raise JournalMismatch(
+                    f"{self.path} was written by a different run (other notes or settings); "
+                    f"remove it or run without --resume"
+                )
+        self._file = open(self.path, "a" if header is not None else "w", encoding="utf-8")
+        if header is None:
+            self._write({"event": "run", "run": run})
+
+    def _load(self) -> dict | None:
+        """Read the journal and cut off a torn last line. Returns its header, if any."""
+        header = None
+        complete = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Partial last line from an interrupted write
+                complete += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+
+                source = entry.get("source")
+                if entry.get("event") == "run":
+                    header = entry["run"]
+                elif entry.get("event") == "card":
+                    card = Card.from_dict(entry["card"])
+                    if card is None:
+                        continue
+                    self.cards.append(card)
+                    self.fronts_by_source.setdefault(source, []).append(card.front)
+                    if entry.get("embedding"):
+                        self.embeddings[card.front] = entry["embedding"]
+                elif entry.get("event") == "done":
+                    self.finished.add(source)
+
+        if header is None and (self.cards or self.finished):
+            raise JournalMismatch(
+                f"{self.path} has no run header; remove it or run without --resume"
+            )
+        if complete < self.path.stat().st_size:
+            with open(self.path, "r+b") as f:
+                f.truncate(complete)
+        return header
+
+    def _write(self, entry: dict) -> None:
+        with self._lock:
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+
+    def record_card(self, source: str, card: Card, embedding: list[float] | None = None) -> None:
+        entry = {"event": "card", "source": source, "card": card.as_dict()}
+        if embedding is not None:
+            entry["embedding"] = [float(x) for x in embedding]
+        self._write(entry)
+
+    def record_done(self, source: str) -> None:
+        self._write({"event": "done", "source": source})
+
+    def close(self) -> None:
+        self._file.close()
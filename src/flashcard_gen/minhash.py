@@ -0,0 +1,89 @@
+"""MinHash fingerprints for dropping near-duplicate chunks before generation."""
+
+import hashlib
+import re
+
+import numpy as np
+
+from .schema import Chunk
+
+SHINGLE_SIZE = 5             # Words per shingle
+NUM_PERM = 128               # MinHash permutations per signature
+BANDS = 32                   # LSH bands; NUM_PERM / BANDS rows each
+PRIME = 4294967311           # Smallest prime above 2**32
+
+_words = re.compile(r"\w+")
+_rng = np.random.default_rng(0)
+# a * x + b stays below 2**64 for 32-bit shingle hashes, so uint64 math does not overflow
+_A = _rng.integers(1, 2**32, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 2**32, size=NUM_PERM, dtype=np.uint64)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """32-bit hashes of the distinct word ``size``-grams in text, case-folded."""
+    words = _words.findall(text.lower())
+    grams = {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(g.encode(), digest_size=4).digest(), "big") for g in grams],
+        dtype=np.uint64,
+    )
+
+
+def signature(text: str) -> np.ndarray:
+    """MinHash signature of text's shingles."""
+    hashes = shingles(text)
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % PRIME).min(axis=1)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(a == b))
+
+
+def near_duplicate_groups(texts: list[str], threshold: float = 0.8) -> list[list[int]]:
+    """
+    Group texts whose estimated Jaccard similarity reaches ``threshold``.
+
+    Candidate pairs come from LSH banding, so texts are never compared with
+    every other text. Groups are linked transitively and returned as lists of
+    indexes in input order; texts with no near duplicate form their own group.
+    """
+    signatures = [signature(t) for t in texts]
+    parent = list(range(len(texts)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    rows = NUM_PERM // BANDS
+    for band in range(BANDS):
+        buckets: dict[bytes, list[int]] = {}
+        for i, sig in enumerate(signatures):
+            buckets.setdefault(sig[band * rows:(band + 1) * rows].tobytes(), []).append(i)
+        for members in buckets.values():
+            for n, i in enumerate(members):
+                for j in members[:n]:
+                    root_i, root_j = find(i), find(j)
+                    if root_i != root_j and similarity(signatures[i], signatures[j]) >= threshold:
+                        parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    groups: dict[int, list[int]] = {}
+    for i in range(len(texts)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+def drop_near_duplicates(chunks: list[Chunk], threshold: float = 0.8) -> list[Chunk]:
+    """
+    Keep one chunk per group of near-duplicate chunks.
+
+    The longest chunk of each group is kept, since it usually contains the
+    others, and kept chunks stay in document order.
+    """
+    if len(chunks) < 2:
+        return list(chunks)
+    groups = near_duplicate_groups([c.content for c in chunks], threshold)
+    keep = {max(group, key=lambda i: len(chunks[i].content)) for group in groups}
+    return [chunk for i, chunk in enumerate(chunks) if i in keep]
@@ -2,40 +2,79 @@ import json
 import re
 from abc import ABC, abstractmethod
 
-from pydantic import ValidationError
-from .schema import Flashcard, CardType
+from .schema import Card, CardType
 
 class BaseParser(ABC):
+    # A streamed card can only become complete in a part containing this; empty if never
+    complete_on = ""
+
     @abstractmethod
-    def parse(self, raw: str) -> Flashcard | None:
+    def parse(self, raw: str) -> Card | None:
         pass
 
+    def parse_partial(self, partial: str) -> Card | None:
+        """
+        Parse a response that is still streaming.
+
+        Returns a card only once ``partial`` already holds a complete one, so the
+        stream can be closed early. The default never stops early.
+        """
+        return None
+
+def _first_object(text: str) -> dict | None:
+    """The first JSON object in text, decoded in full so braces inside strings are kept."""
+    decoder = json.JSONDecoder()
+    start = text.find("{")
+    while start != -1:
+        try:
+            data, _ = decoder.raw_decode(text, start)
+            if isinstance(data, dict):
+                return data
+        except json.JSONDecodeError:
+            pass
+        start = text.find("{", start + 1)
+    return None
+
+
 class JSONParser(BaseParser):
-    def parse(self, raw: str) -> Flashcard | None:
+    complete_on = "}"
+
+    def parse(self, raw: str) -> Card | None:
         text = raw.strip()
 
         # Remove markdown fences
         text = re.sub(r"```json?\s*|\s*```", "", text)
+        text = re.sub(r",\s*([}\]])", r"\1", text)  # Fix trailing comma
 
-        # Find JSON object
-        match = re.search(r"\{[^{}]+\}", text)
-        if not match:
+        # Find JSON object; cloze fronts contain {{c1::...}}, so no brace-matching regex
+        data = _first_object(text)
+        if data is None:
             return None
+        return Card.from_dict(data)
 
-        text = match.group(0)
-        text = re.sub(r",\s*([}\]])", r"\1", text)  # Fix trailing comma
+    def parse_partial(self, partial: str) -> Card | None:
+        # The first object is complete once its closing brace has arrived
+        if "}" not in partial:
+            return None
+        return self.parse(partial)
+
+
+class SchemaParser(BaseParser):
+    """Parse output constrained by Ollama's ``format`` JSON schema."""
 
+    def parse(self, raw: str) -> Card | None:
         try:
-            data = json.loads(text)
-            return Flashcard(**data)
-        except:
+            data = json.loads(raw)
+        except json.JSONDecodeError:
             return None
+        return Card.from_dict(data) if isinstance(data, dict) else None
 
 
 class SimpleParser(BaseParser):
     """Parse Q:/A: format output."""
+    complete_on = "\n"
 
-    def parse(self, raw: str) -> Flashcard | None:
+    def parse(self, raw: str) -> Card | None:
         raw = raw.strip()
 
         q_match = re.search(r"Q:\s*(.+?)(?:\n|$)", raw, re.IGNORECASE)
@@ -45,20 +84,35 @@ class SimpleParser(BaseParser):
             front = q_match.group(1).strip()
             back = a_match.group(1).strip()
             if front and back:
-                return Flashcard(front=front, back=back, type=CardType.BASIC)
+                return Card.validated(front, back, CardType.BASIC)
 
         return None
 
+    def parse_partial(self, partial: str) -> Card | None:
+        # Complete once both the Q: and A: lines have been terminated
+        q_match = re.search(r"Q:\s*(.+?)\n", partial, re.IGNORECASE)
+        a_match = re.search(r"A:\s*(.+?)\n", partial, re.IGNORECASE)
+        if q_match and a_match:
+            return self.parse(partial)
+        return None
+
 
 class ClozeParser(BaseParser):
     """Parse C: format for cloze cards."""
+    complete_on = "\n"
 
-    def parse(self, raw: str) -> Flashcard | None:
+    def parse(self, raw: str) -> Card | None:
         match = re.search(r"C:\s*(.+?)(?:\n|$)", raw, re.IGNORECASE)
 
         if match:
             front = match.group(1).strip()
             if "{{c1::" in front:
-                return Flashcard(front=front, back="", type=CardType.CLOZE)
+                return Card.validated(front, "", CardType.CLOZE)
+
+        return None
 
-        return None
\ No newline at end of file
+    def parse_partial(self, partial: str) -> Card | None:
+        # Complete once the C: line has been terminated
+        if re.search(r"C:\s*(.+?)\n", partial, re.IGNORECASE):
+            return self.parse(partial)
+        return None
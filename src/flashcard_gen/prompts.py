@@ -46,4 +46,18 @@ Generate from:""",
 {"front": "sentence with {{c1::hidden}}", "back": "", "type": "cloze"}
 
 Generate from:""",
-}
\ No newline at end of file
+}
+
+# Appended when a chunk already produced cards, so retries ask for something new.
+AVOID_PROMPT = "Do NOT repeat or rephrase any of these existing cards:"
+
+# Token caps (num_predict) per prompt. A card needs far fewer tokens than
+# small models tend to produce, so these just cut off the rambling.
+NUM_PREDICT = {
+    "basic_simple": 96,
+    "basic_json": 128,
+    "cloze_simple": 80,
+    "cloze_json": 112,
+    "basic_schema": 128,
+    "cloze_schema": 112,
+}
@@ -0,0 +1,131 @@
+"""LRU caches for retrieval queries: query embeddings and search results."""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from .embeddings import BaseEmbedder
+
+MAX_EMBEDDINGS = 4096   # Query vectors kept, across all encoders
+MAX_RESULTS = 4096      # Search results kept, across all index versions
+
+
+class QueryCache:
+    """
+    Query embeddings by (encoder name, query) and search results by
+    (query, k, index version), each in an LRU of bounded size.
+
+    Index versions are fingerprints of the indexed content (see
+    FAISSRetriever.version and VaultIndex.version). Any change to an index
+    gives it a new version, so its old results stop matching and age out;
+    nothing has to be invalidated by hand, and results saved by one run are
+    valid in the next when the index is unchanged. A result hit skips both
+    the encoder and the index search.
+
+    ``save`` and ``load`` keep both caches in a JSON file between runs.
+    """
+
+    def __init__(self, max_embeddings: int = MAX_EMBEDDINGS, max_results: int = MAX_RESULTS):
+        self.max_embeddings = max_embeddings
+        self.max_results = max_results
+        self._embeddings: OrderedDict[tuple[str, str], np.ndarray] = OrderedDict()
+        self._results: OrderedDict[tuple[str, int, str], list] = OrderedDict()
+        self._lock = threading.Lock()
+        self.embedding_hits = 0
+        self.embedding_misses = 0
+        self.result_hits = 0
+        self.result_misses = 0
+
+    def embed(self, embedder: BaseEmbedder, query: str) -> np.ndarray:
+        """The query's (1, dim) float32 vector, encoded only on a miss."""
+        key = (embedder.name, query)
+        with self._lock:
+            vector = self._embeddings.get(key)
+            if vector is not None:
+                self._embeddings.move_to_end(key)
+                self.embedding_hits += 1
+                return vector[None, :]
+            self.embedding_misses += 1
+
+        vector = embedder.embed([query])[0]
+        with self._lock:
+            self._put(self._embeddings, key, vector, self.max_embeddings)
+        return vector[None, :]
+
+    def results(self, query: str, k: int, version: str) -> list | None:
+        """Cached results of a search, or None."""
+        key = (query, k, version)
+        with self._lock:
+            found = self._results.get(key)
+            if found is None:
+                self.result_misses += 1
+                return None
+            self._results.move_to_end(key)
+            self.result_hits += 1
+            return found
+
+    def put_results(self, query: str, k: int, version: str, results: list) -> None:
+        """Store a search's results. They must be JSON-serializable to be saved."""
+        with self._lock:
+            self._put(self._results, (query, k, version), results, self.max_results)
+
+    @staticmethod
+    def _put(cache: OrderedDict, key, value, limit: int) -> None:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > limit:
+            cache.popitem(last=False)
+
+    def save(self, path: str | Path) -> None:
+        """Write both caches to a JSON file, least recently used first."""
+        with self._lock:
+            state = {
+                "embeddings": [[name, query, [float(x) for x in vector]]
+                               for (name, query), vector in self._embeddings.items()],
+                "results": [[query, k, version, results]
+                            for (query, k, version), results in self._results.items()],
+            }
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def load(self, path: str | Path) -> None:
+        """Add entries saved with ``save``. A missing or unreadable file is ignored."""
+        try:
+            state = json.loads(Path(path).read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return
+        with self._lock:
+            for name, query, vector in state.get("embeddings", []):
+                vector = np.asarray(vector, dtype=np.float32)
+                self._put(self._embeddings, (name, query), vector, self.max_embeddings)
+            for query, k, version, results in state.get("results", []):
+                self._put(self._results, (query, k, version), results, self.max_results)
+
+    def __len__(self) -> int:
+        return len(self._embeddings) + len(self._results)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._embeddings.clear()
+            self._results.clear()
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "embeddings": len(self._embeddings),
+                "results": len(self._results),
+                "embedding_hits": self.embedding_hits,
+                "embedding_misses": self.embedding_misses,
+                "result_hits": self.result_hits,
+                "result_misses": self.result_misses,
+            }
+
+
+# Process-wide cache used by every retriever unless one is passed in
+SHARED_QUERY_CACHE = QueryCache()
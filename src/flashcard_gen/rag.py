@@ -1,61 +1,165 @@
 # src/flashcard_gen/rag.py
+import hashlib
+
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
 from .chunker import BaseChunker, Chunk, ChunkHeaderThenParagraph
+from .embeddings import BaseEmbedder, get_embedder
+from .minhash import drop_near_duplicates
+from .query_cache import SHARED_QUERY_CACHE, QueryCache
+
+INDEX_TYPES = ("flat", "sq8", "pq")
+PQ_DIMS_PER_CODE = 8     # Vector dimensions per one-byte PQ code (384 dims -> 48 bytes)
+PQ_BITS = 8              # Bits per PQ code, 256 centroids per sub-quantizer
+PQ_MIN_CHUNKS = 10_000   # faiss wants 39 training points per centroid; smaller indexes use SQ8
+TRAIN_SAMPLE = 65536     # Most vectors used to train a quantizer
+INDEX_BATCH = 1024       # Chunks embedded and added to the index at a time
+
+
+def _pq_codes(dim: int) -> int:
+    """Most sub-quantizers that divide dim with PQ_DIMS_PER_CODE or more dims each."""
+    return next(m for m in range(max(1, dim // PQ_DIMS_PER_CODE), 0, -1) if dim % m == 0)
 
 
 class FAISSRetriever:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
-        self.encoder = SentenceTransformer(model_name)
+    def __init__(
+            self,
+            model_name: str = "all-MiniLM-L6-v2",
+            embedder: BaseEmbedder | str | None = None,
+            index_type: str = "flat",
+            query_cache: QueryCache | None = None,
+    ):
+        """
+        ``embedder`` is a BaseEmbedder or a spec for get_embedder; it defaults to
+        the sentence-transformers model ``model_name``.
+
+        ``index_type`` picks how vectors are stored: ``flat`` keeps float32
+        and searches exactly, ``sq8`` keeps one byte per dimension (4x
+        smaller) and ``pq`` one byte per PQ_DIMS_PER_CODE dimensions (32x
+        smaller). The quantized indexes are approximate; see recall().
+
+        Query vectors and search results are kept in ``query_cache``
+        (default: the process-wide SHARED_QUERY_CACHE).
+        """
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type: {index_type}. "
+                             f"Available: {', '.join(INDEX_TYPES)}")
+        if isinstance(embedder, str):
+            embedder = get_embedder(embedder)
+        self.embedder = embedder or get_embedder(f"sentence-transformers:{model_name}")
+        self.index_type = index_type
+        self.index_kind = index_type
         self.index = None
+        self.query_cache = query_cache if query_cache is not None else SHARED_QUERY_CACHE
         self.chunks: list[Chunk] = []
-
-    def index_chunks(self, chunks: list[Chunk]) -> None:
-        """Index pre-chunked content."""
-        self.chunks = chunks
+        self.dropped_chunks = 0
+        self.version = ""
+
+    def index_chunks(self, chunks: list[Chunk], chunk_threshold: float | None = None) -> None:
+        """
+        Index pre-chunked content. With ``chunk_threshold`` only one chunk per
+        group of near duplicates (see drop_near_duplicates) is indexed.
+        Embeddings are streamed into the index INDEX_BATCH chunks at a time,
+        from a pool of encoder processes when the embedder has one.
+        """
+        self.chunks = drop_near_duplicates(chunks, chunk_threshold) if chunk_threshold else chunks
+        self.dropped_chunks = len(chunks) - len(self.chunks)
 
         if not self.chunks:
             return
 
         texts = [c.content for c in self.chunks]
-        embeddings = self.encoder.encode(texts)
-        embeddings = np.array(embeddings).astype('float32')
-
-        dimension = embeddings.shape[1]
-        self.index = faiss.IndexFlatL2(dimension)
-        self.index.add(embeddings)
-
-    def index_document(self, content: str, chunker: BaseChunker |None = None, max_words: int = 300) -> None:
+        self.index = self._build_index(self.embedder.embed_batches(texts, INDEX_BATCH), len(texts))
+
+        # Same embedder, index kind and chunks in the same order give the same version
+        fingerprint = "\n".join([self.embedder.name, self.index_kind, *(c.id for c in self.chunks)])
+        self.version = hashlib.sha1(fingerprint.encode()).hexdigest()
+
+    def _new_index(self, dim: int, total: int) -> faiss.Index:
+        kind = self.index_type
+        if kind == "pq" and total < PQ_MIN_CHUNKS:
+            kind = "sq8"
+        self.index_kind = kind
+
+        if kind == "sq8":
+            return faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+        if kind == "pq":
+            return faiss.IndexPQ(dim, _pq_codes(dim), PQ_BITS, faiss.METRIC_L2)
+        return faiss.IndexFlatL2(dim)
+
+    def _build_index(self, batches, total: int) -> faiss.Index:
+        """
+        Add a stream of embedding batches to a new index. Quantized indexes
+        are trained on the first TRAIN_SAMPLE vectors, which are held until
+        then; every other batch is added as it arrives.
+        """
+        index = None
+        held: list[np.ndarray] = []
+        for batch in batches:
+            if index is None:
+                index = self._new_index(batch.shape[1], total)
+            if index.is_trained:
+                index.add(batch)
+                continue
+            held.append(batch)
+            if sum(len(b) for b in held) >= min(TRAIN_SAMPLE, total):
+                sample = np.vstack(held)
+                held = []
+                index.train(sample)
+                index.add(sample)
+        return index
+
+    @property
+    def index_bytes(self) -> int:
+        """Serialized size of the vector index."""
+        return faiss.serialize_index(self.index).nbytes if self.index is not None else 0
+
+    def recall(self, k: int = 10, sample: int = 200) -> float:
+        """
+        Mean recall@k of the index against exact float32 search, using a
+        sample of the indexed chunks as queries. Chunk vectors come from the
+        embedder's cache, so this is cheap right after indexing. 1.0 for flat.
+        """
+        if self.index is None or self.index_kind == "flat":
+            return 1.0
+        vectors = self.embedder.embed([c.content for c in self.chunks])
+        exact = faiss.IndexFlatL2(vectors.shape[1])
+        exact.add(vectors)
+
+        rng = np.random.default_rng(0)
+        rows = rng.choice(len(vectors), min(sample, len(vectors)), replace=False)
+        k = min(k, len(vectors))
+        _, truth = exact.search(vectors[rows], k)
+        _, found = self.index.search(vectors[rows], k)
+        return float(np.mean([len(set(t) & set(f)) / k for t, f in zip(truth, found)]))
+
+    def index_document(
+            self,
+            content: str,
+            chunker: BaseChunker | None = None,
+            max_words: int = 300,
+            chunk_threshold: float | None = None,
+    ) -> None:
         """Hierarchical chunking then FAISS index."""
         chunker = chunker or ChunkHeaderThenParagraph()
         chunks = chunker.chunk(content)
-        self.index_chunks(chunks)
-
-        if not self.chunks:
-            return
-
-        texts = [c.content for c in self.chunks]
-        embeddings = self.encoder.encode(texts)
-        embeddings = np.array(embeddings).astype('float32')
-
-        dimension = embeddings.shape[1]
-        self.index = faiss.IndexFlatL2(dimension)
-        self.index.add(embeddings)
+        self.index_chunks(chunks, chunk_threshold)
 
     def retrieve(self, query: str, k: int = 3) -> list[Chunk]:
-        """Retrieve top-k relevant chunks."""
+        """Retrieve top-k relevant chunks, from the query cache when this index was searched."""
         if not self.index or not self.chunks:
             return self.chunks[:k]
 
-        query_embedding = self.encoder.encode([query])
-        query_embedding = np.array(query_embedding).astype('float32')
-
         k = min(k, len(self.chunks))
-        distances, indices = self.index.search(query_embedding, k)
-
-        return [self.chunks[i] for i in indices[0] if i < len(self.chunks)]
+        rows = self.query_cache.results(query, k, self.version)
+        if rows is None:
+            query_embedding = self.query_cache.embed(self.embedder, query)
+            distances, indices = self.index.search(query_embedding, k)
+            rows = [int(i) for i in indices[0] if 0 <= i < len(self.chunks)]
+            self.query_cache.put_results(query, k, self.version, rows)
+
+        return [self.chunks[i] for i in rows]
 
     def get_all_chunks(self) -> list[Chunk]:
         return self.chunks
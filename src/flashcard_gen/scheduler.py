@@ -0,0 +1,133 @@
+"""Schedulers that decide which chunk the fill loop calls next."""
+
+import heapq
+import math
+import re
+from abc import ABC, abstractmethod
+
+from .schema import Chunk
+
+MIN_TERM_LENGTH = 4          # Shorter words are not counted as terms
+MIN_NOVELTY = 0.1            # Floor so fully covered chunks can still be picked when needed
+
+_words = re.compile(r"\w+")
+
+
+def _terms(text: str) -> set[str]:
+    return {w for w in _words.findall(text.lower()) if len(w) >= MIN_TERM_LENGTH}
+
+
+class BaseScheduler(ABC):
+    """
+    Picks the chunk for each fill-loop call.
+
+    ``states`` are the fill loop's per-chunk states; a scheduler reads their
+    ``chunk``, ``exhausted`` and ``in_flight`` fields and never changes them.
+    """
+
+    def prepare(self, states: list, keywords: list[str] | None = None,
+                fronts: list[str] | None = None) -> None:
+        """Called once before the fill loop with the keywords and accepted fronts so far."""
+        pass
+
+    @abstractmethod
+    def pick(self, states: list) -> int | None:
+        """Index of the chunk to call next, or None when every chunk is exhausted."""
+        pass
+
+    def record(self, index: int, accepted: bool) -> None:
+        """Outcome of a call on chunk ``index``."""
+        pass
+
+
+class DocumentOrderScheduler(BaseScheduler):
+    """
+    Visit chunks in passes, in document order.
+
+    A visit stays on its chunk until a card is accepted or the chunk is
+    exhausted. Concurrent callers are spread to the least busy chunk first.
+    """
+
+    def __init__(self):
+        self._visits: list[int] = []
+        self._current: int | None = None
+
+    def prepare(self, states, keywords=None, fronts=None) -> None:
+        self._visits = [0] * len(states)
+        self._current = None
+
+    def pick(self, states) -> int | None:
+        open_states = [i for i, s in enumerate(states) if not s.exhausted]
+        if not open_states:
+            return None
+        current = self._current
+        if current is not None and not states[current].exhausted and not states[current].in_flight:
+            return current
+        return min(open_states, key=lambda i: (states[i].in_flight, self._visits[i], i))
+
+    def record(self, index: int, accepted: bool) -> None:
+        if accepted:
+            self._visits[index] += 1
+            if self._current == index:
+                self._current = None
+        else:
+            self._current = index
+
+
+class CoverageScheduler(BaseScheduler):
+    """
+    Spread calls across chunks in proportion to a score computed once.
+
+    The score combines chunk size, term density (distinct terms per word),
+    keyword hits and novelty, the share of the chunk's terms not already in
+    accepted fronts. Calls come from a priority queue keyed by
+    score / (calls + 1), so high-scoring chunks get more calls, every chunk is
+    reached before any chunk gets many, and low-scoring chunks are only called
+    when the card budget needs them.
+    """
+
+    def __init__(self):
+        self.scores: list[float] = []
+        self._calls: list[int] = []
+        self._heap: list[tuple[float, int]] = []
+
+    @staticmethod
+    def score(chunk: Chunk, keywords: list[str], covered: set[str]) -> float:
+        text = chunk.content.lower()
+        num_words = len(_words.findall(text))
+        if not num_words:
+            return 0.0
+        terms = _terms(text)
+        density = len(terms) / num_words
+        hits = sum(text.count(kw.lower()) for kw in keywords)
+        novelty = len(terms - covered) / len(terms) if terms else 0.0
+        return math.log1p(num_words) * (0.5 + density) * (1 + hits) * max(novelty, MIN_NOVELTY)
+
+    def prepare(self, states, keywords=None, fronts=None) -> None:
+        covered = set().union(*(_terms(f) for f in fronts or []))
+        self.scores = [self.score(s.chunk, keywords or [], covered) for s in states]
+        self._calls = [0] * len(states)
+        self._heap = [(-score, i) for i, score in enumerate(self.scores)]
+        heapq.heapify(self._heap)
+
+    def pick(self, states) -> int | None:
+        while self._heap:
+            _, i = heapq.heappop(self._heap)
+            if states[i].exhausted:
+                continue
+            self._calls[i] += 1
+            heapq.heappush(self._heap, (-self.scores[i] / (self._calls[i] + 1), i))
+            return i
+        return None
+
+
+SCHEDULERS = {
+    "document": DocumentOrderScheduler,
+    "coverage": CoverageScheduler,
+}
+
+
+def get_scheduler(name: str) -> BaseScheduler:
+    if name not in SCHEDULERS:
+        raise ValueError(f"Unknown scheduler: {name}. Available: {', '.join(SCHEDULERS)}")
+    return SCHEDULERS[name]()
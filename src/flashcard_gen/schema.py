@@ -1,4 +1,5 @@
 from enum import Enum
+import hashlib
 import re
 from pydantic import BaseModel, field_validator, model_validator
 from dataclasses import dataclass
@@ -18,6 +19,34 @@ class Chunk:
     content: str
     header: str | None = None
     level: str = "header"
+    source: str | None = None  # Note the chunk came from, for vault-wide retrieval
+
+    @property
+    def id(self) -> str:
+        """Stable id from header and content, so unchanged sections keep it across runs."""
+        return hashlib.sha1(f"{self.header}\n{self.content}".encode()).hexdigest()[:12]
+
+CLOZE_PATTERN = re.compile(r"\{\{c\d+::.*?\}\}")
+
+
+def clean_front(front: str) -> str:
+    front = front.strip()
+    if not front:
+        raise ValueError("Front cannot be empty")
+    return front
+
+
+def clean_back(front: str, back: str, card_type: CardType) -> str:
+    """Validate based on card type. Returns the cleaned back."""
+    if card_type == CardType.BASIC:
+        back = back.strip()
+        if not back:
+            raise ValueError("Basic cards must have a non-empty back")
+    elif card_type == CardType.CLOZE:
+        if not CLOZE_PATTERN.search(front):
+            raise ValueError("Cloze cards must contain {{c1::...}} pattern")
+    return back
+
 
 class Flashcard(BaseModel):
     """A single flashcard."""
@@ -28,21 +57,12 @@ class Flashcard(BaseModel):
     @field_validator("front")
     @classmethod
     def front_not_empty(cls, v: str) -> str:
-        v = v.strip()
-        if not v:
-            raise ValueError("Front cannot be empty")
-        return v
+        return clean_front(v)
 
     @model_validator(mode="after")
     def validate_card_type(self):
         """Validate based on card type."""
-        if self.type == CardType.BASIC:
-            if not self.back.strip():
-                raise ValueError("Basic cards must have a non-empty back")
-            self.back = self.back.strip()
-        elif self.type == CardType.CLOZE:
-            if not re.search(r"\{\{c\d+::.*?\}\}", self.front):
-                raise ValueError("Cloze cards must contain {{c1::...}} pattern")
+        self.back = clean_back(self.front, self.back, self.type)
         return self
 
     def __eq__(self, other):
@@ -54,6 +74,65 @@ class Flashcard(BaseModel):
         return hash((self.front, self.back))
 
 
+@dataclass(slots=True)
+class Card:
+    """
+    Lightweight card used inside the generation pipeline.
+
+    Build it with ``Card.validated`` at the parser boundary, which applies the
+    same rules as Flashcard without pydantic, and convert accepted cards with
+    ``to_flashcard`` on the way out.
+    """
+    front: str
+    back: str = ""
+    type: CardType = CardType.BASIC
+
+    @classmethod
+    def validated(
+            cls,
+            front: str,
+            back: str = "",
+            type: CardType | str = CardType.BASIC,
+    ) -> "Card | None":
+        """Clean and validate the fields. Returns None for an invalid card."""
+        try:
+            card_type = CardType(type)
+            front = clean_front(front)
+            back = clean_back(front, back, card_type)
+        except (ValueError, AttributeError):
+            return None
+        return cls(front, back, card_type)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Card | None":
+        """Validated card from a dict such as parsed model output. Other keys are ignored."""
+        return cls.validated(data.get("front"), data.get("back") or "",
+                             data.get("type", CardType.BASIC))
+
+    def to_flashcard(self) -> Flashcard:
+        """Convert to a Flashcard without validating again."""
+        return Flashcard.model_construct(front=self.front, back=self.back, type=self.type)
+
+    def as_dict(self) -> dict:
+        return {"front": self.front, "back": self.back, "type": self.type.value}
+
+
+def flashcard_schema(card_type: str = "basic") -> dict:
+    """
+    JSON schema for a single Flashcard, for Ollama's ``format`` parameter.
+
+    All fields are required and ``type`` is pinned to card_type so constrained
+    decoding cannot drop the back or switch card types. ``"mixed"`` allows
+    every card type.
+    """
+    types = list(CardType) if card_type == "mixed" else [CardType(card_type)]
+    schema = Flashcard.model_json_schema()
+    schema["required"] = list(schema["properties"])
+    schema["properties"]["type"] = {"type": "string", "enum": [t.value for t in types]}
+    schema.pop("$defs", None)
+    return schema
+
+
 class GenerationConfig(BaseModel):
     """Configuration for flashcard generation."""
     model: str = "qwen2.5:3b"
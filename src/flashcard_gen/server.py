@@ -0,0 +1,431 @@
+"""
+Local HTTP server that keeps models, encoders and dedup indexes warm.
+
+Endpoints:
+- GET  /health    liveness check, with the adaptive concurrency limits and
+                  query cache counters
+- POST /generate  JSON request -> {"cards": [...], "stats": {...}}
+- POST /stream    JSON request -> NDJSON, one {"card": ...} line per accepted
+                  card, then {"done": true, "stats": {...}}
+
+Request fields mirror the CLI options: notes (required), num_cards, keywords,
+model, card_type, output_format, chunker, chunk_threshold, context_fraction,
+num_ctx, rag, index, pipeline, vault, shard_by, threshold, dedup, embedder,
+scheduler, temperature, speculation, stream, cap_tokens, timeout, hedge, adaptive
+and store. Unknown fields and values of the wrong type or out of range
+are rejected with 400; null fields take their default.
+"""
+
+import json
+import queue
+import select
+import socket
+import socketserver
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from .chunker import get_chunker
+from .client import get_client
+from .concurrency import EMBEDDING_LIMITER, GENERATION_LIMITER
+from .duplicate_check import DuplicateChecker
+from .embeddings import MAX_CACHE_ENTRIES, SHARED_CACHE
+from .generate import generate_flashcard_set, generate_flashcard_set_rag
+from .query_cache import SHARED_QUERY_CACHE
+from .rag import INDEX_TYPES
+from .scheduler import SCHEDULERS, get_scheduler
+from .schema import Flashcard, SimilarityMethod
+from .stats import GenerationStats
+from .store import CardStore
+from .tokenizer import get_tokenizer, token_budget
+from .vault import SHARD_BY, VAULT_INDEX_DIR, VaultIndex
+
+DISCONNECT_POLL = 0.5  # Seconds between checks for a closed client while no card is ready
+
+# Request field -> (type, allowed values or a check on the value, what the check requires)
+PARAMS = {
+    "notes": (str, lambda v: bool(v.strip()), "a non-empty string"),
+    "num_cards": (int, lambda v: v >= 1, "at least 1"),
+    "keywords": (list, lambda v: all(isinstance(k, str) for k in v), "a list of strings"),
+    "model": (str, None, None),
+    "card_type": (str, ("basic", "cloze", "mixed"), None),
+    "output_format": (str, ("simple", "json", "schema"), None),
+    "chunker": (str, ("header", "paragraph", "length", "hierarchical"), None),
+    "chunk_threshold": (float, lambda v: 0 < v <= 1, "in (0, 1]"),
+    "context_fraction": (float, lambda v: 0 < v <= 1, "in (0, 1]"),
+    "num_ctx": (int, lambda v: v >= 1, "at least 1"),
+    "rag": (bool, None, None),
+    "index": (str, INDEX_TYPES, None),
+    "pipeline": (bool, None, None),
+    "vault": (str, None, None),
+    "shard_by": (str, SHARD_BY, None),
+    "threshold": (float, lambda v: 0 <= v <= 1, "in [0, 1]"),
+    "dedup": (str, tuple(m.value for m in SimilarityMethod), None),
+    "embedder": (str, None, None),
+    "scheduler": (str, tuple(SCHEDULERS), None),
+    "temperature": (float, lambda v: v >= 0, "at least 0"),
+    "speculation": (float, lambda v: v >= 1, "at least 1"),
+    "stream": (bool, None, None),
+    "cap_tokens": (bool, None, None),
+    "timeout": (float, lambda v: v > 0, "positive"),
+    "hedge": (bool, None, None),
+    "adaptive": (bool, None, None),
+    "store": (str, None, None),
+}
+
+
+def validate_params(params: dict) -> None:
+    """
+    Raise ValueError for a missing ``notes`` or for any unknown field, or
+    field of the wrong type or out of range. Null fields take their default.
+    """
+    if params.get("notes") is None:
+        raise ValueError("'notes' must be a non-empty string")
+    for name, value in params.items():
+        if name not in PARAMS:
+            raise ValueError(f"Unknown field: {name!r}. Available: {', '.join(PARAMS)}")
+        if value is None:
+            continue
+        kind, allowed, requires = PARAMS[name]
+        # bool is an int in Python, but true is not a number of cards
+        ok = isinstance(value, int | float) if kind is float else isinstance(value, kind)
+        if not ok or (kind is not bool and isinstance(value, bool)):
+            raise ValueError(f"{name!r} must be of type {kind.__name__}")
+        if isinstance(allowed, tuple) and value not in allowed:
+            raise ValueError(f"{name!r} must be one of: {', '.join(allowed)}")
+        if callable(allowed) and not allowed(value):
+            raise ValueError(f"{name!r} must be {requires}")
+
+
+class ServerState:
+    """Warm state shared by all requests."""
+
+    def __init__(self, verbose: bool = False, embedding_dtype: str = "float32"):
+        self.verbose = verbose
+        self.embedding_dtype = embedding_dtype
+        self._checkers: dict[str, DuplicateChecker] = {}
+        self._vaults: dict[str, VaultIndex] = {}
+        self._lock = threading.Lock()
+
+    def checker_for(
+            self,
+            store_path: str,
+            threshold: float,
+            dedup: str = "string",
+            embedder: str | None = None,
+            adaptive: bool = False,
+    ) -> DuplicateChecker:
+        """One history-backed checker per store and settings, built on first use."""
+        key = f"{Path(store_path).resolve()}:{threshold}:{dedup}:{embedder}:{adaptive}"
+        with self._lock:
+            if key not in self._checkers:
+                self._checkers[key] = DuplicateChecker(
+                    method=SimilarityMethod(dedup),
+                    string_threshold=threshold,
+                    store=CardStore.open(store_path),
+                    embedder=embedder,
+                    limiter=EMBEDDING_LIMITER if adaptive else None,
+                    dtype=self.embedding_dtype,
+                )
+            return self._checkers[key]
+
+    def vault_for(self, root: str, embedder: str | None, chunker: str, shard_by: str) -> VaultIndex:
+        """
+        One vault index per directory and settings, loaded on first use and
+        synced with the directory on every request.
+        """
+        key = f"{Path(root).resolve()}:{embedder}:{chunker}:{shard_by}"
+        with self._lock:
+            if key not in self._vaults:
+                self._vaults[key] = VaultIndex.load(
+                    Path(root) / VAULT_INDEX_DIR, embedder, get_chunker(chunker), shard_by
+                )
+            vault = self._vaults[key]
+        if any(vault.sync(root)):
+            vault.save(Path(root) / VAULT_INDEX_DIR)
+        return vault
+
+    def generate(
+            self,
+            params: dict,
+            on_card=None,
+            cancel: threading.Event | None = None,
+    ) -> tuple[list[Flashcard], GenerationStats]:
+        """
+        Run one request. Raises ValueError for invalid ``params`` (see
+        validate_params); setting ``cancel`` ends generation early.
+        """
+        validate_params(params)
+        params = {name: value for name, value in params.items() if value is not None}
+        notes = params["notes"]
+
+        model = params.get("model", "qwen2.5:3b")
+        max_tokens = tokenizer = None
+        if params.get("context_fraction"):
+            max_tokens = token_budget(params["context_fraction"], params.get("num_ctx"))
+            tokenizer = get_tokenizer(model)
+
+        threshold = params.get("threshold", 0.7)
+        dedup = params.get("dedup", "string")
+        embedder = params.get("embedder")
+        adaptive = params.get("adaptive", False)
+        checker = None
+        if params.get("store"):
+            checker = self.checker_for(params["store"], threshold, dedup, embedder, adaptive)
+        elif dedup != "string":
+            checker = DuplicateChecker(
+                method=SimilarityMethod(dedup), string_threshold=threshold, embedder=embedder,
+                limiter=EMBEDDING_LIMITER if adaptive else None,
+                dtype=self.embedding_dtype,
+            )
+
+        stats = GenerationStats()
+        kwargs = {
+            "notes": notes,
+            "num_cards": params.get("num_cards", 5),
+            "keywords": params.get("keywords"),
+            "model": model,
+            "card_type": params.get("card_type", "basic"),
+            "output_format": params.get("output_format", "simple"),
+            "chunker": get_chunker(params.get("chunker", "hierarchical"), max_tokens, tokenizer),
+            "string_threshold": threshold,
+            "temperature": params.get("temperature", 0.7),
+            "verbose": self.verbose,
+            "stats": stats,
+            "speculation": params.get("speculation", 1.0),
+            "stream": params.get("stream", False),
+            "cap_tokens": params.get("cap_tokens", False),
+            "num_ctx": params.get("num_ctx"),
+            "checker": checker,
+            "on_card": on_card,
+            "chunk_threshold": params.get("chunk_threshold"),
+            "scheduler": get_scheduler(params.get("scheduler", "document")),
+            "timeout": params.get("timeout"),
+            "hedge": params.get("hedge", False),
+            "adaptive": adaptive,
+            "cancel": cancel,
+        }
+
+        vault = None
+        if params.get("vault"):
+            vault = self.vault_for(params["vault"], embedder, params.get("chunker", "hierarchical"),
+                                   params.get("shard_by", "folder"))
+
+        if params.get("rag") or vault is not None:
+            cards = generate_flashcard_set_rag(
+                **kwargs, embedder=embedder, index_type=params.get("index", "flat"), vault=vault,
+                pipeline=params.get("pipeline", False),
+            )
+        else:
+            cards = generate_flashcard_set(**kwargs)
+
+        if checker is not None and checker.store is not None:
+            with self._lock:
+                checker.commit(cards)
+        return cards, stats
+
+
+class FlashcardHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "flashcard-gen"
+
+    @property
+    def state(self) -> ServerState:
+        return self.server.state
+
+    def address_string(self) -> str:
+        # Unix socket clients have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        if self.state.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict | None:
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            params = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            self._send_json(400, {"error": f"Invalid JSON: {e}"})
+            return None
+        if not isinstance(params, dict):
+            self._send_json(400, {"error": "Request body must be a JSON object"})
+            return None
+        return params
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {
+                "status": "ok",
+                "limits": {
+                    "generation": GENERATION_LIMITER.as_dict(),
+                    "embedding": EMBEDDING_LIMITER.as_dict(),
+                },
+                "query_cache": SHARED_QUERY_CACHE.as_dict(),
+            })
+        else:
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        if self.path not in ("/generate", "/stream"):
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+            return
+
+        params = self._read_json()
+        if params is None:
+            return
+        try:
+            validate_params(params)
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        if self.path == "/generate":
+            try:
+                cards, stats = self.state.generate(params)
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+                return
+            self._send_json(200, {
+                "cards": [c.model_dump(mode="json") for c in cards],
+                "stats": stats.as_dict(),
+            })
+        else:
+            self._stream(params)
+
+    def _write_chunk(self, payload: dict) -> None:
+        data = json.dumps(payload).encode() + b"\n"
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _disconnected(self) -> bool:
+        """True if the client closed its end while we wait for the next card."""
+        readable, _, _ = select.select([self.connection], [], [], 0)
+        try:
+            return bool(readable) and not self.connection.recv(1, socket.MSG_PEEK)
+        except OSError:
+            return True
+
+    def _stream(self, params: dict) -> None:
+        """
+        Run generation in a worker and forward each accepted card as an NDJSON
+        line. The worker is cancelled if the client disconnects.
+        """
+        events: queue.Queue = queue.Queue()
+        cancel = threading.Event()
+
+        def run():
+            try:
+                _, stats = self.state.generate(
+                    params,
+                    on_card=lambda card: events.put({"card": card.model_dump(mode="json")}),
+                    cancel=cancel,
+                )
+                events.put({"done": True, "stats": stats.as_dict()})
+            except Exception as e:
+                events.put({"error": str(e)})
+
+        threading.Thread(target=run, daemon=True).start()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        try:
+            while True:
+                try:
+                    event = events.get(timeout=DISCONNECT_POLL)
+                except queue.Empty:
+                    if self._disconnected():
+                        raise ConnectionResetError from None
+                    continue
+                self._write_chunk(event)
+                if "card" not in event:
+                    break
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away; stop generating for it
+            cancel.set()
+
+
+class FlashcardServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, state: ServerState):
+        self.state = state
+        super().__init__(address, FlashcardHandler)
+
+
+class UnixFlashcardServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, state: ServerState):
+        self.state = state
+        Path(path).unlink(missing_ok=True)
+        super().__init__(path, FlashcardHandler)
+
+
+def run_server(
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        socket_path: str | None = None,
+        preload: list[str] | None = None,
+        verbose: bool = False,
+        embedding_dtype: str = "float32",
+        query_cache: str | None = None,
+        embedding_cache_size: int | None = MAX_CACHE_ENTRIES,
+) -> None:
+    """Start the server and block until interrupted.
+
+    ``preload`` lists embedder specs (see get_embedder) or sentence-transformer
+    model names to load before serving, so the first RAG request does not pay
+    for it. ``embedding_dtype`` float16 halves cached embeddings and dedup
+    indexes for every request. ``query_cache`` is a file that retrieval
+    query embeddings and results are loaded from and saved to on shutdown.
+    ``embedding_cache_size`` bounds the embeddings kept across requests
+    (None for no limit).
+    """
+    get_client().list()
+    SHARED_CACHE.set_dtype(embedding_dtype)
+    SHARED_CACHE.resize(embedding_cache_size)
+    if query_cache:
+        SHARED_QUERY_CACHE.load(query_cache)
+
+    if preload:
+        from .embeddings import get_embedder
+        for name in preload:
+            spec = name if ":" in name or name == "hash" else f"sentence-transformers:{name}"
+            get_embedder(spec).load()
+
+    state = ServerState(verbose=verbose, embedding_dtype=embedding_dtype)
+    if socket_path:
+        server = UnixFlashcardServer(socket_path, state)
+        where = socket_path
+    else:
+        server = FlashcardServer((host, port), state)
+        where = f"http://{host}:{server.server_address[1]}"
+
+    print(f"flashcard-gen serving on {where}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path:
+            Path(socket_path).unlink(missing_ok=True)
+        if query_cache:
+            SHARED_QUERY_CACHE.save(query_cache)
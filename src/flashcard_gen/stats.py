@@ -0,0 +1,101 @@
+"""Run statistics for flashcard generation."""
+
+import threading
+from dataclasses import dataclass, field
+
+
+@dataclass
+class GenerationStats:
+    """Counters collected while generating a flashcard set.
+
+    Pass an instance to the ``generate_*`` functions and read it afterwards.
+    A call is "wasted" when it does not end in an accepted card. Hedge
+    requests are counted in ``hedges``, not in ``llm_calls``. The
+    ``*concurrency_limit`` fields are the adaptive limits at the end of the
+    run, or 0 when no limiter was used.
+    """
+    llm_calls: int = 0
+    accepted: int = 0
+    duplicates: int = 0
+    parse_failures: int = 0
+    errors: int = 0
+    exhausted_chunks: int = 0
+    near_duplicate_chunks: int = 0
+    cancelled: int = 0
+    early_stops: int = 0
+    timeouts: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    concurrency_limit: int = 0
+    embed_concurrency_limit: int = 0
+    calls_by_key: dict[tuple[str, str], int] = field(default_factory=dict)
+    parse_failures_by_key: dict[tuple[str, str], int] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def incr(self, name: str, n: int = 1) -> None:
+        """Increment a counter. Safe to call from worker threads."""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def record_call(self, prompt_key: str, model: str) -> None:
+        """Count an LLM call under its (prompt_key, model) pair."""
+        with self._lock:
+            self.llm_calls += 1
+            key = (prompt_key, model)
+            self.calls_by_key[key] = self.calls_by_key.get(key, 0) + 1
+
+    def record_parse_failure(self, prompt_key: str, model: str) -> None:
+        """Count a response that could not be parsed into a card."""
+        with self._lock:
+            self.parse_failures += 1
+            key = (prompt_key, model)
+            self.parse_failures_by_key[key] = self.parse_failures_by_key.get(key, 0) + 1
+
+    def parse_failure_rate(self, prompt_key: str, model: str) -> float:
+        calls = self.calls_by_key.get((prompt_key, model), 0)
+        return self.parse_failures_by_key.get((prompt_key, model), 0) / calls if calls else 0.0
+
+    @property
+    def wasted_calls(self) -> int:
+        return self.llm_calls - self.accepted
+
+    @property
+    def wasted_ratio(self) -> float:
+        return self.wasted_calls / self.llm_calls if self.llm_calls else 0.0
+
+    @property
+    def duplicate_ratio(self) -> float:
+        return self.duplicates / self.llm_calls if self.llm_calls else 0.0
+
+    def as_dict(self) -> dict:
+        """JSON-friendly counters, with per-key parse failures keyed "prompt_key@model"."""
+        with self._lock:
+            data = {
+                name: getattr(self, name)
+                for name in self.__dataclass_fields__
+                if not name.startswith("_") and not name.endswith("_by_key")
+            }
+            data["parse_failures_by_key"] = {
+                f"{prompt_key}@{model}": n
+                for (prompt_key, model), n in self.parse_failures_by_key.items()
+            }
+        data["wasted_ratio"] = self.wasted_ratio
+        return data
+
+    def summary(self) -> str:
+        text = (
+            f"calls={self.llm_calls} accepted={self.accepted} "
+            f"duplicates={self.duplicates} parse_failures={self.parse_failures} "
+            f"errors={self.errors} cancelled={self.cancelled} early_stops={self.early_stops} "
+            f"timeouts={self.timeouts} hedges={self.hedges} hedge_wins={self.hedge_wins} "
+            f"exhausted_chunks={self.exhausted_chunks} "
+            f"near_duplicate_chunks={self.near_duplicate_chunks} "
+            f"wasted={self.wasted_ratio:.0%} (duplicates {self.duplicate_ratio:.0%})"
+        )
+        if self.concurrency_limit or self.embed_concurrency_limit:
+            text += (f"\n  concurrency limit: generation {self.concurrency_limit}, "
+                     f"embedding {self.embed_concurrency_limit}")
+        for (prompt_key, model), failures in sorted(self.parse_failures_by_key.items()):
+            rate = self.parse_failure_rate(prompt_key, model)
+            text += f"\n  parse failures {prompt_key} @ {model}: {failures} ({rate:.0%})"
+        return text
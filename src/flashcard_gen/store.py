@@ -0,0 +1,132 @@
+"""Persistent card history for deduplicating across runs."""
+
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .schema import Flashcard
+
+MAX_QUERY_PARAMS = 500   # Values bound per IN (...) lookup; SQLite builds before 3.32 allow 999
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cards (
+    id INTEGER PRIMARY KEY,
+    front TEXT NOT NULL,
+    back TEXT NOT NULL,
+    type TEXT NOT NULL,
+    norm_front TEXT NOT NULL,
+    embedding BLOB,
+    embedding_model TEXT,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cards_norm_front ON cards(norm_front);
+"""
+
+
+def normalize_front(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace for exact matching."""
+    text = re.sub(r"[^\w\s{}:]", " ", text.lower())
+    return " ".join(text.split())
+
+
+class CardStore:
+    """
+    SQLite store of previously exported cards, with normalized fronts and
+    optional front embeddings.
+
+    Use ``CardStore.open(path)`` so each database is opened once per process.
+    """
+    _instances: dict[str, "CardStore"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path: str | Path) -> "CardStore":
+        key = str(Path(path).resolve())
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(path)
+            return cls._instances[key]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM cards").fetchone()[0]
+
+    def add_many(
+            self,
+            cards: list[Flashcard],
+            embeddings: dict[str, list[float]] | None = None,
+            embedding_model: str | None = None,
+    ) -> int:
+        """
+        Insert cards in a single transaction. Cards whose normalized front is
+        already stored are skipped. ``embeddings`` maps fronts to vectors.
+        Returns the number of cards written.
+        """
+        embeddings = embeddings or {}
+        now = time.time()
+        norms = [normalize_front(card.front) for card in cards]
+        with self._lock, self.conn:
+            seen = self._stored(set(norms))
+            rows = []
+            for card, norm in zip(cards, norms):
+                if norm in seen:
+                    continue
+                seen.add(norm)
+                vector = embeddings.get(card.front)
+                blob = None if vector is None else np.asarray(vector, dtype=np.float32).tobytes()
+                rows.append((
+                    card.front, card.back, card.type.value, norm,
+                    blob, embedding_model if blob else None, now,
+                ))
+            self.conn.executemany(
+                "INSERT INTO cards (front, back, type, norm_front, embedding, embedding_model, "
+                "created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def _stored(self, norms: set[str]) -> set[str]:
+        """The normalized fronts among ``norms`` that are already stored."""
+        norms = list(norms)
+        stored = set()
+        for i in range(0, len(norms), MAX_QUERY_PARAMS):
+            batch = norms[i:i + MAX_QUERY_PARAMS]
+            rows = self.conn.execute(
+                f"SELECT norm_front FROM cards WHERE norm_front IN ({','.join('?' * len(batch))})",
+                batch,
+            )
+            stored.update(row[0] for row in rows)
+        return stored
+
+    def fronts(self) -> list[str]:
+        with self._lock:
+            return [row[0] for row in self.conn.execute("SELECT front FROM cards ORDER BY id")]
+
+    def embeddings(self, embedding_model: str) -> tuple[list[str], np.ndarray | None]:
+        """Fronts and a (n, dim) float32 matrix of stored embeddings for one model."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT front, embedding FROM cards "
+                "WHERE embedding IS NOT NULL AND embedding_model = ? ORDER BY id",
+                (embedding_model,),
+            ).fetchall()
+        if not rows:
+            return [], None
+        fronts = [row[0] for row in rows]
+        matrix = np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+        return fronts, matrix
+
+    def close(self) -> None:
+        with CardStore._instances_lock:
+            CardStore._instances.pop(str(self.path.resolve()), None)
+        self.conn.close()
@@ -0,0 +1,110 @@
+"""Token counting for sizing chunks against a model's context window."""
+
+import bisect
+import math
+import re
+from abc import ABC, abstractmethod
+from functools import cache
+
+DEFAULT_NUM_CTX = 2048  # Ollama's default num_ctx unless the model or server overrides it
+
+# Ollama model family -> Hugging Face repo with the same tokenizer.
+# Sizes within a family share a vocabulary, so the smallest public repo is used.
+HF_TOKENIZERS = {
+    "qwen2.5": "Qwen/Qwen2.5-0.5B-Instruct",
+    "qwen2": "Qwen/Qwen2-0.5B-Instruct",
+    "llama3.2": "unsloth/Llama-3.2-1B-Instruct",
+    "llama3.1": "unsloth/Meta-Llama-3.1-8B-Instruct",
+    "phi3": "microsoft/Phi-3-mini-4k-instruct",
+}
+
+
+class BaseTokenizer(ABC):
+    @abstractmethod
+    def count(self, text: str) -> int:
+        pass
+
+    def count_many(self, texts: list[str]) -> list[int]:
+        return [self.count(t) for t in texts]
+
+    def word_counts(self, words: list[str]) -> list[int]:
+        """
+        Tokens each word takes in ``" ".join(words)``, summing to the count of
+        that text. The default counts words on their own, which is exact for
+        tokenizers whose count adds up over whitespace-separated words.
+        """
+        return self.count_many(words)
+
+
+class HeuristicTokenizer(BaseTokenizer):
+    """
+    Approximate BPE counts without a vocabulary.
+
+    Words cost one token per 4 characters and every symbol costs one token,
+    so LaTeX-heavy text is counted much higher than its word count.
+    """
+    _pieces = re.compile(r"\w+|[^\w\s]")
+
+    def count(self, text: str) -> int:
+        return sum(
+            math.ceil(len(p) / 4) if p[0].isalnum() or p[0] == "_" else 1
+            for p in self._pieces.findall(text)
+        )
+
+
+class HFTokenizer(BaseTokenizer):
+    """Exact counts from a Hugging Face tokenizer (needs ``transformers``)."""
+
+    def __init__(self, name: str):
+        from transformers import AutoTokenizer
+
+        self.name = name
+        self.tokenizer = AutoTokenizer.from_pretrained(name)
+
+    def count(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+    def count_many(self, texts: list[str]) -> list[int]:
+        if not texts:
+            return []
+        encoded = self.tokenizer(texts, add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+
+    def word_counts(self, words: list[str]) -> list[int]:
+        # BPE merges a word with its leading space, so counting words one by one
+        # overcounts; tokenize the joined text once and give each token to its word
+        if not words or not self.tokenizer.is_fast:
+            return super().word_counts(words)
+        starts, offset = [], 0
+        for word in words:
+            starts.append(offset)
+            offset += len(word) + 1
+        offsets = self.tokenizer(" ".join(words), add_special_tokens=False,
+                                 return_offsets_mapping=True)["offset_mapping"]
+        counts = [0] * len(words)
+        for start, end in offsets:
+            # Placed by its last character, so a token holding the space before a word goes to it
+            counts[max(0, bisect.bisect_right(starts, max(start, end - 1)) - 1)] += 1
+        return counts
+
+
+@cache
+def get_tokenizer(model: str) -> BaseTokenizer:
+    """
+    Tokenizer for an Ollama model name such as ``qwen2.5:3b``, loaded once per
+    process. Falls back to HeuristicTokenizer for unknown models or when the
+    Hugging Face tokenizer cannot be loaded.
+    """
+    family = model.split(":")[0]
+    name = HF_TOKENIZERS.get(family)
+    if name:
+        try:
+            return HFTokenizer(name)
+        except (ImportError, OSError, ValueError):
+            pass
+    return HeuristicTokenizer()
+
+
+def token_budget(fraction: float = 0.5, num_ctx: int | None = None) -> int:
+    """Tokens available to a chunk: a fraction of the context window."""
+    return int((num_ctx or DEFAULT_NUM_CTX) * fraction)
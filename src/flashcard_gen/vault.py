@@ -0,0 +1,279 @@
+"""Retrieval index over every note in a vault, sharded by folder or file."""
+
+import hashlib
+import heapq
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+from .chunker import BaseChunker, Chunk, ChunkHeaderThenParagraph
+from .embeddings import BaseEmbedder, get_embedder
+from .query_cache import SHARED_QUERY_CACHE, QueryCache
+from .rag import INDEX_BATCH
+
+SHARD_BY = ("folder", "file")
+VAULT_INDEX_DIR = ".flashcard-gen-index"   # Index folder in the vault; hidden, so sync skips it
+MAX_SEARCH_WORKERS = 8   # Threads searching shards at once; faiss releases the GIL while searching
+
+
+def _read_meta(path: Path) -> dict:
+    """The metadata of an index saved in ``path``; empty if there is none."""
+    try:
+        return json.loads((path / "meta.json").read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+
+
+class _Shard:
+    """Exact index of one folder's or file's chunks, keyed by id so files can be removed."""
+
+    def __init__(self, index: faiss.Index):
+        self.index = index
+        self.chunks: dict[int, Chunk] = {}
+
+    def add(self, ids: list[int], chunks: list[Chunk], vectors: np.ndarray) -> None:
+        self.index.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+        self.chunks.update(zip(ids, chunks))
+
+    def remove(self, ids: list[int]) -> None:
+        self.index.remove_ids(np.asarray(ids, dtype=np.int64))
+        for i in ids:
+            self.chunks.pop(i, None)
+
+    def search(self, query: np.ndarray, k: int) -> list[tuple[float, int]]:
+        distances, ids = self.index.search(query, min(k, len(self.chunks)))
+        return [(float(d), int(i)) for d, i in zip(distances[0], ids[0]) if i >= 0]
+
+
+class VaultIndex:
+    """
+    Chunks of every note in a vault, with the note each came from.
+
+    Notes are grouped into shards by folder (``shard_by="folder"``) or one
+    shard per file. Adding, replacing or removing a file only touches its
+    shard: its vectors are added or removed by id, and nothing is rebuilt.
+    Queries are embedded once, searched in every shard in parallel, and the
+    shards' hits are merged into the overall top k.
+
+    Shards keep exact float32 vectors, since quantizers need training on the
+    whole collection, which changes with every file. ``save`` and ``load``
+    keep the index between runs, and ``sync`` updates it from a directory by
+    file modification time, so only notes edited since the last run are
+    re-embedded. Query vectors and results are kept in ``query_cache``
+    (default: SHARED_QUERY_CACHE) under the index's ``version``.
+    """
+
+    def __init__(
+            self,
+            embedder: BaseEmbedder | str | None = None,
+            chunker: BaseChunker | None = None,
+            shard_by: str = "folder",
+            query_cache: QueryCache | None = None,
+    ):
+        if shard_by not in SHARD_BY:
+            raise ValueError(f"Unknown shard_by: {shard_by}. Available: {', '.join(SHARD_BY)}")
+        if isinstance(embedder, str):
+            embedder = get_embedder(embedder)
+        self.embedder = embedder or get_embedder("sentence-transformers:all-MiniLM-L6-v2")
+        self.chunker = chunker or ChunkHeaderThenParagraph()
+        self.shard_by = shard_by
+        self.query_cache = query_cache if query_cache is not None else SHARED_QUERY_CACHE
+        self.shards: dict[str, _Shard] = {}
+        # Source -> {"shard": key, "ids": [...], "signature": [mtime_ns, size] or None}
+        self.files: dict[str, dict] = {}
+        self._next_id = 0
+        self._version: str | None = None
+        self._lock = threading.RLock()
+        self._pool = ThreadPoolExecutor(max_workers=MAX_SEARCH_WORKERS)
+
+    def __len__(self) -> int:
+        return sum(len(shard.chunks) for shard in self.shards.values())
+
+    @property
+    def version(self) -> str:
+        """Fingerprint of the indexed chunks and their ids; changes with any file."""
+        with self._lock:
+            if self._version is None:
+                digest = hashlib.sha1(f"{self.embedder.name}\n{self.shard_by}".encode())
+                for source in sorted(self.files):
+                    shard = self.shards.get(self.files[source]["shard"])
+                    for i in self.files[source]["ids"]:
+                        digest.update(f"\n{source}:{i}:{shard.chunks[i].id}".encode())
+                self._version = digest.hexdigest()
+            return self._version
+
+    def shard_key(self, source: str) -> str:
+        return source if self.shard_by == "file" else Path(source).parent.as_posix()
+
+    def add_file(self, source: str, content: str, signature: tuple[int, int] | None = None) -> int:
+        """Index a note's chunks under ``source``, replacing any it had. Returns the chunk count."""
+        chunks = [Chunk(c.content, c.header, c.level, source)
+                  for c in (self.chunker.chunk(content) if content.strip() else [])]
+        return self.add_chunks(source, chunks, signature)
+
+    def add_chunks(self, source: str, chunks: list[Chunk],
+                   signature: tuple[int, int] | None = None) -> int:
+        """Index pre-chunked content under ``source``, replacing any it had."""
+        texts = [c.content for c in chunks]
+        vectors = None
+        if texts:
+            vectors = np.vstack(list(self.embedder.embed_batches(texts, INDEX_BATCH)))
+
+        with self._lock:
+            self.remove_file(source)
+            self._version = None
+            key = self.shard_key(source)
+            ids = list(range(self._next_id, self._next_id + len(chunks)))
+            self._next_id += len(chunks)
+            if chunks:
+                if key not in self.shards:
+                    index = faiss.IndexIDMap2(faiss.IndexFlatL2(vectors.shape[1]))
+                    self.shards[key] = _Shard(index)
+                self.shards[key].add(ids, chunks, vectors)
+            self.files[source] = {"shard": key, "ids": ids,
+                                  "signature": list(signature) if signature else None}
+        return len(chunks)
+
+    def remove_file(self, source: str) -> bool:
+        """Drop a note's chunks. Returns False if it was not indexed."""
+        with self._lock:
+            entry = self.files.pop(source, None)
+            if entry is None:
+                return False
+            self._version = None
+            shard = self.shards.get(entry["shard"])
+            if shard is not None and entry["ids"]:
+                shard.remove(entry["ids"])
+                if not shard.chunks:
+                    del self.shards[entry["shard"]]
+            return True
+
+    def sync(self, root: str | Path, pattern: str = "*.md") -> tuple[int, int]:
+        """
+        Bring the index up to date with the notes under ``root``, skipping
+        hidden folders. Returns (files indexed, files removed).
+        """
+        with self._lock:
+            return self._sync(Path(root), pattern)
+
+    def _sync(self, root: Path, pattern: str) -> tuple[int, int]:
+        found = {}
+        for path in root.rglob(pattern):
+            rel = path.relative_to(root)
+            if any(part.startswith(".") for part in rel.parts):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            found[rel.as_posix()] = (stat.st_mtime_ns, stat.st_size)
+
+        removed = [source for source in self.files if source not in found]
+        for source in removed:
+            self.remove_file(source)
+
+        indexed = 0
+        for source, signature in sorted(found.items()):
+            entry = self.files.get(source)
+            if entry is None or entry["signature"] != list(signature):
+                self.add_file(source, (root / source).read_text(encoding="utf-8"), signature)
+                indexed += 1
+        return indexed, len(removed)
+
+    def search(self, query: str, k: int = 3) -> list[tuple[float, Chunk]]:
+        """Top-k chunks across all shards as (L2 distance, chunk), nearest first."""
+        with self._lock:
+            version = self.version
+            best = self.query_cache.results(query, k, version)
+            if best is None:
+                vector = self.query_cache.embed(self.embedder, query)
+                shards = list(self.shards.values())
+                if len(shards) > 1:
+                    results = list(self._pool.map(lambda shard: shard.search(vector, k), shards))
+                else:
+                    results = [shard.search(vector, k) for shard in shards]
+                best = heapq.nsmallest(k, (hit for found in results for hit in found))
+                self.query_cache.put_results(query, k, version, best)
+            return [(d, self._chunk(i)) for d, i in best]
+
+    def _chunk(self, i: int) -> Chunk:
+        return next(shard.chunks[i] for shard in self.shards.values() if i in shard.chunks)
+
+    def retrieve(self, query: str, k: int = 3) -> list[Chunk]:
+        """Retrieve top-k relevant chunks from anywhere in the vault."""
+        return [chunk for _, chunk in self.search(query, k)]
+
+    def save(self, path: str | Path) -> None:
+        """
+        Write the shards and chunk metadata to the directory ``path``. Shard
+        files of an index saved there before that are no longer used are
+        deleted; other files are left alone.
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            owned = set(_read_meta(path).get("shards", {}).values())
+            shard_files = {}
+            for key, shard in self.shards.items():
+                name = hashlib.sha1(key.encode()).hexdigest()[:12] + ".faiss"
+                faiss.write_index(shard.index, str(path / name))
+                shard_files[key] = name
+
+            files = {}
+            for source, entry in self.files.items():
+                shard = self.shards.get(entry["shard"])
+                chunks = [shard.chunks[i] for i in entry["ids"]] if shard else []
+                files[source] = {
+                    **entry,
+                    "chunks": [{"content": c.content, "header": c.header, "level": c.level}
+                               for c in chunks],
+                }
+            meta = {
+                "embedder": self.embedder.name,
+                "chunker": self.chunker.settings,
+                "shard_by": self.shard_by,
+                "next_id": self._next_id,
+                "shards": shard_files,
+                "files": files,
+            }
+            tmp = path / "meta.json.tmp"
+            tmp.write_text(json.dumps(meta), encoding="utf-8")
+            os.replace(tmp, path / "meta.json")
+            # Only once the new metadata no longer points at them
+            for name in owned - set(shard_files.values()):
+                (path / name).unlink(missing_ok=True)
+
+    @classmethod
+    def load(
+            cls,
+            path: str | Path,
+            embedder: BaseEmbedder | str | None = None,
+            chunker: BaseChunker | None = None,
+            shard_by: str = "folder",
+            query_cache: QueryCache | None = None,
+    ) -> "VaultIndex":
+        """
+        Load an index saved with ``save``. A missing index, or one built with
+        another embedder, chunker, chunk budget or sharding, loads empty so
+        ``sync`` rebuilds it.
+        """
+        vault = cls(embedder, chunker, shard_by, query_cache)
+        meta = _read_meta(Path(path))
+        if (not meta or meta["embedder"] != vault.embedder.name
+                or meta.get("chunker") != vault.chunker.settings or meta["shard_by"] != shard_by):
+            return vault
+
+        for key, name in meta["shards"].items():
+            vault.shards[key] = _Shard(faiss.read_index(str(Path(path) / name)))
+        for source, entry in meta["files"].items():
+            shard = vault.shards.get(entry["shard"])
+            for i, chunk in zip(entry["ids"], entry.pop("chunks")):
+                shard.chunks[i] = Chunk(chunk["content"], chunk["header"], chunk["level"], source)
+            vault.files[source] = entry
+        vault._next_id = meta["next_id"]
+        return vault
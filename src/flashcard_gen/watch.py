@@ -0,0 +1,263 @@
+"""Watch a notes directory and regenerate cards for the sections that change."""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from .chunker import BaseChunker, ChunkHeaderThenParagraph
+from .export import write_anki, write_apkg, write_csv, write_json, write_jsonl
+from .generate import generate_chunk_cards
+from .rag import FAISSRetriever
+from .schema import Card
+from .stats import GenerationStats
+
+STATE_FILE = ".flashcard-gen-watch.json"
+POLL_INTERVAL = 1.0    # Seconds between scans of the notes directory
+DEBOUNCE = 1.5         # Seconds a file must stay unchanged before it is processed
+
+OUTPUT_SUFFIXES = {
+    "json": ".json", "jsonl": ".jsonl", "csv": ".csv", "anki": ".txt", "apkg": ".apkg",
+}
+TEXT_WRITERS = {"json": write_json, "jsonl": write_jsonl, "csv": write_csv, "anki": write_anki}
+
+
+class NotesWatcher:
+    """
+    Keep one card file per note in ``output_dir`` up to date with the notes
+    under ``root``.
+
+    The directory is polled every ``interval`` seconds. A changed, new or
+    deleted note is processed once it has stayed the same for ``debounce``
+    seconds, so a burst of saves (or an editor's write-and-rename) is one
+    update. Only that note is re-chunked, and cards are generated only for
+    sections whose Chunk.id is new; cards of unchanged sections are kept and
+    count as duplicates for the new ones. The note's output file is then
+    replaced in place.
+
+    Cards by section and note signatures are saved to STATE_FILE in
+    ``output_dir``, so a restarted watcher only processes notes that changed
+    while it was stopped. Changing the model, card type, output format,
+    chunker, retriever embedder or cards per section starts over.
+    ``generate_options`` are passed to generate_chunk_cards; pass a
+    ``checker`` and ``latency`` tracker there to keep embeddings and latency
+    history warm across updates.
+
+    With a ``retriever`` each updated note is indexed, its unchanged
+    sections from the embedding cache, and new sections are generated with
+    related sections of the note as context. It is kept across updates, so
+    its encoder stays loaded.
+    """
+
+    def __init__(
+            self,
+            root: str | Path,
+            output_dir: str | Path,
+            chunker: BaseChunker | None = None,
+            cards_per_section: int = 2,
+            file_format: str = "json",
+            deck: str | None = None,
+            pattern: str = "*.md",
+            interval: float = POLL_INTERVAL,
+            debounce: float = DEBOUNCE,
+            verbose: bool = False,
+            retriever: FAISSRetriever | None = None,
+            **generate_options,
+    ):
+        if file_format not in OUTPUT_SUFFIXES:
+            raise ValueError(f"Unknown file format: {file_format}. "
+                             f"Available: {', '.join(OUTPUT_SUFFIXES)}")
+        self.root = Path(root).resolve()
+        self.output_dir = Path(output_dir).resolve()
+        self.chunker = chunker or ChunkHeaderThenParagraph()
+        self.cards_per_section = cards_per_section
+        self.file_format = file_format
+        self.deck = deck
+        self.pattern = pattern
+        self.interval = interval
+        self.debounce = debounce
+        self.verbose = verbose
+        self.retriever = retriever
+        self.generate_options = generate_options
+        self.stats = GenerationStats()
+        self.settings = {
+            "model": generate_options.get("model", "qwen2.5:3b"),
+            "card_type": generate_options.get("card_type", "basic"),
+            "output_format": generate_options.get("output_format", "simple"),
+            "chunker": self.chunker.settings,
+            "retriever": retriever.embedder.name if retriever is not None else None,
+            "cards_per_section": cards_per_section,
+        }
+        # Note path relative to root -> {"signature": [mtime_ns, size], "sections": {id: [cards]}}
+        self.notes: dict[str, dict] = {}
+        self._pending: dict[str, tuple[tuple[int, int] | None, float]] = {}
+        self._state_path = self.output_dir / STATE_FILE
+        self._load_state()
+
+    def _load_state(self) -> None:
+        if not self._state_path.exists():
+            return
+        try:
+            state = json.loads(self._state_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return
+        if state.get("settings") != self.settings:
+            return
+
+        for rel, note in state.get("notes", {}).items():
+            sections = {}
+            for chunk_id, cards in note["sections"].items():
+                valid = (Card.from_dict(card) for card in cards)
+                sections[chunk_id] = [card.to_flashcard() for card in valid if card is not None]
+            self.notes[rel] = {"signature": tuple(note["signature"]), "sections": sections}
+
+    def _save_state(self) -> None:
+        notes = {
+            rel: {
+                "signature": list(note["signature"]),
+                "sections": {
+                    chunk_id: [Card(c.front, c.back, c.type).as_dict() for c in cards]
+                    for chunk_id, cards in note["sections"].items()
+                },
+            }
+            for rel, note in self.notes.items()
+        }
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self._state_path.with_name(self._state_path.name + ".tmp")
+        tmp.write_text(json.dumps({"settings": self.settings, "notes": notes}), encoding="utf-8")
+        os.replace(tmp, self._state_path)
+
+    def scan(self) -> dict[str, tuple[int, int]]:
+        """(mtime_ns, size) of every note, skipping hidden directories and the output."""
+        found = {}
+        for path in self.root.rglob(self.pattern):
+            rel = path.relative_to(self.root)
+            if any(part.startswith(".") for part in rel.parts) or self.output_dir in path.parents:
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            found[rel.as_posix()] = (stat.st_mtime_ns, stat.st_size)
+        return found
+
+    def poll(self, now: float | None = None) -> list[tuple[str, tuple[int, int] | None]]:
+        """
+        Notes whose changes have settled, with their signature (None once
+        deleted). A note is ready when it differs from what was last processed
+        and has looked the same for ``debounce`` seconds.
+        """
+        now = time.monotonic() if now is None else now
+        current: dict[str, tuple[int, int] | None] = dict(self.scan())
+        for rel in self.notes.keys() - current.keys():
+            current[rel] = None
+        for rel in self._pending.keys() - current.keys():
+            del self._pending[rel]
+
+        ready = []
+        for rel, signature in current.items():
+            processed = self.notes.get(rel, {}).get("signature")
+            if signature == processed:
+                self._pending.pop(rel, None)
+                continue
+            seen = self._pending.get(rel)
+            if seen is None or seen[0] != signature:
+                self._pending[rel] = (signature, now)
+            elif now - seen[1] >= self.debounce:
+                del self._pending[rel]
+                ready.append((rel, signature))
+        return ready
+
+    def output_path(self, rel: str) -> Path:
+        return (self.output_dir / rel).with_suffix(OUTPUT_SUFFIXES[self.file_format])
+
+    def process(self, rel: str, signature: tuple[int, int] | None) -> None:
+        if signature is None:
+            self.remove(rel)
+        else:
+            self.update(rel, signature)
+
+    def update(self, rel: str, signature: tuple[int, int]) -> None:
+        """Re-chunk one note, generate cards for its new sections and rewrite its output."""
+        start = time.perf_counter()
+        try:
+            notes = (self.root / rel).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return  # Deleted since the scan; the next poll removes it
+
+        chunks = self.chunker.chunk(notes) if notes.strip() else []
+        old = self.notes.get(rel, {}).get("sections", {})
+        ids = list(dict.fromkeys(chunk.id for chunk in chunks))
+        changed = [chunk for chunk in chunks if chunk.id not in old]
+        kept = [card for chunk_id in ids if chunk_id in old for card in old[chunk_id]]
+
+        new = {}
+        if changed:
+            if self.retriever is not None:
+                self.retriever.index_chunks(chunks)
+            new = generate_chunk_cards(
+                changed, self.cards_per_section, kept, verbose=self.verbose, stats=self.stats,
+                retriever=self.retriever, **self.generate_options
+            )
+        sections = {chunk_id: old[chunk_id] if chunk_id in old else new.get(chunk_id, [])
+                    for chunk_id in ids}
+        self.notes[rel] = {"signature": signature, "sections": sections}
+        total = self._write_output(rel)
+        self._save_state()
+
+        dropped = len(old.keys() - sections.keys())
+        added = sum(len(cards) for cards in new.values())
+        print(f"{rel}: {len(changed)} of {len(ids)} sections changed, {dropped} removed, "
+              f"{added} new cards, {total} total -> {self.output_path(rel)} "
+              f"({time.perf_counter() - start:.1f}s)", file=sys.stderr)
+
+    def remove(self, rel: str) -> None:
+        """Forget a deleted note and delete its output."""
+        self.notes.pop(rel, None)
+        self.output_path(rel).unlink(missing_ok=True)
+        self._save_state()
+        print(f"{rel}: removed, deleted {self.output_path(rel)}", file=sys.stderr)
+
+    def _write_output(self, rel: str) -> int:
+        """Replace the note's output file atomically. Returns the number of cards."""
+        cards = [card for cards in self.notes[rel]["sections"].values() for card in cards]
+        target = self.output_path(rel)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + ".tmp")
+        if self.file_format == "apkg":
+            # Subdecks follow the folder layout, e.g. Flashcards::lectures::week1
+            deck = "::".join([self.deck or "Flashcards", *Path(rel).with_suffix("").parts])
+            write_apkg(cards, tmp, deck_name=deck)
+        else:
+            with open(tmp, "w", encoding="utf-8", newline="") as f:
+                TEXT_WRITERS[self.file_format](cards, f)
+        os.replace(tmp, target)
+        return len(cards)
+
+    def sync(self) -> None:
+        """
+        Bring every output up to date right away, without debouncing: notes
+        changed, added or deleted since the saved state, and notes whose
+        output file is missing.
+        """
+        current = self.scan()
+        for rel in list(self.notes.keys() - current.keys()):
+            self.remove(rel)
+        for rel, signature in sorted(current.items()):
+            if self.notes.get(rel, {}).get("signature") != signature:
+                self.update(rel, signature)
+            elif not self.output_path(rel).exists():
+                self._write_output(rel)
+
+    def run(self, once: bool = False) -> None:
+        """Sync, then process settled changes until interrupted. ``once`` stops after the sync."""
+        self.sync()
+        if once:
+            return
+        print(f"Watching {self.root} for changes to {self.pattern} (Ctrl+C to stop)",
+              file=sys.stderr)
+        while True:
+            time.sleep(self.interval)
+            for rel, signature in self.poll():
+                self.process(rel, signature)
@@ -0,0 +1,97 @@
+import itertools
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import ollama
+import pytest
+from stand_in_ollama import Handler
+
+from flashcard_gen.client import CassetteTransport, set_client
+
+CASSETTES = Path(__file__).parent / "cassettes"
+RECORD_ENV = "FLASHCARD_GEN_RECORD_CASSETTES"
+
+
+class FakeClient:
+    """
+    Stands in for ollama.Client. Each chat call answers with the next card
+    from ``cards`` (Q:/A: text by default, numbered so they never repeat),
+    streamed in a few parts ``delay`` seconds apart. ``delay`` may be a list,
+    giving the delay of each call in turn.
+    """
+
+    def __init__(self, cards=None, delay: float | list[float] = 0.0):
+        self.cards = iter(cards) if cards is not None else (
+            f"Q: What is fact {i}?\nA: Fact {i}\n" for i in itertools.count()
+        )
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def chat(self, model, messages, options=None, stream=False, **extra):
+        with self._lock:
+            self.calls.append({"model": model, "messages": messages, "options": options, **extra})
+            text = next(self.cards)
+            delay = self.delay
+            if isinstance(delay, list):
+                delay = delay[min(len(self.calls), len(delay)) - 1]
+        if not stream:
+            time.sleep(delay * 3)
+            return {"message": {"content": text}}
+        return self._stream(text, delay)
+
+    @staticmethod
+    def _stream(text, delay):
+        step = max(1, len(text) // 3)
+        for i in range(0, len(text), step):
+            time.sleep(delay)
+            yield {"message": {"content": text[i:i + step]}}
+
+
+@pytest.fixture
+def fake_client():
+    def install(*args, **kwargs) -> FakeClient:
+        client = FakeClient(*args, **kwargs)
+        set_client(client)
+        return client
+
+    yield install
+    set_client(None)
+
+
+@pytest.fixture
+def cassette():
+    """
+    Route Ollama calls through ``tests/cassettes/<name>.jsonl.gz``. Tests
+    replay it; with FLASHCARD_GEN_RECORD_CASSETTES=1 it is re-recorded from
+    the server at OLLAMA_HOST instead. ``synthetic_*`` cassettes are
+    recorded from stand_in_ollama.py, which only answers for the
+    ``stand-in`` model.
+    """
+    transports = []
+
+    def use(name: str) -> CassetteTransport:
+        mode = "record" if os.environ.get(RECORD_ENV) else "replay"
+        transport = CassetteTransport(CASSETTES / f"{name}.jsonl.gz", mode)
+        transports.append(transport)
+        set_client(ollama.Client(transport=transport))
+        return transport
+
+    yield use
+    set_client(None)
+    for transport in transports:
+        transport.close()
+
+
+@pytest.fixture
+def stand_in():
+    """Serve stand_in_ollama.py on a free port. Yields its OLLAMA_HOST."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,96 @@
+"""
+Stand-in for the Ollama chat API that the synthetic cassettes in
+tests/cassettes are recorded from. It is not a model: each answer is a card
+built deterministically from a sentence of the prompt, so re-recording gives
+the same traffic. Once four fronts are in the avoid list every other answer
+is an unparseable ramble, and streamed answers are split on raw byte
+boundaries so multibyte characters straddle chunks, to exercise the parser
+and the recorder.
+
+    python tests/stand_in_ollama.py 11499 &
+    OLLAMA_HOST=127.0.0.1:11499 FLASHCARD_GEN_RECORD_CASSETTES=1 pytest tests
+"""
+
+import hashlib
+import json
+import re
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MODEL = "stand-in"
+CHUNK_BYTES = 97
+
+
+def answer(body: dict) -> str:
+    """The card text for a chat request."""
+    system, user = body["messages"][0]["content"], body["messages"][1]["content"]
+    avoid = len(re.findall(r"^- ", system, re.M))
+    focus = re.search(r"Focus on: (.+)", system)
+    prose = re.sub(r"\$\$.*?\$\$|#+ |\\\\", " ", user, flags=re.S)
+    sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", prose) if len(s.split()) >= 6]
+    if not sentences:
+        sentences = [user.strip()[:80] or "the notes"]
+    h = int(hashlib.sha1(user.encode()).hexdigest(), 16)
+    sentence = sentences[(h + avoid) % len(sentences)]
+    words = re.findall(r"[\w'-]+", sentence)
+    topic = focus.group(1) if focus else " ".join(words[:4])
+
+    if "cloze" in system.lower():
+        return f"C: {{{{c1::{words[0]}}}}} {' '.join(words[1:12])}.\n"
+    if avoid >= 4 and avoid % 2 == 0:
+        return "Sure! Here is a flashcard about the notes."
+    front = f"What does the note say about {topic.lower()} — point {avoid + 1}?"
+    back = " ".join(words[4:14]) or sentence
+    return f"Q: {front}\nA: {back} → ok\n"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: dict) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._send_json({"models": [{"name": MODEL}]})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        text = answer(body)
+
+        def message(content: str, done: bool) -> dict:
+            return {"model": body["model"], "created_at": "2025-01-01T00:00:00Z",
+                    "message": {"role": "assistant", "content": content}, "done": done}
+
+        if not body.get("stream", True):
+            self._send_json(message(text, True))
+            return
+
+        lines = [message(text[i:i + 12], False) for i in range(0, len(text), 12)]
+        lines.append(message("", True))
+        data = b"".join(json.dumps(line, ensure_ascii=False).encode() + b"\n" for line in lines)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i in range(0, len(data), CHUNK_BYTES):
+                piece = data[i:i + CHUNK_BYTES]
+                self.wfile.write(f"{len(piece):X}\r\n".encode() + piece + b"\r\n")
+                self.wfile.flush()
+                time.sleep(0.002)
+            self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            pass
+
+
+if __name__ == "__main__":
+    ThreadingHTTPServer(("127.0.0.1", int(sys.argv[1])), Handler).serve_forever()
@@ -0,0 +1,81 @@
+import pytest
+
+from flashcard_gen import tokenizer
+from flashcard_gen.chunker import ChunkByLength, ChunkByParagraph, get_chunker
+from flashcard_gen.tokenizer import BaseTokenizer, HeuristicTokenizer, get_tokenizer
+
+PROSE = "\n\n".join(
+    " ".join(f"word{p}x{i}" for i in range(12 + 5 * p)) for p in range(6)
+)
+LATEX = "\n\n".join(r"Euler: $e^{i\pi} + 1 = 0$ and $\sum_{n=1}^{\infty} 1/n^2 = \pi^2/6$."
+                    for _ in range(8))
+
+
+class ContextTokenizer(BaseTokenizer):
+    """One token per word plus one for the start of the text, like a BOS-prefixed BPE."""
+
+    def count(self, text: str) -> int:
+        return len(text.split()) + 1
+
+    def word_counts(self, words: list[str]) -> list[int]:
+        return [1] * len(words)
+
+
+class SeparatorTokenizer(HeuristicTokenizer):
+    """Counts each paragraph break as a token, as most BPE vocabularies do."""
+
+    def count(self, text: str) -> int:
+        return super().count(text) + text.count("\n\n")
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    def unavailable(name):
+        raise OSError(f"Can't load tokenizer for '{name}' (offline)")
+
+    monkeypatch.setattr(tokenizer, "HFTokenizer", unavailable)
+    get_tokenizer.cache_clear()
+    yield
+    get_tokenizer.cache_clear()
+
+
+def test_offline_falls_back_to_heuristic(offline):
+    assert isinstance(get_tokenizer("qwen2.5:3b"), HeuristicTokenizer)
+    assert isinstance(get_tokenizer("unknown-model:7b"), HeuristicTokenizer)
+
+
+@pytest.mark.parametrize("name", ["paragraph", "length", "hierarchical"])
+@pytest.mark.parametrize("text", [PROSE, LATEX])
+def test_chunks_fit_the_token_budget(offline, name, text):
+    counter = get_tokenizer("qwen2.5:3b")
+    chunker = get_chunker(name, max_tokens=40, tokenizer=counter)
+    chunks = chunker.chunk(text)
+    assert len(chunks) > 1
+    assert all(counter.count(c.content) <= 40 for c in chunks)
+    # Nothing is lost: every word of the notes is in some chunk
+    assert set(text.split()) <= {w for c in chunks for w in c.content.split()}
+
+
+def test_symbols_count_against_the_budget(offline):
+    counter = get_tokenizer("qwen2.5:3b")
+    by_words = ChunkByParagraph(max_words=40).chunk(LATEX)
+    by_tokens = ChunkByParagraph(max_tokens=40, tokenizer=counter).chunk(LATEX)
+    assert counter.count(LATEX) > len(LATEX.split())
+    assert len(by_tokens) > len(by_words)
+
+
+def test_words_are_sized_in_context():
+    # Counted one by one every word would cost 2 tokens, halving each window
+    chunks = ChunkByLength(max_tokens=10, overlap=0, tokenizer=ContextTokenizer()).chunk(
+        " ".join(f"w{i}" for i in range(30))
+    )
+    assert [len(c.content.split()) for c in chunks] == [10, 10, 10]
+
+
+def test_paragraph_breaks_count_when_merging():
+    paragraphs = ["one two six ten red", "blue gray pink tan jet"]
+    chunker = ChunkByParagraph(max_tokens=10, tokenizer=SeparatorTokenizer())
+    # 5 + 5 tokens, but 11 once joined by the paragraph break
+    assert [c.content for c in chunker.chunk("\n\n".join(paragraphs))] == paragraphs
+    assert len(ChunkByParagraph(max_tokens=11, tokenizer=SeparatorTokenizer())
+               .chunk("\n\n".join(paragraphs))) == 1
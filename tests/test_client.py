@@ -0,0 +1,104 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import httpx
+import ollama
+import pytest
+
+from flashcard_gen.client import (
+    RECORD_ENV,
+    CassetteMiss,
+    CassetteTransport,
+    request_key,
+    set_client,
+)
+from flashcard_gen.generate import generate_single_card
+
+SRC = Path(__file__).parent.parent / "src"
+# Exits without closing anything, and without the finalizers that could close the file by luck
+RECORD = """
+import atexit, os
+from flashcard_gen.generate import generate_single_card
+card = generate_single_card("Mitochondria produce most of the energy a cell needs.", "stand-in")
+print(card.front, flush=True)
+atexit._run_exitfuncs()
+os._exit(0)
+"""
+
+BODY = '{"message": {"content": "Q: Was ist Größe?\\nA: Ä → ü"}}\n'.encode()
+
+
+class _Chunks(httpx.SyncByteStream):
+    def __init__(self, chunks: list[bytes]):
+        self.chunks = chunks
+
+    def __iter__(self):
+        yield from self.chunks
+
+
+def _server(request: httpx.Request) -> httpx.Response:
+    # Split every multibyte character across two chunks, plus one invalid byte
+    chunks = [BODY[i:i + 1] for i in range(len(BODY))] + [b"\xff"]
+    return httpx.Response(200, headers={"content-type": "application/x-ndjson"},
+                          stream=_Chunks(chunks))
+
+
+def _request(client: httpx.Client, **body) -> bytes:
+    return client.post("http://ollama/api/chat", json=body).read()
+
+
+@pytest.mark.parametrize("name", ["cassette.jsonl", "cassette.jsonl.gz"])
+def test_replay_matches_recording_byte_for_byte(tmp_path, name):
+    path = tmp_path / name
+    recorder = CassetteTransport(path, "record", transport=httpx.MockTransport(_server))
+    with httpx.Client(transport=recorder) as client:
+        recorded = _request(client, model="m", prompt="a")
+    recorder.close()
+    assert recorded == BODY + b"\xff"
+
+    with httpx.Client(transport=CassetteTransport(path, "replay")) as client:
+        assert _request(client, prompt="a", model="m") == recorded
+
+
+def test_replay_serves_repeats_in_order_and_misses(tmp_path):
+    path = tmp_path / "cassette.jsonl"
+    lines = [{"key": request_key(httpx.Request("POST", "http://x/api/chat", json={"n": 1})),
+              "status": 200, "content_type": "application/json", "chunks": [[0, text]]}
+             for text in ('{"a": 1}', '{"a": 2}')]
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines), encoding="utf-8")
+
+    with httpx.Client(transport=CassetteTransport(path, "replay")) as client:
+        assert json.loads(_request(client, n=1)) == {"a": 1}
+        assert json.loads(_request(client, n=1)) == {"a": 2}
+        with pytest.raises(CassetteMiss):
+            _request(client, n=1)
+        with pytest.raises(CassetteMiss):
+            _request(client, n=2)
+
+
+def test_request_key_ignores_json_key_order():
+    a = httpx.Request("POST", "http://x/api/chat", content=b'{"a": 1, "b": 2}')
+    b = httpx.Request("POST", "http://x/api/chat", content=b'{"b": 2, "a": 1}')
+    assert request_key(a) == request_key(b)
+    assert request_key(a) != request_key(httpx.Request("POST", "http://x/api/embed",
+                                                       content=b'{"a": 1, "b": 2}'))
+
+
+def test_recording_is_finished_at_exit(tmp_path, stand_in):
+    path = tmp_path / "run.jsonl.gz"
+    env = {**os.environ, RECORD_ENV: str(path), "OLLAMA_HOST": stand_in, "PYTHONPATH": str(SRC)}
+    result = subprocess.run([sys.executable, "-c", RECORD], env=env, capture_output=True,
+                            text=True, check=True)
+
+    transport = CassetteTransport(path, "replay")
+    set_client(ollama.Client(transport=transport))
+    try:
+        card = generate_single_card("Mitochondria produce most of the energy a cell needs.",
+                                    "stand-in")
+    finally:
+        set_client(None)
+    assert card.front == result.stdout.strip()
+    assert transport.unused() == []
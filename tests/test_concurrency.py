@@ -0,0 +1,120 @@
+import threading
+
+import pytest
+
+from flashcard_gen import concurrency
+from flashcard_gen.concurrency import MIN_WINDOW, PROBE_AFTER, AdaptiveLimiter
+
+
+class FakeTime:
+    now = 0.0
+
+    @classmethod
+    def monotonic(cls) -> float:
+        return cls.now
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    FakeTime.now = 0.0
+    monkeypatch.setattr(concurrency, "time", FakeTime)
+    return FakeTime
+
+
+def _window(limiter, clock, seconds=1.0, elapsed=1.0, concurrency=None, errors=0):
+    """Complete one adjustment window, ``concurrency`` requests at a time."""
+    size = max(MIN_WINDOW, 2 * limiter.limit)
+    at_once = concurrency or limiter.limit
+    clock.now += elapsed
+    done = 0
+    while done < size:
+        batch = min(at_once, size - done)
+        for _ in range(batch):
+            assert limiter.acquire()
+        for _ in range(batch):
+            ok = done >= errors
+            limiter.release(seconds if ok else None, ok=ok)
+            done += 1
+
+
+def test_limit_grows_while_throughput_improves(clock):
+    limiter = AdaptiveLimiter(initial=2, max_limit=4)
+    _window(limiter, clock)
+    assert limiter.limit == 3
+    _window(limiter, clock, elapsed=0.5)
+    assert limiter.limit == 4
+    # Capped at max_limit
+    _window(limiter, clock, elapsed=0.1)
+    assert limiter.limit == 4
+    assert limiter.increases == 2
+
+
+def test_limit_only_grows_when_reached(clock):
+    limiter = AdaptiveLimiter(initial=4)
+    _window(limiter, clock, concurrency=2)
+    assert limiter.limit == 4
+    assert limiter.increases == 0
+
+
+def test_errors_halve_the_limit(clock):
+    limiter = AdaptiveLimiter(initial=8)
+    _window(limiter, clock, errors=1)
+    assert limiter.limit == 4
+    assert limiter.decreases == 1
+
+
+def test_latency_rise_halves_the_limit(clock):
+    limiter = AdaptiveLimiter(initial=4, max_limit=4)
+    _window(limiter, clock, seconds=1.0)
+    assert limiter.baseline == 1.0
+    _window(limiter, clock, seconds=2.0)
+    assert limiter.limit == 2
+    assert limiter.decreases == 1
+
+
+def test_limit_never_drops_below_minimum(clock):
+    limiter = AdaptiveLimiter(initial=1, min_limit=1)
+    _window(limiter, clock, errors=1)
+    assert limiter.limit == 1
+    assert limiter.decreases == 0
+
+
+def test_probes_higher_after_flat_windows(clock):
+    limiter = AdaptiveLimiter(initial=2)
+    _window(limiter, clock, elapsed=1.0)
+    assert limiter.limit == 3
+    # Throughput stays flat: same count over a longer window each time
+    for _ in range(PROBE_AFTER - 1):
+        _window(limiter, clock, elapsed=2.0)
+        assert limiter.limit == 3
+    _window(limiter, clock, elapsed=2.0)
+    assert limiter.limit == 4
+
+
+def test_cancelled_requests_do_not_count(clock):
+    limiter = AdaptiveLimiter(initial=2)
+    for _ in range(MIN_WINDOW * 2):
+        assert limiter.acquire()
+        limiter.release()
+    assert limiter.limit == 2
+    assert limiter.in_flight == 0
+
+
+def test_acquire_gives_up_when_cancelled():
+    limiter = AdaptiveLimiter(initial=1)
+    cancel = threading.Event()
+    assert limiter.acquire(cancel)
+    cancel.set()
+    assert not limiter.acquire(cancel)
+    with limiter.slot(cancel) as acquired:
+        assert not acquired
+    assert limiter.in_flight == 1
+
+
+def test_slot_marks_exceptions_as_errors(clock):
+    limiter = AdaptiveLimiter(initial=4)
+    with pytest.raises(RuntimeError), limiter.slot():
+        raise RuntimeError
+    assert limiter.in_flight == 0
+    _window(limiter, clock)
+    assert limiter.limit == 2
@@ -0,0 +1,87 @@
+import threading
+
+from flashcard_gen.duplicate_check import DuplicateChecker, SemanticIndex
+from flashcard_gen.embeddings import EmbeddingCache, HashEmbedder
+from flashcard_gen.schema import Card, SimilarityMethod
+from flashcard_gen.store import CardStore
+
+
+def _semantic_checker(**kwargs) -> DuplicateChecker:
+    return DuplicateChecker(method=SimilarityMethod.SEMANTIC, semantic_threshold=0.9,
+                            embedder=HashEmbedder(64, cache=EmbeddingCache()), **kwargs)
+
+
+def test_string_duplicates_within_a_run():
+    checker = DuplicateChecker(string_threshold=0.8)
+    existing = [Card("What is the output range of sigmoid?", "0 to 1")]
+    assert checker.is_duplicate(Card("What is the output range of the sigmoid?", "x"), existing)
+    assert checker.is_duplicate(Card("what is the OUTPUT range of sigmoid", "x"), existing)
+    assert not checker.is_duplicate(Card("Who proposed backpropagation?", "x"), existing)
+
+
+def test_semantic_duplicates_within_a_run():
+    checker = _semantic_checker()
+    run = checker.new_run()
+    existing = [Card("gradient descent minimizes a loss function", "a")]
+    assert checker.is_duplicate(Card("Gradient descent minimizes a loss function!", "b"),
+                                existing, run)
+    assert not checker.is_duplicate(Card("Mitochondria produce ATP in cells", "b"), existing, run)
+    assert len(run) == 1
+
+
+def test_interleaved_runs_on_a_shared_checker_stay_separate():
+    checker = _semantic_checker()
+    first, second = checker.new_run(), checker.new_run()
+    cards_a = [Card("What does the heart pump?", "Blood")]
+    cards_b = [Card("What is the capital of France?", "Paris")]
+
+    # Alternate between the runs, as two server requests would
+    for _ in range(3):
+        assert not checker.is_duplicate(Card("What is the capital of France?", "x"), cards_a, first)
+        assert not checker.is_duplicate(Card("What does the heart pump?", "x"), cards_b, second)
+        assert checker.is_duplicate(Card("What does the heart pump?", "x"), cards_a, first)
+        assert checker.is_duplicate(Card("What is the capital of France?", "x"), cards_b, second)
+
+
+def test_concurrent_runs_with_history(tmp_path):
+    store = CardStore(tmp_path / "cards.db")
+    checker = _semantic_checker(store=store)
+    checker.commit([Card("What is a prime number?", "Divisible only by 1 and itself")])
+    errors = []
+
+    def run(name: str):
+        cards, dedup = [], checker.new_run()
+        for i in range(40):
+            card = Card(f"{name} question number {i} about topic {i * 7}?", "a")
+            if checker.is_duplicate(card, cards, dedup):
+                errors.append(card.front)
+            cards.append(card)
+        if not checker.is_duplicate(Card("What is a prime number?", "x"), cards, dedup):
+            errors.append("history missed")
+
+    threads = [threading.Thread(target=run, args=(name,)) for name in ("alpha", "beta", "gamma")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+
+
+def test_history_from_store(tmp_path):
+    store = CardStore(tmp_path / "cards.db")
+    checker = DuplicateChecker(store=store)
+    assert checker.commit([Card("What is entropy?", "Disorder")]) == 1
+
+    reopened = DuplicateChecker(store=CardStore(tmp_path / "cards.db"))
+    assert reopened.is_duplicate(Card("what is entropy", "x"), [])
+    assert not reopened.is_duplicate(Card("What is enthalpy of fusion?", "x"), [])
+
+
+def test_semantic_index_switches_to_hnsw():
+    embedder = HashEmbedder(32, cache=EmbeddingCache())
+    fronts = [f"card {i} on subject {i * 13}" for i in range(30)]
+    index = SemanticIndex(hnsw_min_size=20)
+    index.add(fronts, embedder.embed(fronts))
+    assert len(index) == 30
+    score, front = index.search(embedder.embed_one(fronts[25]))[0]
+    assert front == fronts[25] and score > 0.99
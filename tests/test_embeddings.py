@@ -0,0 +1,63 @@
+import numpy as np
+
+from flashcard_gen.embeddings import EmbeddingCache, HashEmbedder
+
+
+def test_cache_evicts_least_recently_used():
+    cache = EmbeddingCache(max_entries=2)
+    cache.put("m", "a", [1.0, 0.0])
+    cache.put("m", "b", [0.0, 1.0])
+    assert cache.get("m", "a") is not None  # "b" is now the oldest
+    cache.put("m", "c", [1.0, 1.0])
+
+    assert len(cache) == 2
+    assert cache.get("m", "b") is None
+    np.testing.assert_array_equal(cache.get("m", "a"), [1.0, 0.0])
+    np.testing.assert_array_equal(cache.get("m", "c"), [1.0, 1.0])
+
+
+def test_evicted_rows_are_reused():
+    cache = EmbeddingCache(max_entries=4)
+    for i in range(100):
+        cache.put("m", f"text {i}", np.full(8, i, dtype=np.float32))
+    assert len(cache) == 4
+    assert cache.nbytes <= 16 * 8 * 4
+    for i in range(96, 100):
+        np.testing.assert_array_equal(cache.get("m", f"text {i}"), np.full(8, i))
+
+
+def test_resize_and_dtype_keep_entries():
+    cache = EmbeddingCache()
+    for i in range(10):
+        cache.put("m", str(i), [float(i), 0.5])
+    cache.set_dtype(np.float16)
+    cache.resize(3)
+    assert len(cache) == 3
+    assert [cache.get("m", str(i)) is not None for i in range(10)] == [False] * 7 + [True] * 3
+    assert cache.get("m", "9").dtype == np.float32
+
+
+def test_embed_returns_every_vector_past_the_limit():
+    embedder = HashEmbedder(32, cache=EmbeddingCache(max_entries=3))
+    texts = [f"note about topic {i}" for i in range(10)]
+    vectors = embedder.embed(texts)
+    assert vectors.shape == (10, 32)
+    np.testing.assert_allclose(vectors, HashEmbedder(32, cache=EmbeddingCache()).embed(texts))
+    assert len(embedder.cache) == 3
+
+
+def test_embedders_share_cache_by_name():
+    cache = EmbeddingCache()
+    first = HashEmbedder(16, cache=cache)
+    first.embed(["shared text"])
+    assert HashEmbedder(16, cache=cache).cached("shared text") is not None
+    assert HashEmbedder(8, cache=cache).cached("shared text") is None
+
+
+def test_encode_bypasses_the_cache():
+    embedder = HashEmbedder(16, cache=EmbeddingCache())
+    embedder.prime({"primed text": [1.0] * 16})
+    vectors = embedder.encode(["primed text", "other text"])
+    assert vectors.shape == (2, 16)
+    assert not np.allclose(vectors[0], 1.0)
+    assert len(embedder.cache) == 1
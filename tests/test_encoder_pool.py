@@ -0,0 +1,92 @@
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+from flashcard_gen import embeddings, encoder_pool
+from flashcard_gen.encoder_pool import MAX_PENDING_PER_PROCESS, EncoderPool, get_pool
+
+
+class FakeEncoder:
+    def __init__(self, model_name, backend, threads):
+        self.settings = (model_name, backend, threads)
+        self.batch_sizes = []
+
+    def encode(self, texts, batch_size):
+        self.batch_sizes.append(batch_size)
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+class FakeExecutor:
+    """Runs the pool's worker functions in this process."""
+
+    instances = []
+
+    def __init__(self, max_workers, mp_context, initializer, initargs):
+        self.max_workers = max_workers
+        self.start_method = mp_context.get_start_method()
+        self.initargs = initargs
+        initializer(*initargs)
+        FakeExecutor.instances.append(self)
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def fake_workers(monkeypatch):
+    FakeExecutor.instances.clear()
+    monkeypatch.setattr(encoder_pool, "ProcessPoolExecutor", FakeExecutor)
+    monkeypatch.setattr(embeddings, "get_encoder", FakeEncoder)
+    monkeypatch.setattr(encoder_pool.os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(encoder_pool, "_worker_encoder", None)
+    get_pool.cache_clear()
+    yield
+    get_pool.cache_clear()
+
+
+def test_workers_spawn_and_split_the_cpu_threads():
+    pool = EncoderPool("model", "onnx", processes=2)
+    executor = FakeExecutor.instances[0]
+    assert executor.max_workers == pool.processes == 2
+    assert executor.start_method == "spawn"
+    assert executor.initargs == ("model", "onnx", 4)
+    assert encoder_pool._worker_encoder.settings == ("model", "onnx", 4)
+
+
+def test_submit_encodes_with_the_worker_encoder():
+    pool = EncoderPool("model", processes=1)
+    result = pool.submit(["ab", "abcd"], batch_size=16).result()
+    assert result.dtype == np.float32
+    assert result[:, 0].tolist() == [2.0, 4.0]
+    assert encoder_pool._worker_encoder.batch_sizes == [16]
+
+
+def test_map_batches_keeps_order_and_bounds_pending():
+    pool = EncoderPool("model", processes=2)
+    pulled = 0
+
+    def batches():
+        nonlocal pulled
+        for i in range(1, 11):
+            pulled += 1
+            yield ["x" * i]
+
+    seen = []
+    for result in pool.map_batches(batches(), batch_size=4):
+        seen.append(result[0, 0])
+        # Batches submitted but not yet handed to the consumer
+        assert pulled - len(seen) < pool.processes * MAX_PENDING_PER_PROCESS
+    assert seen == [float(i) for i in range(1, 11)]
+
+
+def test_get_pool_reuses_a_pool_per_settings():
+    pool = get_pool("model", "torch", 2)
+    assert get_pool("model", "torch", 2) is pool
+    assert get_pool("model", "onnx", 2) is not pool
+    assert len(FakeExecutor.instances) == 2
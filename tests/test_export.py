@@ -0,0 +1,61 @@
+import io
+import json
+import sqlite3
+import zipfile
+
+from flashcard_gen.export import note_guid, write_apkg, write_csv, write_json, write_jsonl
+from flashcard_gen.schema import Card, CardType
+
+CARDS = [
+    Card("Is a<b for a=1, b=2?", "Yes, 1 < 2", CardType.BASIC),
+    Card("What does List<T> hold?", 'Items of type "T"', CardType.BASIC),
+    Card("The {{c1::heart}} pumps {{c2::blood}}.", "", CardType.CLOZE),
+]
+
+
+def _read_apkg(path, tmp_path) -> sqlite3.Connection:
+    with zipfile.ZipFile(path) as zf:
+        assert json.loads(zf.read("media")) == {}
+        zf.extract("collection.anki2", tmp_path)
+    return sqlite3.connect(tmp_path / "collection.anki2")
+
+
+def test_apkg_notes_cards_and_escaping(tmp_path):
+    path = tmp_path / "deck.apkg"
+    assert write_apkg(iter(CARDS), path, deck_name="Biology::Heart") == 3
+
+    conn = _read_apkg(path, tmp_path)
+    notes = conn.execute("SELECT guid, flds, sfld FROM notes ORDER BY id").fetchall()
+    assert [n[0] for n in notes] == [note_guid(c) for c in CARDS]
+    assert notes[0][1] == "Is a&lt;b for a=1, b=2?\x1fYes, 1 &lt; 2"
+    assert notes[1][1] == 'What does List&lt;T&gt; hold?\x1fItems of type "T"'
+    assert notes[0][2] == CARDS[0].front
+
+    # One card per cloze deletion
+    ords = conn.execute("SELECT nid, ord FROM cards ORDER BY id").fetchall()
+    assert len(ords) == 4
+    assert sorted(o for _, o in ords[2:]) == [0, 1]
+
+    decks = json.loads(conn.execute("SELECT decks FROM col").fetchone()[0])
+    assert "Biology::Heart" in {d["name"] for d in decks.values()}
+
+
+def test_note_guid_is_stable():
+    assert note_guid(Card("Q?", "A")) == note_guid(Card("Q?", "other answer"))
+    assert note_guid(Card("Q?", "A")) != note_guid(Card("Other?", "A"))
+
+
+def test_text_writers_match_json():
+    out = io.StringIO()
+    assert write_json(CARDS, out) == 3
+    assert json.loads(out.getvalue()) == [c.as_dict() for c in CARDS]
+
+    out = io.StringIO()
+    write_jsonl(CARDS, out)
+    lines = out.getvalue().splitlines()
+    assert [json.loads(line) for line in lines] == [c.as_dict() for c in CARDS]
+
+    out = io.StringIO()
+    write_csv(CARDS[1:2], out)
+    assert out.getvalue() == ('front,back,type\n'
+                              '"What does List<T> hold?","Items of type ""T""","basic"\n')
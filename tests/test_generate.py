@@ -0,0 +1,171 @@
+import itertools
+
+import pytest
+
+from flashcard_gen import generate
+from flashcard_gen.client import set_client
+from flashcard_gen.duplicate_check import DuplicateChecker
+from flashcard_gen.generate import (
+    EXHAUST_AFTER,
+    MAX_ATTEMPTS,
+    _ChunkState,
+    _fill_from_chunks,
+    _start_run,
+    _stream_chat,
+    generate_flashcard_set,
+    generate_flashcard_set_rag,
+)
+from flashcard_gen.parser import JSONParser, SchemaParser, SimpleParser
+from flashcard_gen.scheduler import DocumentOrderScheduler
+from flashcard_gen.schema import Card, Chunk, SimilarityMethod
+from flashcard_gen.stats import GenerationStats
+
+NOTES = "# Notes\n\nSome notes about a topic worth a card or two."
+
+
+def _state() -> _ChunkState:
+    return _ChunkState(Chunk("Photosynthesis converts light into chemical energy."))
+
+
+def test_first_duplicate_keeps_full_budget():
+    state = _state()
+    state.record(Card("What is photosynthesis?", "Light to chemical energy"), False)
+    assert state.retry_budget() == MAX_ATTEMPTS
+    assert not state.used_up()
+
+
+def test_duplicate_streak_exhausts_chunk():
+    state = _state()
+    for i in range(EXHAUST_AFTER):
+        state.record(Card(f"Front {i}", "Back"), False)
+    assert state.used_up()
+
+
+def test_budget_shrinks_with_duplicate_rate():
+    state = _state()
+    state.record(Card("A?", "a"), True)
+    state.record(Card("B?", "b"), False)
+    state.record(Card("C?", "c"), True)
+    state.record(Card("D?", "d"), False)
+    assert state.retry_budget() == round(MAX_ATTEMPTS * 0.5)
+    assert state.fronts == ["A?", "B?", "C?", "D?"]
+
+
+def test_parse_failures_spend_budget_without_streak():
+    state = _state()
+    for _ in range(MAX_ATTEMPTS):
+        state.record(None, False)
+    assert state.streak == 0
+    assert state.used_up()
+
+
+def test_speculative_late_cards_do_not_exhaust_chunk(fake_client):
+    fake_client(delay=0.02)
+    stats = GenerationStats()
+    cards = generate_flashcard_set(NOTES, num_cards=1, speculation=3.0, max_in_flight=3,
+                                   stats=stats)
+    assert len(cards) == 1
+    assert stats.exhausted_chunks == 0
+    assert stats.duplicates == 0
+
+
+def test_speculative_counts_cancelled_before_returning(fake_client):
+    client = fake_client(delay=[0.0, 0.1, 0.1])
+    stats = GenerationStats()
+    generate_flashcard_set(NOTES, num_cards=1, speculation=3.0, max_in_flight=3, stats=stats)
+    # The slow calls were cancelled, and counted before returning
+    assert len(client.calls) == stats.llm_calls == 3
+    assert stats.cancelled == 2
+
+
+def test_fill_continues_from_earlier_states(fake_client):
+    client = fake_client(itertools.repeat("Q: Same question?\nA: Same answer\n"))
+    chunks = [Chunk("First chunk of notes."), Chunk("Second chunk of notes.")]
+    checker = DuplicateChecker(method=SimilarityMethod.STRING)
+    run = _start_run(3, checker, GenerationStats(), False, None, None)
+
+    scheduler = DocumentOrderScheduler()
+    states = _fill_from_chunks(run, chunks, scheduler=scheduler, model="m")
+    assert all(state.exhausted for state in states)
+    calls = len(client.calls)
+
+    # Used-up chunks are not called again
+    assert _fill_from_chunks(run, chunks, scheduler=scheduler, states=states, model="m") is states
+    assert len(client.calls) == calls
+
+
+def test_pipelined_rag_second_fill_reuses_states(fake_client, monkeypatch):
+    fake_client(itertools.repeat("Q: Same question?\nA: Same answer\n"))
+    fills = []
+
+    def fill(*args, **kwargs):
+        fills.append(kwargs.get("states"))
+        states = _fill_from_chunks(*args, **kwargs)
+        fills.append(states)
+        return states
+
+    monkeypatch.setattr(generate, "_fill_from_chunks", fill)
+    cards = generate_flashcard_set_rag(NOTES, num_cards=2, keywords=["topic"], embedder="hash",
+                                       pipeline=True)
+    assert len(cards) == 1
+    # The keyword card was a duplicate, so a second fill ran on the first one's states
+    first_in, first_out, second_in, _ = fills
+    assert first_in is None
+    assert second_in is first_out is not None
+
+
+class _PartsClient:
+    """Streams the given parts, recording how many were read and whether the stream closed."""
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.read = 0
+        self.closed = False
+
+    def chat(self, model, messages, options=None, stream=False, **extra):
+        def parts():
+            try:
+                for part in self.parts:
+                    self.read += 1
+                    yield {"message": {"content": part}}
+            finally:
+                self.closed = True
+        return parts()
+
+
+@pytest.mark.parametrize("parser, parts, expected", [
+    (SimpleParser(), ["Q: What", " is ATP?\nA: An energy", " carrier\n", "Note: more", " text"],
+     "Q: What is ATP?\nA: An energy carrier\n"),
+    (JSONParser(), ['{"front": "What is ATP?",', ' "back": "Energy"}', "\nextra"],
+     '{"front": "What is ATP?", "back": "Energy"}'),
+])
+def test_stream_stops_once_card_is_complete(parser, parts, expected):
+    client = _PartsClient(parts)
+    set_client(client)
+    try:
+        text, stopped_early = _stream_chat("m", [], {}, parser=parser)
+    finally:
+        set_client(None)
+    assert (text, stopped_early) == (expected, True)
+    assert client.read < len(parts)
+    assert client.closed
+
+
+def test_stream_reads_everything_without_early_stop():
+    parts = ['{"front": "Q?",', ' "back": "A"}']
+    for parser in (None, SchemaParser()):
+        client = _PartsClient(parts)
+        set_client(client)
+        try:
+            assert _stream_chat("m", [], {}, parser=parser) == ("".join(parts), False)
+        finally:
+            set_client(None)
+        assert client.read == len(parts)
+
+
+def test_verbose_output_goes_to_stderr(fake_client, capsys):
+    fake_client()
+    generate_flashcard_set(NOTES, num_cards=1, verbose=True)
+    out, err = capsys.readouterr()
+    assert out == ""
+    assert "[DEBUG]" in err
@@ -0,0 +1,112 @@
+import select
+import socketserver
+import threading
+import time
+
+import httpx
+import ollama
+import pytest
+
+from flashcard_gen.client import read_timeout, set_client
+from flashcard_gen.generate import _generate_card
+from flashcard_gen.hedge import LatencyTracker, hedged_call
+from flashcard_gen.stats import GenerationStats
+
+
+class _StallingHandler(socketserver.BaseRequestHandler):
+    """Sends the start of a chat stream, then goes silent until the client hangs up."""
+
+    def handle(self):
+        self.request.recv(65536)
+        self.request.sendall(b"HTTP/1.1 200 OK\r\ncontent-type: application/x-ndjson\r\n"
+                             b"transfer-encoding: chunked\r\n\r\n")
+        line = b'{"message": {"role": "assistant", "content": "Q: Wh"}}\n'
+        self.request.sendall(b"%x\r\n%s\r\n" % (len(line), line))
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            readable, _, _ = select.select([self.request], [], [], 0.05)
+            if readable and not self.request.recv(1):
+                self.server.closed.set()
+                return
+
+
+@pytest.fixture
+def stalling_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _StallingHandler)
+    server.daemon_threads = True
+    server.closed = threading.Event()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    set_client(ollama.Client(host=f"http://127.0.0.1:{server.server_address[1]}"))
+    yield server
+    set_client(None)
+    server.shutdown()
+    server.server_close()
+
+
+def test_stalled_stream_is_closed_after_deadline(stalling_server):
+    stats = GenerationStats()
+    started = time.monotonic()
+    card = _generate_card("notes", "m", stats=stats, timeout=0.3)
+
+    assert card is None
+    assert time.monotonic() - started < 1
+    assert stats.timeouts == 1
+    # The worker's read times out too, closing the connection to the server
+    assert stalling_server.closed.wait(2)
+
+
+def test_read_timeout_applies_to_requests_in_this_thread_only():
+    seen = []
+
+    def server(request):
+        seen.append(request.extensions["timeout"]["read"])
+        return httpx.Response(200, json={"message": {"role": "assistant", "content": "Q: a\nA: b"}})
+
+    client = ollama.Client(transport=httpx.MockTransport(server), timeout=5)
+    set_client(client)
+    try:
+        client.chat(model="m", messages=[])
+        with read_timeout(0.5):
+            client.chat(model="m", messages=[])
+            other = threading.Thread(target=client.chat, kwargs={"model": "m", "messages": []})
+            other.start()
+            other.join()
+        client.chat(model="m", messages=[])
+    finally:
+        set_client(None)
+    assert seen == [5, 0.5, 5, 5]
+
+
+def test_hedge_wins_when_first_request_is_slow():
+    latency = LatencyTracker(min_samples=1)
+    latency.record(0.01)
+    stats = GenerationStats()
+    calls = []
+
+    def fn(event):
+        calls.append(event)
+        if len(calls) == 1:
+            while not event.is_set():
+                time.sleep(0.01)
+            return "slow"
+        return "fast"
+
+    assert hedged_call(fn, timeout=2, latency=latency, stats=stats) == "fast"
+    assert stats.hedges == 1
+    assert stats.hedge_wins == 1
+    # The loser is told to stop
+    assert calls[0].is_set()
+
+
+def test_deadline_raises_and_cancels():
+    events = []
+
+    def fn(event):
+        events.append(event)
+        event.own.wait(5)
+
+    stats = GenerationStats()
+    with pytest.raises(TimeoutError):
+        hedged_call(fn, timeout=0.1, stats=stats)
+    assert stats.timeouts == 1
+    assert events[0].is_set()
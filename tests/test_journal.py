@@ -0,0 +1,67 @@
+import pytest
+
+from flashcard_gen.journal import Journal, JournalMismatch, run_header
+from flashcard_gen.schema import Card
+
+RUN = run_header("# Notes\n\nSome notes.", num_cards=10, model="qwen2.5:3b")
+
+
+def _card(i: int) -> Card:
+    return Card(f"What is fact {i}?", f"Fact {i}")
+
+
+def test_resume_restores_cards_and_finished_sources(tmp_path):
+    path = tmp_path / "run.journal"
+    journal = Journal(path, run=RUN)
+    journal.record_card("chunk-a", _card(0), [0.5, 0.25])
+    journal.record_card("chunk-b", _card(1))
+    journal.record_done("chunk-a")
+    journal.close()
+
+    resumed = Journal(path, resume=True, run=RUN)
+    assert resumed.cards == [_card(0), _card(1)]
+    assert resumed.finished == {"chunk-a"}
+    assert resumed.fronts_by_source == {"chunk-a": [_card(0).front], "chunk-b": [_card(1).front]}
+    assert resumed.embeddings == {_card(0).front: [0.5, 0.25]}
+
+
+def test_torn_last_line_is_cut_before_appending(tmp_path):
+    path = tmp_path / "run.journal"
+    journal = Journal(path, run=RUN)
+    for i in range(5):
+        journal.record_card("chunk", _card(i))
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"event": "card", "source": "chunk", "ca')  # Killed mid-write
+
+    journal = Journal(path, resume=True, run=RUN)
+    assert len(journal.cards) == 5
+    journal.record_card("chunk", _card(5))
+    journal.close()
+
+    assert Journal(path, resume=True, run=RUN).cards == [_card(i) for i in range(6)]
+
+
+def test_resume_refuses_other_run(tmp_path):
+    path = tmp_path / "run.journal"
+    Journal(path, run=RUN).close()
+    other = run_header("# Other notes", num_cards=10, model="qwen2.5:3b")
+    with pytest.raises(JournalMismatch):
+        Journal(path, resume=True, run=other)
+    with pytest.raises(JournalMismatch):
+        Journal(path, resume=True, run={**RUN, "num_cards": 20})
+
+
+def test_without_resume_starts_over(tmp_path):
+    path = tmp_path / "run.journal"
+    journal = Journal(path, run=RUN)
+    journal.record_card("chunk", _card(0))
+    journal.close()
+
+    Journal(path, run=RUN).close()
+    assert Journal(path, resume=True, run=RUN).cards == []
+
+
+def test_missing_journal_resumes_empty(tmp_path):
+    journal = Journal(tmp_path / "new.journal", resume=True, run=RUN)
+    assert journal.cards == [] and not journal.finished
@@ -0,0 +1,56 @@
+import numpy as np
+
+from flashcard_gen.minhash import (
+    drop_near_duplicates,
+    near_duplicate_groups,
+    signature,
+    similarity,
+)
+from flashcard_gen.schema import Chunk
+
+BASE = ("Gradient descent updates the parameters in the direction of the negative gradient "
+        "of the loss, scaled by a learning rate that controls the step size at each iteration "
+        "until the loss stops improving or a maximum number of steps is reached.")
+OTHER = ("Mitochondria are membrane-bound organelles that generate most of the chemical energy "
+         "needed to power the biochemical reactions of the cell, stored as ATP molecules.")
+
+
+def _jaccard(a: str, b: str, size: int = 5) -> float:
+    def grams(text):
+        words = text.lower().replace(",", "").replace(".", "").split()
+        return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    ga, gb = grams(a), grams(b)
+    return len(ga & gb) / len(ga | gb)
+
+
+def test_signature_is_deterministic_and_case_folded():
+    np.testing.assert_array_equal(signature(BASE), signature(BASE.upper()))
+    assert similarity(signature(BASE), signature(BASE)) == 1.0
+
+
+def test_similarity_estimates_jaccard():
+    edited = BASE.replace("until the loss stops improving", "until the validation loss plateaus")
+    estimate = similarity(signature(BASE), signature(edited))
+    assert abs(estimate - _jaccard(BASE, edited)) < 0.15
+    assert similarity(signature(BASE), signature(OTHER)) < 0.1
+
+
+def test_groups_link_near_duplicates_transitively():
+    near = BASE.replace("maximum", "fixed maximum")
+    nearer = near.replace("fixed maximum", "fixed upper")
+    groups = near_duplicate_groups([BASE, OTHER, near, nearer], threshold=0.7)
+    assert sorted(groups) == [[0, 2, 3], [1]]
+
+
+def test_drop_near_duplicates_keeps_longest_in_document_order():
+    longer = BASE + " Momentum can speed this up."
+    chunks = [Chunk(BASE, "a"), Chunk(OTHER, "b"), Chunk(longer, "c")]
+    kept = drop_near_duplicates(chunks, threshold=0.7)
+    assert [c.header for c in kept] == ["b", "c"]
+    assert drop_near_duplicates(chunks[:1]) == chunks[:1]
+
+
+def test_distinct_chunks_are_all_kept():
+    chunks = [Chunk(f"Section {i} covers topic number {i} with its own distinct words {i * 31}.")
+              for i in range(50)]
+    assert len(drop_near_duplicates(chunks, threshold=0.8)) == 50
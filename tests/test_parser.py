@@ -0,0 +1,99 @@
+import json
+
+from flashcard_gen.parser import ClozeParser, JSONParser, SchemaParser, SimpleParser
+from flashcard_gen.prompts import NUM_PREDICT
+from flashcard_gen.schema import CardType, flashcard_schema
+
+
+def test_json_parser_reads_cloze_object():
+    raw = 'Here you go:\n```json\n{"front": "The {{c1::mitochondria}} makes ATP.", ' \
+          '"back": "", "type": "cloze"}\n```'
+    card = JSONParser().parse(raw)
+    assert card is not None
+    assert card.front == "The {{c1::mitochondria}} makes ATP."
+    assert card.type == CardType.CLOZE
+
+
+def test_json_parser_fixes_trailing_comma():
+    card = JSONParser().parse('{"front": "What is 2 + 2?", "back": "4",}')
+    assert card is not None and card.back == "4"
+
+
+def test_json_parser_waits_for_whole_cloze_object():
+    parser = JSONParser()
+    partial = '{"front": "The {{c1::mitochondria}}'
+    assert parser.parse_partial(partial) is None
+    assert parser.parse_partial(partial + ' makes ATP.", "back": "", "type": "cloze"}')
+
+
+def test_json_parser_rejects_invalid_card():
+    assert JSONParser().parse('{"front": "What?", "back": ""}') is None
+    assert JSONParser().parse("no json here") is None
+
+
+def test_simple_and_cloze_parsers():
+    card = SimpleParser().parse("Q: What is the range of sigmoid?\nA: 0 to 1")
+    assert (card.front, card.back) == ("What is the range of sigmoid?", "0 to 1")
+    assert SimpleParser().parse_partial("Q: What is it?\nA: Something") is None
+    assert ClozeParser().parse("C: The {{c1::heart}} pumps blood.").type == CardType.CLOZE
+    assert ClozeParser().parse("C: The heart pumps blood.") is None
+
+
+def test_schema_parser():
+    card = SchemaParser().parse(json.dumps({"front": "Q?", "back": "A", "type": "basic"}))
+    assert card is not None and card.front == "Q?"
+
+
+def test_mixed_schema_allows_every_type():
+    schema = flashcard_schema("mixed")
+    assert set(schema["properties"]["type"]["enum"]) == {t.value for t in CardType}
+    assert flashcard_schema("cloze")["properties"]["type"]["enum"] == ["cloze"]
+
+
+def test_schema_prompts_have_token_caps():
+    assert {"basic_schema", "cloze_schema"} <= NUM_PREDICT.keys()
+
+
+def test_json_parsers_ignore_extra_keys():
+    raw = '{"front": "What is ATP?", "back": "Energy carrier", "type": "basic", ' \
+          '"explanation": "Made in mitochondria"}'
+    assert JSONParser().parse(raw).back == "Energy carrier"
+    assert SchemaParser().parse(raw).front == "What is ATP?"
+    assert SchemaParser().parse('["not", "an", "object"]') is None
+    assert SchemaParser().parse('{"back": "No front"}') is None
+
+
+def _first_complete(parser, raw: str) -> str | None:
+    """Feed ``raw`` one character at a time, as a stream would; the text when a card completes."""
+    text = ""
+    for char in raw:
+        text += char
+        if parser.complete_on and parser.complete_on in char and parser.parse_partial(text):
+            return text
+    return None
+
+
+def test_simple_parser_completes_after_answer_line():
+    raw = "Q: What is the range of sigmoid?\nA: 0 to 1\nExplanation: it squashes inputs."
+    assert _first_complete(SimpleParser(), raw) == "Q: What is the range of sigmoid?\nA: 0 to 1\n"
+    assert _first_complete(SimpleParser(), "Q: What is it?\nA: Something") is None
+    assert _first_complete(SimpleParser(), "Q: What is it?\n\nThinking...\n") is None
+
+
+def test_cloze_parser_completes_after_cloze_line():
+    raw = "C: The {{c1::heart}} pumps blood.\nMore text"
+    assert _first_complete(ClozeParser(), raw) == "C: The {{c1::heart}} pumps blood.\n"
+    assert _first_complete(ClozeParser(), "C: The {{c1::heart}} pumps blood.") is None
+    assert _first_complete(ClozeParser(), "C: No cloze here.\n") is None
+
+
+def test_json_parser_completes_after_closing_brace():
+    raw = '```json\n{"front": "What is ATP?", "back": "Energy carrier"}\n```'
+    assert _first_complete(JSONParser(), raw).endswith('"Energy carrier"}')
+    assert _first_complete(JSONParser(), '{"front": "What is ATP?", "back": "Ener') is None
+
+
+def test_schema_parser_never_stops_early():
+    raw = json.dumps({"front": "Q?", "back": "A", "type": "basic"})
+    assert _first_complete(SchemaParser(), raw) is None
+    assert SchemaParser().parse_partial(raw) is None
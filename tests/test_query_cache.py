@@ -0,0 +1,128 @@
+import numpy as np
+
+from flashcard_gen.embeddings import EmbeddingCache, HashEmbedder
+from flashcard_gen.query_cache import QueryCache
+from flashcard_gen.rag import FAISSRetriever
+from flashcard_gen.schema import Chunk
+from flashcard_gen.vault import VaultIndex
+
+CHUNKS = [
+    Chunk("Mitochondria burn sugar with oxygen to make ATP for the cell."),
+    Chunk("The cell membrane decides which molecules enter or leave."),
+    Chunk("Rome was founded on seven hills by the river Tiber."),
+]
+
+
+class CountingEmbedder(HashEmbedder):
+    """Counts the texts it is asked to embed, cached or not."""
+
+    def __init__(self):
+        super().__init__(32, cache=EmbeddingCache())
+        self.embedded = []
+
+    def embed(self, texts):
+        self.embedded.extend(texts)
+        return super().embed(texts)
+
+
+def _retriever(cache, chunks=CHUNKS):
+    retriever = FAISSRetriever(embedder=CountingEmbedder(), query_cache=cache)
+    retriever.index_chunks(chunks)
+    retriever.embedder.embedded.clear()
+    return retriever
+
+
+def test_query_embeddings_hit_per_encoder():
+    cache = QueryCache()
+    embedder = CountingEmbedder()
+    first = cache.embed(embedder, "energy")
+    np.testing.assert_array_equal(cache.embed(embedder, "energy"), first)
+    assert first.shape == (1, 32)
+    assert embedder.embedded == ["energy"]
+
+    # Same query, other encoder: its own entry
+    other = HashEmbedder(16, cache=EmbeddingCache())
+    assert cache.embed(other, "energy").shape == (1, 16)
+    assert cache.as_dict()["embedding_hits"] == 1
+    assert cache.as_dict()["embedding_misses"] == 2
+
+
+def test_repeated_retrieval_skips_encoder_and_search():
+    cache = QueryCache()
+    retriever = _retriever(cache)
+    first = retriever.retrieve("sugar and oxygen", k=2)
+    assert retriever.retrieve("sugar and oxygen", k=2) == first
+    assert retriever.embedder.embedded == ["sugar and oxygen"]
+    stats = cache.as_dict()
+    assert (stats["result_hits"], stats["result_misses"]) == (1, 1)
+
+    # Another k is another search, but the query vector is reused
+    assert len(retriever.retrieve("sugar and oxygen", k=1)) == 1
+    assert retriever.embedder.embedded == ["sugar and oxygen"]
+    assert cache.as_dict()["result_misses"] == 2
+
+
+def test_results_do_not_outlive_their_index():
+    cache = QueryCache()
+    retriever = _retriever(cache)
+    assert retriever.retrieve("seven hills", k=1)[0] is CHUNKS[2]
+    version = retriever.version
+
+    retriever.index_chunks(CHUNKS[:2])
+    assert retriever.version != version
+    assert retriever.retrieve("seven hills", k=1)[0] in CHUNKS[:2]
+    assert cache.as_dict()["result_hits"] == 0
+
+    # Indexing the same chunks again gives the same version, so results are reused
+    retriever.index_chunks(CHUNKS)
+    assert retriever.version == version
+    assert retriever.retrieve("seven hills", k=1)[0] is CHUNKS[2]
+    assert cache.as_dict()["result_hits"] == 1
+
+
+def test_vault_results_follow_file_changes():
+    cache = QueryCache()
+    vault = VaultIndex(CountingEmbedder(), query_cache=cache)
+    vault.add_file("cells.md", "# Cells\n" + CHUNKS[0].content)
+    assert vault.retrieve("seven hills", k=1)[0].source == "cells.md"
+    vault.add_file("rome.md", "# Rome\n" + CHUNKS[2].content)
+    assert vault.retrieve("seven hills", k=1)[0].source == "rome.md"
+    vault.remove_file("rome.md")
+    assert vault.retrieve("seven hills", k=1)[0].source == "cells.md"
+    assert cache.as_dict()["result_hits"] == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = QueryCache(max_embeddings=2, max_results=2)
+    embedder = CountingEmbedder()
+    for query in ("a", "b", "a", "c"):
+        cache.embed(embedder, query)
+    assert embedder.embedded == ["a", "b", "c"]
+    cache.embed(embedder, "b")
+    assert embedder.embedded == ["a", "b", "c", "b"]
+
+    for query in ("a", "b", "c"):
+        cache.put_results(query, 3, "v1", [query])
+    assert cache.results("a", 3, "v1") is None
+    assert cache.results("c", 3, "v1") == ["c"]
+    assert len(cache) == 4
+
+
+def test_save_and_load(tmp_path):
+    cache = QueryCache()
+    embedder = CountingEmbedder()
+    vector = cache.embed(embedder, "energy")
+    cache.put_results("energy", 3, "v1", [2, 0, 1])
+    cache.save(tmp_path / "queries.json")
+
+    loaded = QueryCache()
+    loaded.load(tmp_path / "queries.json")
+    np.testing.assert_allclose(loaded.embed(embedder, "energy"), vector)
+    assert loaded.results("energy", 3, "v1") == [2, 0, 1]
+    assert embedder.embedded == ["energy"]
+
+    # A missing or corrupt file leaves the cache as it was
+    (tmp_path / "bad.json").write_text("{", encoding="utf-8")
+    loaded.load(tmp_path / "bad.json")
+    loaded.load(tmp_path / "missing.json")
+    assert len(loaded) == 2
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from flashcard_gen.embeddings import EmbeddingCache, HashEmbedder
+from flashcard_gen.rag import INDEX_TYPES, PQ_MIN_CHUNKS, FAISSRetriever
+from flashcard_gen.schema import Chunk
+
+DIM = 64
+# Recall@10 against exact search on clustered vectors; flat is exact
+RECALL_FLOOR = {"flat": 1.0, "sq8": 0.95, "pq": 0.5}
+
+
+def _clustered(n: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors in clusters of about 50, near a low-dimensional subspace like embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n // 50, 16))
+    latent = centers[rng.integers(0, len(centers), n)] + 0.6 * rng.normal(size=(n, 16))
+    vectors = latent @ rng.normal(size=(16, DIM)) + 0.5 * rng.normal(size=(n, DIM))
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _retriever(index_type: str, n: int) -> FAISSRetriever:
+    chunks = [Chunk(content=f"chunk {i}") for i in range(n)]
+    embedder = HashEmbedder(DIM, cache=EmbeddingCache())
+    embedder.prime({c.content: v for c, v in zip(chunks, _clustered(n))})
+    retriever = FAISSRetriever(embedder=embedder, index_type=index_type)
+    retriever.index_chunks(chunks)
+    return retriever
+
+
+@pytest.mark.parametrize("index_type", INDEX_TYPES)
+def test_index_types_keep_recall(index_type):
+    retriever = _retriever(index_type, PQ_MIN_CHUNKS)
+    assert retriever.index_kind == index_type
+    assert retriever.index.ntotal == PQ_MIN_CHUNKS
+    assert retriever.recall() >= RECALL_FLOOR[index_type]
+
+
+def test_quantized_indexes_are_smaller():
+    sizes = {t: _retriever(t, 2000).index_bytes for t in ("flat", "sq8")}
+    assert sizes["sq8"] < sizes["flat"] / 3
+
+
+def test_small_pq_index_falls_back_to_sq8():
+    retriever = _retriever("pq", 2000)
+    assert retriever.index_kind == "sq8"
+    assert retriever.recall() >= RECALL_FLOOR["sq8"]
+
+
+def test_unknown_index_type():
+    with pytest.raises(ValueError, match="Unknown index type"):
+        FAISSRetriever(embedder="hash", index_type="hnsw")
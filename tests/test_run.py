@@ -1,49 +1,14 @@
-# # test_run.py
-# from flashcard_gen import generate_flashcard_set
-#
-# # Testing some notes I made on flow and diffusion models
-#
-# notes = """
-# ### 2 - Flow and Diffusion Models
-#
-# #### 2.1 - Flow models
-#
-# \- Fundamental objects for flow
-#
-# &nbsp;	- Trajectory
-#
-# &nbsp;		- $X:\[0,1] \\rightarrow\\mathbb{R}^{d}, t \\mapsto x\_{t}$
-#
-# &nbsp;	- Vector Field
-#
-# &nbsp;		- $u: \\mathbb{R}^{d}\\times\[0, 1] \\rightarrow \\mathbb{R}^{d}, \\,\\, (x, t) \\rightarrow u\_{t}(x)$
-#
-# &nbsp;		- Essentially gives directions at each timestep and coordinate
-#
-# &nbsp;	- Ordinary differential equation (ODE)
-#
-# &nbsp;		- $x\_{0}, \\frac{d}{dt}x\_{t} = u\_{{t}}(x\_{t})$ (initial condition can be some coordinate and initial velocity - although the lecture only specifies the initial coordinate)
-# """
-#
-# # Generate multiple cards
-# cards = generate_flashcard_set(
-#     notes=notes,
-#     num_cards=5,
-#     keywords=[],
-#     model="qwen2.5:3b",
-#     card_type="basic",
-#     string_threshold=0.0,
-#     verbose=False
-# )
-#
-# for card in cards:
-#     print(f"Q: {card.front}")
-#     print(f"A: {card.back}\n")
-
-# test_run.py
-from flashcard_gen import generate_flashcard_set, generate_flashcard_set_rag
-
-notes = """
+"""
+Regression runs over activation function notes, replayed from synthetic
+cassettes (see the ``cassette`` fixture). The traffic comes from the
+deterministic stand-in in stand_in_ollama.py, not a model, so these check the
+transport, parsing and dedup pipeline, not card quality. RAG runs use the hash
+embedder, so no encoder model is needed.
+"""
+
+from flashcard_gen import GenerationStats, generate_flashcard_set, generate_flashcard_set_rag
+
+NOTES = """
 ### Introduction
 
 Activation functions are used to figure out if a neuron has fired or not. In an artificial neural network the activation function is applied to the output (weighted sum + bias) of an individual neuron. The purpose of an activation function is to understand whether the particular input should be activated but also to normalize the activations. All activation function's output range from 0 to 1. Note, because weights can be less than 1, inputs can be negative.
@@ -111,56 +76,44 @@ This function is just the ReLU with a gradient for negative portions. This funct
 
 KWARGS = {
     "num_cards": 5,
-    "model": "qwen2.5:3b",
+    "model": "stand-in",
     "card_type": "basic",
     "string_threshold": 0.8,
-    "verbose":False,
+    "verbose": False,
 }
 
-print("METHOD 1: generate_flashcard_set (no RAG)")
-
-cards_basic = generate_flashcard_set(
-    notes=notes,
-    **KWARGS
-)
-
-for card in cards_basic:
-    print(f"Q: {card.front}")
-    print(f"A: {card.back}\n")
-
-
-print("=" * 60)
-print("METHOD 2: generate_flashcards_with_rag")
-print("=" * 60)
-
-cards_rag = generate_flashcard_set_rag(
-    notes=notes,
-    **KWARGS
-)
-
-for card in cards_rag:
-    print(f"Q: {card.front}")
-    print(f"A: {card.back}\n")
-
-
-print("=" * 60)
-print("METHOD 3: RAG with keywords")
-print("=" * 60)
-
-cards_rag_kw = generate_flashcard_set_rag(
-    notes=notes,
-    keywords=["sigmoid", "relu", "activation function"],
-    **KWARGS
-)
-
-for card in cards_rag_kw:
-    print(f"Q: {card.front}")
-    print(f"A: {card.back}\n")
-
 
-print("=" * 60)
-print("SUMMARY")
-print("=" * 60)
-print(f"Basic:        {len(cards_basic)} cards")
-print(f"RAG:          {len(cards_rag)} cards")
-print(f"RAG+keywords: {len(cards_rag_kw)} cards")
\ No newline at end of file
+def _check(cards, stats, transport):
+    assert len(cards) == KWARGS["num_cards"]
+    assert len({card.front for card in cards}) == len(cards)
+    assert all(card.front and card.back for card in cards)
+    # Every request matched a recording, and every recording was used
+    assert stats.errors == 0
+    assert transport.unused() == []
+
+
+def test_generate_flashcard_set(cassette):
+    transport = cassette("synthetic_activation_basic")
+    stats = GenerationStats()
+    cards = generate_flashcard_set(notes=NOTES, stats=stats, **KWARGS)
+    _check(cards, stats, transport)
+
+
+def test_generate_flashcard_set_rag(cassette):
+    transport = cassette("synthetic_activation_rag")
+    stats = GenerationStats()
+    cards = generate_flashcard_set_rag(notes=NOTES, stats=stats, embedder="hash", **KWARGS)
+    _check(cards, stats, transport)
+
+
+def test_generate_flashcard_set_rag_keywords(cassette):
+    transport = cassette("synthetic_activation_rag_keywords")
+    stats = GenerationStats()
+    cards = generate_flashcard_set_rag(
+        notes=NOTES,
+        keywords=["sigmoid", "relu", "activation function"],
+        stats=stats,
+        embedder="hash",
+        **KWARGS
+    )
+    _check(cards, stats, transport)
@@ -1,6 +1,12 @@
-from flashcard_gen import generate_flashcard_set, generate_flashcard_set_rag
+"""
+Regression runs over unconstrained optimization notes, replayed from
+synthetic cassettes (see the ``cassette`` fixture and test_run.py). RAG runs
+use the hash embedder, so no encoder model is needed.
+"""
+
+from flashcard_gen import GenerationStats, generate_flashcard_set, generate_flashcard_set_rag
 
-notes = """
+NOTES = """
 # Chapter 2 - Fundamentals of Unconstrained Optimization
 
 
@@ -252,63 +258,49 @@ Therefore the closed form solution can be given by: $$p\_{k} = -\\frac{\\Delta\_
 
 KWARGS = {
     "num_cards": 5,
-    "model": "qwen2.5:3b",
+    "model": "stand-in",
     "card_type": "basic",
     "string_threshold": 0.8,
-    "verbose":False,
+    "verbose": False,
 }
+KEYWORDS = ["unconstrained optimization", "trust region methods", "line search",
+            "Quasi-Newton Method"]
 
-print("Method 1: Generate_flashcards_set - No Keywords")
-
-cards_basic = generate_flashcard_set(
-    notes=notes,
-    **KWARGS
-)
-
-for card in cards_basic:
-    print(f"Q: {card.front}")
-    print(f"A: {card.back}\n")
-
-print("Method 2: Generate_flashcards_set - With Keywords")
-
-cards_basic_keywords = generate_flashcard_set(
-    notes=notes,
-    keywords=["unconstrained optimization", "trust region methods", "line search", "Quasi-Newton Method"],
-    **KWARGS
-)
-
-for card in cards_basic:
-    print(f"Q: {card.front}")
-    print(f"A: {card.back}\n")
-
-print("Method 3: generate_flashcards_with_rag - No Keywords")
 
-cards_rag = generate_flashcard_set_rag(
-    notes=notes,
-    **KWARGS
-)
+def _check(cards, stats, transport):
+    assert len(cards) == KWARGS["num_cards"]
+    assert len({card.front for card in cards}) == len(cards)
+    assert all(card.front and card.back for card in cards)
+    # Every request matched a recording, and every recording was used
+    assert stats.errors == 0
+    assert transport.unused() == []
 
-for card in cards_rag:
-    print(f"Q: {card.front}")
-    print(f"A: {card.back}\n")
 
+def test_generate_flashcard_set(cassette):
+    transport = cassette("synthetic_optimization_basic")
+    stats = GenerationStats()
+    cards = generate_flashcard_set(notes=NOTES, stats=stats, **KWARGS)
+    _check(cards, stats, transport)
 
-print("Method 4: RAG with keywords")
 
-cards_rag_keywords = generate_flashcard_set_rag(
-    notes=notes,
-    keywords=["unconstrained optimization", "trust region methods", "line search", "Quasi-Newton Method"],
-    **KWARGS
-)
+def test_generate_flashcard_set_keywords(cassette):
+    transport = cassette("synthetic_optimization_basic_keywords")
+    stats = GenerationStats()
+    cards = generate_flashcard_set(notes=NOTES, keywords=KEYWORDS, stats=stats, **KWARGS)
+    _check(cards, stats, transport)
 
-for card in cards_rag_keywords:
-    print(f"Q: {card.front}")
-    print(f"A: {card.back}\n")
 
+def test_generate_flashcard_set_rag(cassette):
+    transport = cassette("synthetic_optimization_rag")
+    stats = GenerationStats()
+    cards = generate_flashcard_set_rag(notes=NOTES, stats=stats, embedder="hash", **KWARGS)
+    _check(cards, stats, transport)
 
-print("SUMMARY")
 
-print(f"Basic:        {len(cards_basic)} cards")
-print(f"Basic + keywords: {len(cards_basic_keywords)} cards")
-print(f"RAG:          {len(cards_rag)} cards")
-print(f"RAG+keywords: {len(cards_rag_keywords)} cards")
\ No newline at end of file
+def test_generate_flashcard_set_rag_keywords(cassette):
+    transport = cassette("synthetic_optimization_rag_keywords")
+    stats = GenerationStats()
+    cards = generate_flashcard_set_rag(
+        notes=NOTES, keywords=KEYWORDS, stats=stats, embedder="hash", **KWARGS
+    )
+    _check(cards, stats, transport)
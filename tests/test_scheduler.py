@@ -0,0 +1,91 @@
+from collections import Counter
+
+import pytest
+
+from flashcard_gen.generate import _ChunkState
+from flashcard_gen.scheduler import (
+    CoverageScheduler,
+    DocumentOrderScheduler,
+    get_scheduler,
+)
+from flashcard_gen.schema import Chunk
+
+
+def _states(*texts: str) -> list[_ChunkState]:
+    return [_ChunkState(Chunk(text)) for text in texts]
+
+
+def test_document_order_visits_chunks_in_passes():
+    states = _states("first chunk", "second chunk", "third chunk")
+    scheduler = DocumentOrderScheduler()
+    scheduler.prepare(states)
+    order = []
+    for _ in range(6):
+        i = scheduler.pick(states)
+        order.append(i)
+        scheduler.record(i, True)
+    assert order == [0, 1, 2, 0, 1, 2]
+
+
+def test_document_order_stays_on_chunk_until_accepted():
+    states = _states("first chunk", "second chunk")
+    scheduler = DocumentOrderScheduler()
+    scheduler.prepare(states)
+    assert scheduler.pick(states) == 0
+    scheduler.record(0, False)
+    assert scheduler.pick(states) == 0
+    states[0].exhausted = True
+    assert scheduler.pick(states) == 1
+    states[1].exhausted = True
+    assert scheduler.pick(states) is None
+
+
+def test_document_order_spreads_concurrent_calls():
+    states = _states("a", "b", "c")
+    scheduler = DocumentOrderScheduler()
+    scheduler.prepare(states)
+    picked = []
+    for _ in range(3):
+        i = scheduler.pick(states)
+        states[i].in_flight += 1
+        picked.append(i)
+    assert sorted(picked) == [0, 1, 2]
+
+
+def test_coverage_favours_rich_keyword_chunks():
+    rich = ("Backpropagation computes gradients of the loss with respect to every weight "
+            "using the chain rule, layer by layer, from the output back to the input. "
+            "Backpropagation makes training deep networks practical.")
+    thin = "See above."
+    states = _states(thin, rich)
+    scheduler = CoverageScheduler()
+    scheduler.prepare(states, keywords=["backpropagation"])
+    assert scheduler.scores[1] > scheduler.scores[0]
+
+    calls = Counter(scheduler.pick(states) for _ in range(20))
+    assert calls[1] > calls[0] >= 1
+
+
+def test_coverage_novelty_penalises_covered_chunks():
+    text = "Photosynthesis converts sunlight, water and carbon dioxide into glucose."
+    fresh, covered = CoverageScheduler(), CoverageScheduler()
+    fresh.prepare(_states(text))
+    covered.prepare(_states(text), fronts=["How does photosynthesis convert sunlight, water "
+                                           "and carbon dioxide into glucose?"])
+    assert covered.scores[0] < fresh.scores[0]
+
+
+def test_coverage_skips_exhausted_chunks():
+    states = _states("alpha beta gamma delta", "epsilon zeta theta iota")
+    scheduler = CoverageScheduler()
+    scheduler.prepare(states)
+    states[0].exhausted = True
+    assert {scheduler.pick(states) for _ in range(4)} == {1}
+    states[1].exhausted = True
+    assert scheduler.pick(states) is None
+
+
+def test_get_scheduler():
+    assert isinstance(get_scheduler("coverage"), CoverageScheduler)
+    with pytest.raises(ValueError):
+        get_scheduler("random")
@@ -0,0 +1,139 @@
+import http.client
+import itertools
+import json
+import random
+import socket
+import threading
+import time
+
+import pytest
+
+from flashcard_gen.server import FlashcardServer, ServerState, validate_params
+
+NOTES = (
+    "# Cells\nMitochondria produce most of the energy a cell needs.\n\n"
+    "# Membranes\nThe cell membrane controls which molecules enter the cell."
+)
+
+CARDS = [
+    "Q: What do mitochondria produce?\nA: Energy\n",
+    "Q: What does the membrane control?\nA: Which molecules enter\n",
+    "Q: Where is DNA kept?\nA: In the nucleus\n",
+]
+
+
+def _unique_cards():
+    rng = random.Random(0)
+    for _ in itertools.count():
+        yield f"Q: What is {rng.getrandbits(64):x}?\nA: A number\n"
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = FlashcardServer(("127.0.0.1", 0), ServerState())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _post(server, path, params):
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+    try:
+        conn.request("POST", path, json.dumps(params), {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def test_health(server):
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+    conn.request("GET", "/health")
+    body = json.loads(conn.getresponse().read())
+    conn.close()
+    assert body["status"] == "ok"
+    assert set(body["limits"]) == {"generation", "embedding"}
+
+
+def test_generate(server, fake_client):
+    fake_client(CARDS)
+    status, body = _post(server, "/generate", {"notes": NOTES, "num_cards": 3, "keywords": None})
+    assert status == 200
+    body = json.loads(body)
+    assert [c["front"] for c in body["cards"]] == [c.split("\n")[0][3:] for c in CARDS]
+    assert body["stats"]["accepted"] == 3
+
+
+def test_stream(server, fake_client):
+    fake_client(CARDS)
+    status, body = _post(server, "/stream", {"notes": NOTES, "num_cards": 2})
+    assert status == 200
+    lines = [json.loads(line) for line in body.splitlines()]
+    assert [line["card"]["front"] for line in lines[:2]] == [
+        "What do mitochondria produce?", "What does the membrane control?"
+    ]
+    assert lines[2]["done"] and lines[2]["stats"]["accepted"] == 2
+
+
+@pytest.mark.parametrize("params, error", [
+    ({}, "'notes' must be a non-empty string"),
+    ({"notes": "  "}, "'notes' must be a non-empty string"),
+    ({"notes": 5}, "'notes' must be of type str"),
+    ({"notes": NOTES, "num_cards": "3"}, "'num_cards' must be of type int"),
+    ({"notes": NOTES, "num_cards": True}, "'num_cards' must be of type int"),
+    ({"notes": NOTES, "num_cards": 0}, "'num_cards' must be at least 1"),
+    ({"notes": NOTES, "keywords": "cells"}, "'keywords' must be of type list"),
+    ({"notes": NOTES, "keywords": ["cells", 2]}, "'keywords' must be a list of strings"),
+    ({"notes": NOTES, "card_type": "essay"}, "'card_type' must be one of: basic, cloze, mixed"),
+    ({"notes": NOTES, "threshold": 1.5}, "'threshold' must be in [0, 1]"),
+    ({"notes": NOTES, "rag": "yes"}, "'rag' must be of type bool"),
+    ({"notes": NOTES, "cards": 3}, "Unknown field: 'cards'"),
+])
+@pytest.mark.parametrize("path", ["/generate", "/stream"])
+def test_invalid_params_are_rejected(server, fake_client, path, params, error):
+    client = fake_client()
+    status, body = _post(server, path, params)
+    assert status == 400
+    assert json.loads(body)["error"].startswith(error)
+    assert client.calls == []
+
+
+def test_numbers_accept_ints_for_floats():
+    validate_params({"notes": NOTES, "temperature": 1, "threshold": 0.5, "timeout": None})
+
+
+def test_stream_stops_generating_when_client_disconnects(server, fake_client):
+    client = fake_client(_unique_cards(), delay=0.05)
+    request = json.dumps({"notes": NOTES, "num_cards": 1000}).encode()
+    sock = socket.create_connection(server.server_address, timeout=10)
+    sock.sendall(b"POST /stream HTTP/1.1\r\nHost: test\r\nContent-Type: application/json\r\n"
+                 b"Content-Length: %d\r\n\r\n%s" % (len(request), request))
+    received = b""
+    while b'"card"' not in received:
+        received += sock.recv(65536)
+    sock.close()
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        calls = len(client.calls)
+        time.sleep(1)
+        if len(client.calls) == calls:
+            break
+    else:
+        pytest.fail("generation kept going after the client disconnected")
+    assert len(client.calls) < 100
+
+
+@pytest.mark.parametrize("path", ["/generate", "/stream"])
+def test_replays_a_cassette(server, cassette, path):
+    transport = cassette(f"synthetic_server_{path[1:]}")
+    status, body = _post(server, path, {"notes": NOTES, "num_cards": 2, "model": "stand-in"})
+    assert status == 200
+    if path == "/generate":
+        cards = json.loads(body)["cards"]
+    else:
+        cards = [json.loads(line)["card"] for line in body.splitlines()[:-1]]
+    assert len(cards) == 2
+    assert all(card["front"] and card["back"] for card in cards)
+    assert transport.unused() == []
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from flashcard_gen.duplicate_check import DuplicateChecker
+from flashcard_gen.schema import Flashcard, SimilarityMethod
+from flashcard_gen.store import MAX_QUERY_PARAMS, CardStore, normalize_front
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CardStore.open(tmp_path / "cards.db")
+    yield store
+    store.close()
+
+
+def _cards(*fronts):
+    return [Flashcard(front=front, back="Back") for front in fronts]
+
+
+def test_normalize_front_keeps_cloze_markers():
+    assert normalize_front("  What is  ATP?! ") == "what is atp"
+    assert normalize_front("The {{c1::heart}} pumps.") == "the {{c1::heart}} pumps"
+
+
+def test_add_many_skips_stored_and_repeated_fronts(store):
+    assert store.add_many(_cards("What is ATP?", "what is atp", "What is DNA?")) == 2
+    assert store.add_many(_cards("WHAT IS DNA", "What is RNA?")) == 1
+    assert store.fronts() == ["What is ATP?", "What is DNA?", "What is RNA?"]
+
+
+def test_add_many_checks_large_batches(store):
+    fronts = [f"Question number {i}?" for i in range(MAX_QUERY_PARAMS * 2 + 10)]
+    assert store.add_many(_cards(*fronts[::2])) == len(fronts[::2])
+    assert store.add_many(_cards(*fronts)) == len(fronts[1::2])
+    assert len(store) == len(fronts)
+
+
+def test_embeddings_are_kept_per_model(store):
+    vectors = {"What is ATP?": [1.0, 0.0], "What is DNA?": [0.0, 1.0]}
+    store.add_many(_cards(*vectors), vectors, "hash-2")
+    store.add_many(_cards("What is RNA?"))
+
+    fronts, matrix = store.embeddings("hash-2")
+    assert fronts == ["What is ATP?", "What is DNA?"]
+    assert matrix.dtype == np.float32
+    assert matrix.tolist() == [[1.0, 0.0], [0.0, 1.0]]
+    assert store.embeddings("other-model") == ([], None)
+
+
+def test_reopen_keeps_history(tmp_path):
+    path = tmp_path / "cards.db"
+    store = CardStore.open(path)
+    assert CardStore.open(path) is store
+    store.add_many(_cards("What is ATP?"))
+    store.close()
+
+    reopened = CardStore.open(path)
+    try:
+        assert reopened is not store
+        assert reopened.fronts() == ["What is ATP?"]
+    finally:
+        reopened.close()
+
+
+def test_checker_rejects_cards_from_earlier_runs(tmp_path):
+    path = tmp_path / "cards.db"
+    store = CardStore.open(path)
+    checker = DuplicateChecker(method=SimilarityMethod.STRING, store=store)
+    assert not checker.is_duplicate(_cards("What does the mitochondria produce?")[0], [])
+    assert checker.commit(_cards("What does the mitochondria produce?")) == 1
+    store.close()
+
+    # A later run on the reopened store sees the committed card
+    store = CardStore.open(path)
+    try:
+        checker = DuplicateChecker(method=SimilarityMethod.STRING, store=store)
+        assert checker.is_duplicate(_cards("what does the mitochondria produce")[0], [])
+        assert checker.is_duplicate(_cards("What does a mitochondria produce?")[0], [])
+        assert not checker.is_duplicate(_cards("Where is DNA stored in the cell?")[0], [])
+    finally:
+        store.close()
@@ -0,0 +1,170 @@
+import os
+
+import numpy as np
+import pytest
+
+from flashcard_gen.chunker import ChunkByParagraph, ChunkHeaderThenParagraph
+from flashcard_gen.query_cache import QueryCache
+from flashcard_gen.vault import VaultIndex
+
+NOTES = {
+    "biology/cells.md": (
+        "# Cells\nMitochondria produce most of the energy a cell needs, burning sugar with "
+        "oxygen and storing the result as ATP for the rest of the cell.\n\n"
+        "# Membranes\nThe cell membrane is a double layer of lipids that controls which "
+        "molecules may enter or leave the cell, using channels and pumps."
+    ),
+    "biology/plants.md": (
+        "# Photosynthesis\nPlants turn light, water and carbon dioxide into sugar and oxygen "
+        "inside their chloroplasts, which hold the green pigment chlorophyll."
+    ),
+    "history/rome.md": (
+        "# Rome\nAccording to legend Rome was founded on seven hills by the river Tiber, "
+        "and it grew from a small town into the capital of an empire."
+    ),
+    "history/greece.md": (
+        "# Athens\nAthens was a city state in ancient Greece where citizens met in the "
+        "assembly and voted directly, an early form of democracy."
+    ),
+    "physics.md": (
+        "# Gravity\nGravity pulls every two masses towards each other with a force that "
+        "grows with their masses and falls with the square of their distance.\n\n"
+        "# Light\nLight travels through empty space at about three hundred thousand "
+        "kilometres per second, far faster than sound travels through air."
+    ),
+}
+QUERIES = ["energy in the cell", "light and water", "city on seven hills", "gravity", "democracy"]
+
+
+def _vault(shard_by="folder") -> VaultIndex:
+    return VaultIndex("hash", shard_by=shard_by, query_cache=QueryCache())
+
+
+def _write(root, notes):
+    for source, content in notes.items():
+        path = root / source
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+
+
+def _brute_force(vault, query, k):
+    chunks = [c for shard in vault.shards.values() for c in shard.chunks.values()]
+    vectors = vault.embedder.embed([c.content for c in chunks])
+    distances = ((vectors - vault.embedder.embed([query])[0]) ** 2).sum(axis=1)
+    order = np.argsort(distances, kind="stable")[:k]
+    return [(float(distances[i]), chunks[i].content) for i in order]
+
+
+@pytest.mark.parametrize("shard_by", ["folder", "file"])
+def test_sharded_search_matches_brute_force(shard_by):
+    vault = _vault(shard_by)
+    for source, content in NOTES.items():
+        vault.add_file(source, content)
+    assert len(vault.shards) == (3 if shard_by == "folder" else len(NOTES))
+
+    for query in QUERIES:
+        hits = vault.search(query, k=4)
+        expected = _brute_force(vault, query, len(vault))
+        assert [d for d, _ in hits] == pytest.approx([d for d, _ in expected[:4]], abs=1e-5)
+        # Ties may come back in any order, but each hit must be at its true distance
+        distances = {content: d for d, content in expected}
+        for d, chunk in hits:
+            assert d == pytest.approx(distances[chunk.content], abs=1e-5)
+
+
+def test_add_replace_and_remove_files():
+    vault = _vault()
+    assert vault.add_file("biology/cells.md", NOTES["biology/cells.md"]) == 2
+    assert vault.add_file("biology/plants.md", NOTES["biology/plants.md"]) == 1
+    assert len(vault) == 3
+    version = vault.version
+
+    # Replacing a file swaps its chunks, under new ids
+    assert vault.add_file("biology/cells.md", "# Cells\nRibosomes build proteins.") == 1
+    assert len(vault) == 2
+    assert vault.version != version
+    assert vault.retrieve("ribosomes build proteins", k=1)[0].source == "biology/cells.md"
+
+    assert vault.remove_file("biology/cells.md")
+    assert not vault.remove_file("biology/cells.md")
+    assert vault.remove_file("biology/plants.md")
+    assert len(vault) == 0
+    assert vault.shards == {}
+    assert vault.search("cells") == []
+
+
+def test_sync_reindexes_only_changed_files(tmp_path):
+    _write(tmp_path, NOTES)
+    _write(tmp_path, {".flashcard-gen-index/skipped.md": "# Hidden\nNot a note."})
+    vault = _vault()
+    assert vault.sync(tmp_path) == (len(NOTES), 0)
+    assert vault.sync(tmp_path) == (0, 0)
+    assert set(vault.files) == set(NOTES)
+
+    path = tmp_path / "history/rome.md"
+    stat = path.stat()
+    path.write_text("# Rome\nRome had an emperor.", encoding="utf-8")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    (tmp_path / "physics.md").unlink()
+
+    assert vault.sync(tmp_path) == (1, 1)
+    assert "physics.md" not in vault.files
+    assert vault.retrieve("emperor", k=1)[0].content.endswith("Rome had an emperor.")
+
+
+def test_save_and_load_round_trip(tmp_path):
+    _write(tmp_path / "vault", NOTES)
+    vault = _vault()
+    vault.sync(tmp_path / "vault")
+    vault.save(tmp_path / "index")
+
+    loaded = VaultIndex.load(tmp_path / "index", "hash", query_cache=QueryCache())
+    assert loaded.version == vault.version
+    assert len(loaded) == len(vault)
+    for query in QUERIES:
+        assert ([(d, c.content, c.source) for d, c in loaded.search(query)]
+                == [(d, c.content, c.source) for d, c in vault.search(query)])
+    # Signatures survive, so nothing is re-embedded
+    assert loaded.sync(tmp_path / "vault") == (0, 0)
+
+    # New ids continue after the saved ones
+    loaded.add_file("new.md", "# New\nA new note.")
+    assert len({i for entry in loaded.files.values() for i in entry["ids"]}) == len(loaded)
+
+
+def test_save_drops_only_its_own_stale_shards(tmp_path):
+    (tmp_path / "other.faiss").write_bytes(b"not ours")
+    vault = _vault()
+    for source, content in NOTES.items():
+        vault.add_file(source, content)
+    vault.save(tmp_path)
+    vault.remove_file("history/rome.md")
+    vault.remove_file("history/greece.md")
+    vault.save(tmp_path)
+    assert len(list(tmp_path.glob("*.faiss"))) == 2 + 1
+    assert (tmp_path / "other.faiss").read_bytes() == b"not ours"
+
+
+def test_load_with_other_settings_starts_empty(tmp_path):
+    assert len(VaultIndex.load(tmp_path, "hash", query_cache=QueryCache())) == 0
+
+    vault = _vault()
+    vault.add_file("physics.md", NOTES["physics.md"])
+    vault.save(tmp_path)
+    assert len(VaultIndex.load(tmp_path, "hash:128", query_cache=QueryCache())) == 0
+    assert len(VaultIndex.load(tmp_path, "hash", shard_by="file", query_cache=QueryCache())) == 0
+    assert len(VaultIndex.load(tmp_path, "hash", query_cache=QueryCache())) == 2
+
+
+@pytest.mark.parametrize("chunker", [
+    ChunkByParagraph(),
+    ChunkHeaderThenParagraph(max_words=100),
+    ChunkHeaderThenParagraph(max_tokens=200),
+])
+def test_load_with_other_chunking_starts_empty(tmp_path, chunker):
+    vault = _vault()
+    vault.add_file("physics.md", NOTES["physics.md"])
+    vault.save(tmp_path)
+    assert len(VaultIndex.load(tmp_path, "hash", chunker, query_cache=QueryCache())) == 0
+    same = ChunkHeaderThenParagraph()
+    assert len(VaultIndex.load(tmp_path, "hash", same, query_cache=QueryCache())) == 2
@@ -0,0 +1,127 @@
+import json
+import os
+import random
+
+import pytest
+
+from flashcard_gen.chunker import ChunkByParagraph
+from flashcard_gen.embeddings import EmbeddingCache, HashEmbedder
+from flashcard_gen.rag import FAISSRetriever
+from flashcard_gen.watch import STATE_FILE, NotesWatcher
+
+CELLS = (
+    "# Mitochondria\nMitochondria burn sugar with oxygen to make ATP, the molecule that "
+    "carries energy to every other part of the cell that needs it.\n\n"
+    "# Membrane\nThe cell membrane is a double layer of lipids with channels and pumps "
+    "that decide which molecules may enter or leave the cell."
+)
+ROME = (
+    "# Founding\nAccording to legend Rome was founded on seven hills by the river Tiber "
+    "and grew from a small town into the capital of a large empire."
+)
+RIBOSOMES = (
+    "# Ribosomes\nRibosomes read messenger RNA and join amino acids into the proteins "
+    "that the rest of the cell uses for structure and for its chemistry."
+)
+
+
+def _cards():
+    rng = random.Random(0)
+    while True:
+        yield f"Q: What is {rng.getrandbits(64):x}?\nA: A number\n"
+
+
+@pytest.fixture
+def notes(tmp_path):
+    root = tmp_path / "notes"
+    (root / "history").mkdir(parents=True)
+    (root / "cells.md").write_text(CELLS, encoding="utf-8")
+    (root / "history/rome.md").write_text(ROME, encoding="utf-8")
+    return root
+
+
+def _watcher(notes, **kwargs):
+    return NotesWatcher(notes, notes.parent / "cards", debounce=1.0, **kwargs)
+
+
+def _fronts(path):
+    return [card["front"] for card in json.loads(path.read_text(encoding="utf-8"))]
+
+
+def _edit(path, content):
+    path.write_text(content, encoding="utf-8")
+    # Some filesystems keep the mtime when a write lands in the same tick
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_only_changed_sections_regenerate(notes, fake_client):
+    client = fake_client(_cards())
+    watcher = _watcher(notes)
+    watcher.sync()
+    assert len(client.calls) == 3 * 2
+    cells, rome = watcher.output_path("cells.md"), watcher.output_path("history/rome.md")
+    before = {"cells": _fronts(cells), "rome": rome.read_bytes()}
+
+    # One section edited, one added; the other note is untouched
+    _edit(notes / "cells.md", CELLS.replace("double layer", "thin double layer")
+          + "\n\n" + RIBOSOMES)
+    assert watcher.poll(now=0.0) == []
+    ready = watcher.poll(now=1.0)
+    assert [rel for rel, _ in ready] == ["cells.md"]
+    for rel, signature in ready:
+        watcher.process(rel, signature)
+
+    calls = client.calls[6:]
+    assert len(calls) == 2 * 2
+    prompts = [call["messages"][-1]["content"] for call in calls]
+    assert all("thin double layer" in p or "Ribosomes" in p for p in prompts)
+    assert not any("Mitochondria burn" in p for p in prompts)
+
+    fronts = _fronts(cells)
+    assert fronts[:2] == before["cells"][:2]
+    assert len(fronts) == 6 and not set(fronts[2:]) & set(before["cells"])
+    assert rome.read_bytes() == before["rome"]
+    assert watcher.poll(now=2.0) == []
+
+
+def test_restart_only_processes_notes_changed_meanwhile(notes, fake_client):
+    client = fake_client(_cards())
+    _watcher(notes).sync()
+    _edit(notes / "history/rome.md", ROME + "\n\n" + RIBOSOMES)
+
+    _watcher(notes).sync()
+    assert len(client.calls) == 6 + 2
+    assert "Ribosomes" in client.calls[-1]["messages"][-1]["content"]
+
+
+@pytest.mark.parametrize("settings", [
+    {"chunker": ChunkByParagraph(max_words=200)},
+    {"output_format": "json"},
+    {"cards_per_section": 1},
+])
+def test_changed_settings_start_over(notes, fake_client, settings):
+    client = fake_client(_cards())
+    _watcher(notes).sync()
+    assert len(client.calls) == 6
+
+    watcher = _watcher(notes, **settings)
+    assert watcher.notes == {}
+    watcher.sync()
+    assert len(client.calls) > 6
+    state = json.loads((notes.parent / "cards" / STATE_FILE).read_text(encoding="utf-8"))
+    assert state["settings"] == watcher.settings
+
+
+def test_retriever_adds_related_sections(notes, fake_client):
+    client = fake_client(_cards())
+    retriever = FAISSRetriever(embedder=HashEmbedder(64, cache=EmbeddingCache()))
+    watcher = _watcher(notes, retriever=retriever)
+    assert watcher.settings["retriever"] == "hash-64"
+    watcher.sync()
+
+    # The one-section note has nothing related; cells.md sections see each other
+    prompts = [call["messages"][-1]["content"] for call in client.calls]
+    mitochondria = [p for p in prompts if p.startswith("# Mitochondria")]
+    assert mitochondria and all("# Membrane" in p for p in mitochondria)
+    assert all("# Mitochondria" not in p for p in prompts if p.startswith("# Founding"))